@@ -1,11 +1,6 @@
-from app.models import db
 from app import create_app
 
-app = create_app("DevelopmentConfig")
-
-with app.app_context():
-    # db.drop_all()
-    db.create_all()  #Create the database tables
+app = create_app("DevelopmentConfig")  #runs any pending migrations (MIGRATE_ON_STARTUP), see migrations/
 
 
 app.run()
\ No newline at end of file
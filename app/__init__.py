@@ -1,10 +1,23 @@
-from flask import Flask
+from flask import Flask, jsonify
 from .models import db
 from .extensions import ma, limiter, cache
+from .utility.database import configure_engines
+from .utility.json_provider import init_json
+from .utility.migrations import db_cli, upgrade_database
+from .utility.caching import register_cache_invalidation
+from .utility.passwords import HashingBusy
+from .utility.search import register_search_sync, search_cli
+from .utility.rollups import register_rollup_hooks, rollups_cli
+from .utility.scheduler import register_scheduler_hooks
+from .utility.importer import import_cli
+from .utility.reorder import register_reorder_hooks, reorder_cli
+from .utility.ledger import register_ledger_hooks, stock_cli
 from .blueprints.customers import customers_bp
 from .blueprints.mechanics import mechanics_bp
 from .blueprints.Service_Tickets import service_tickets_bp
 from .blueprints.parts import parts_bp
+from .blueprints.search import search_bp
+from .blueprints.reports import reports_bp
 from flask_swagger_ui import get_swaggerui_blueprint
 
 
@@ -18,19 +31,44 @@ swagger_blueprint = get_swaggerui_blueprint(SWAGGER_URL, API_URL, config={'app_n
 def create_app(config_name):
     app = Flask(__name__)
     app.config.from_object(f'config.{config_name}')
+    init_json(app)
     
     db.init_app(app)
+    configure_engines(app)
     ma.init_app(app)
     limiter.init_app(app)
     cache.init_app(app)
+    register_cache_invalidation()
+    register_search_sync()
+    register_rollup_hooks()
+    register_scheduler_hooks()
+    register_reorder_hooks()
+    register_ledger_hooks()
+    
+    app.cli.add_command(db_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(reorder_cli)
+    app.cli.add_command(stock_cli)
+    if app.config.get('MIGRATE_ON_STARTUP'):
+        with app.app_context():
+            upgrade_database(db.engine) #cheap no-op when the schema is already current
     
     #Register Blueprints
     app.register_blueprint(customers_bp, url_prefix='/customers')
     app.register_blueprint(mechanics_bp, url_prefix='/mechanics')
     app.register_blueprint(service_tickets_bp, url_prefix='/service_tickets')
     app.register_blueprint(parts_bp, url_prefix='/parts')
+    app.register_blueprint(search_bp, url_prefix='/search')
+    app.register_blueprint(reports_bp, url_prefix='/reports')
     app.register_blueprint(swagger_blueprint, url_prefix=SWAGGER_URL)
     
+    #every password hashing slot is taken (login storm), tell the client to come back instead of queueing forever
+    @app.errorhandler(HashingBusy)
+    def hashing_busy(error):
+        return jsonify({"message": "Server busy, please try again"}), 503, {'Retry-After': '1'}
+    
     
     
     return app
\ No newline at end of file
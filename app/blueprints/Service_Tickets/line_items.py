@@ -0,0 +1,189 @@
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import case, select, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload
+from app.models import db, Service_Tickets, Service_Ticket_Parts
+from app.utility.caching import touch_tickets
+from app.utility.rollups import record_parts, record_revenue
+
+
+#Money is tracked in integer cents on the ledger so repeated adds/removes can't drift like float += does
+def to_cents(amount):
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return cents / 100
+
+
+#Loads every line item on a ticket together with its part in ONE query (joinedload),
+#so the invoice doesn't fire a SELECT per part.
+def load_line_items(service_ticket_id):
+    query = (
+        select(Service_Ticket_Parts)
+        .options(joinedload(Service_Ticket_Parts.part))
+        .where(Service_Ticket_Parts.service_ticket_id == service_ticket_id)
+        .order_by(Service_Ticket_Parts.id)
+    )
+    return db.session.scalars(query).all()
+
+
+def get_line_item(service_ticket_id, part_id):
+    return db.session.scalars(
+        select(Service_Ticket_Parts).where(
+            Service_Ticket_Parts.service_ticket_id == service_ticket_id,
+            Service_Ticket_Parts.part_id == part_id
+        )
+    ).first()
+
+
+#"Brake pads (x2), Rotor (x1)", the invoice's parts. Built from the line items when the invoice is read instead of
+#being stored on the ticket and rebuilt on every add/remove.
+def parts_summary(line_items):
+    return ", ".join(f"{item.part.part_name} (x{item.quantity})" for item in line_items)
+
+
+#Moves the ticket total by delta_cents in a single UPDATE. The database does the arithmetic on the
+#current value, so two requests changing the same ticket can't overwrite each other's total.
+def apply_total_delta(service_ticket, delta_cents):
+    db.session.execute(
+        update(Service_Tickets)
+        .where(Service_Tickets.id == service_ticket.id)
+        .values(
+            total_cents=Service_Tickets.total_cents + delta_cents,
+            price=(Service_Tickets.total_cents + delta_cents) / 100.0
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.expire(service_ticket, ['total_cents', 'price'])
+    #Core UPDATE, the flush hooks don't see it
+    touch_tickets(db.session, [service_ticket.id])
+    record_revenue(db.session.connection(), service_ticket, delta_cents)
+
+
+def get_line_items(service_ticket_id, part_ids):
+    query = select(Service_Ticket_Parts).where(
+        Service_Ticket_Parts.service_ticket_id == service_ticket_id,
+        Service_Ticket_Parts.part_id.in_(part_ids)
+    )
+    return {item.part_id: item for item in db.session.scalars(query)}
+
+
+#Adds quantity of part to the ticket's ledger, bumping the existing line if there is one.
+def add_line_item(service_ticket, part, quantity):
+    add_line_items(service_ticket, {part.id: part}, {part.id: quantity})
+
+
+#Batch version for {part_id: quantity}: one line per part per ticket (uq_service_ticket_parts_ticket_part), existing
+#lines are bumped, and the ticket total moves once for the whole batch.
+def add_line_items(service_ticket, parts_by_id, quantities):
+    connection = db.session.connection()
+    if connection.dialect.name in ('sqlite', 'postgresql'):
+        rollup = _upsert_line_items(connection, service_ticket, parts_by_id, quantities)
+    else:
+        rollup = _add_line_items(service_ticket, parts_by_id, quantities)
+    apply_total_delta(service_ticket, sum(revenue for quantity, revenue, lines in rollup.values()))
+    record_parts(db.session.connection(), service_ticket.date_created, rollup)
+
+
+#INSERT ... ON CONFLICT DO UPDATE SET quantity = quantity + excluded.quantity, so two requests adding a part the
+#ticket doesn't have yet both land on the one line instead of the second failing the unique index. RETURNING gives
+#each line's quantity and price afterwards; a line that's exactly what was just added is new (emptied lines are
+#deleted, so an existing one always had something on it). Bumped lines keep the price they were added at.
+def _upsert_line_items(connection, service_ticket, parts_by_id, quantities):
+    table = Service_Ticket_Parts.__table__
+    statement = (sqlite if connection.dialect.name == 'sqlite' else postgresql).insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=['service_ticket_id', 'part_id'],
+        set_={'quantity': table.c.quantity + statement.excluded.quantity}
+    ).returning(table.c.part_id, table.c.quantity, table.c.unit_price_cents)
+    rows = connection.execute(statement, [
+        {'service_ticket_id': service_ticket.id, 'part_id': part_id, 'quantity': quantity, 'unit_price_cents': to_cents(parts_by_id[part_id].price)}
+        for part_id, quantity in sorted(quantities.items()) #same order every time, so two batches can't deadlock on Postgres
+    ]).all()
+
+    #Core statement: refresh any line items (and the ticket's list of them) the session already has loaded
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, Service_Ticket_Parts):
+            db.session.expire(obj, ['quantity'])
+    db.session.expire(service_ticket, ['parts_service_tickets'])
+    return {
+        part_id: (quantities[part_id], unit_price_cents * quantities[part_id], 1 if quantity == quantities[part_id] else 0)
+        for part_id, quantity, unit_price_cents in rows
+    }
+
+
+#Other databases: read the existing lines, bump them in one UPDATE (CASE on the line id) and insert the rest.
+def _add_line_items(service_ticket, parts_by_id, quantities):
+    existing = get_line_items(service_ticket.id, list(quantities))
+
+    bumps = {existing[part_id].id: quantity for part_id, quantity in quantities.items() if part_id in existing}
+    if bumps:
+        db.session.execute(
+            update(Service_Ticket_Parts)
+            .where(Service_Ticket_Parts.id.in_(bumps))
+            .values(quantity=Service_Ticket_Parts.quantity + _per_line(bumps))
+            .execution_options(synchronize_session=False)
+        )
+        for line_item in existing.values():
+            db.session.expire(line_item, ['quantity'])
+
+    rollup = {}
+    for part_id, quantity in quantities.items():
+        line_item = existing.get(part_id)
+        if not line_item:
+            line_item = Service_Ticket_Parts(
+                service_ticket_id=service_ticket.id,
+                part_id=part_id,
+                quantity=quantity,
+                unit_price_cents=to_cents(parts_by_id[part_id].price)
+            )
+            db.session.add(line_item)
+        rollup[part_id] = (quantity, line_item.unit_price_cents * quantity, 0 if part_id in existing else 1)
+    return rollup
+
+
+#Takes quantity off a line item, deleting the line when it hits zero. Returns False instead of going
+#negative when there aren't that many on the ticket (e.g. another request removed them first).
+def remove_line_item(service_ticket, line_item, quantity):
+    return remove_line_items(service_ticket, {line_item.part_id: line_item}, {line_item.part_id: quantity})
+
+
+#Batch version, all-or-nothing: one conditional UPDATE (WHERE quantity >= :n per line). If any line is short
+#the whole batch is rolled back and False is returned, so call it before any other write in the request.
+def remove_line_items(service_ticket, line_items_by_part, quantities):
+    decrements = {line_items_by_part[part_id].id: quantity for part_id, quantity in quantities.items()}
+    result = db.session.execute(
+        update(Service_Ticket_Parts)
+        .where(Service_Ticket_Parts.id.in_(decrements), Service_Ticket_Parts.quantity >= _per_line(decrements))
+        .values(quantity=Service_Ticket_Parts.quantity - _per_line(decrements))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(decrements):
+        if result.rowcount:
+            db.session.rollback()
+        return False
+
+    for line_item in line_items_by_part.values():
+        db.session.expire(line_item, ['quantity'])
+    emptied = set(db.session.scalars(
+        delete(Service_Ticket_Parts)
+        .where(Service_Ticket_Parts.id.in_(decrements), Service_Ticket_Parts.quantity == 0)
+        .returning(Service_Ticket_Parts.part_id)
+        .execution_options(synchronize_session='fetch')
+    ))
+
+    rollup = {
+        part_id: (-quantity, -line_items_by_part[part_id].unit_price_cents * quantity, -1 if part_id in emptied else 0)
+        for part_id, quantity in quantities.items()
+    }
+    apply_total_delta(service_ticket, sum(revenue for quantity, revenue, lines in rollup.values()))
+    record_parts(db.session.connection(), service_ticket.date_created, rollup)
+    return True
+
+
+#quantity change per line: a plain number for one line, CASE line.id WHEN ... for a batch
+def _per_line(quantities):
+    if len(quantities) == 1:
+        return next(iter(quantities.values()))
+    return case(quantities, value=Service_Ticket_Parts.id)
@@ -1,10 +1,20 @@
-from app.utility.auth import mechanic_required, token_required
+from app.utility.auth import can_view_ticket, mechanic_required, token_required
 from . import service_tickets_bp
-from .schemas import service_ticket_schema, service_tickets_schema
+from .schemas import service_ticket_schema, service_tickets_fast
+from .status import MAX_BULK_TICKETS, current_statuses, filter_matches, transition_tickets
+from .line_items import load_line_items, parts_summary, get_line_item, get_line_items, add_line_item, add_line_items, remove_line_item, remove_line_items, from_cents
 from flask import request, jsonify
 from marshmallow import ValidationError
-from app.models import Customers, Mechanics, db, Service_Tickets, Parts, Service_Ticket_Parts
-from app.extensions import limiter, cache
+from app.models import Customers, Mechanics, OPEN_STATUSES, STATUS_TRANSITIONS, STATUSES, db, Service_Tickets, Parts, Service_Ticket_Parts
+from app.extensions import limiter
+from app.utility.caching import cached_view, touch_tickets
+from app.utility.pagination import PaginationError, get_limit, get_int_arg, get_date_arg, get_fields_arg, encode_cursor, decode_cursor
+from app.utility.inventory import reserve_stock, reserve_stock_many, return_stock, return_stock_many, retry_on_lock
+from app.utility.scheduler import assign_mechanic
+from app.utility.streaming import wants_ndjson, stream_ndjson
+from sqlalchemy import select, tuple_
+from datetime import date
+from sqlalchemy.orm import load_only
 
 
 #__________________CREATE SERVICE TICKET ROUTE____________________#
@@ -32,13 +42,61 @@ def create_service_ticket():
 
 #__________________READ SERVICE TICKETS ROUTE____________________#
 
+#Builds the filtered ticket query from the query string (status, customer_id, date_from, date_to)
+def filtered_service_tickets_query():
+    query = select(Service_Tickets)
+
+    status = request.args.get('status')
+    if status:
+        query = query.where(Service_Tickets.status == status)
+    customer_id = get_int_arg('customer_id')
+    if customer_id is not None:
+        query = query.where(Service_Tickets.customer_id == customer_id)
+    date_from = get_date_arg('date_from')
+    if date_from:
+        query = query.where(Service_Tickets.date_created >= date_from)
+    date_to = get_date_arg('date_to')
+    if date_to:
+        query = query.where(Service_Tickets.date_created <= date_to)
+
+    return query.order_by(Service_Tickets.date_created, Service_Tickets.id)
+
+
+#Keyset pagination: instead of OFFSET we continue after the (date_created, id) of the last row we sent,
+#so every page is an index range scan no matter how many tickets there are.
 @service_tickets_bp.route('', methods=['GET'])
 @token_required
 @mechanic_required
-@cache.cached(timeout=30)
+@cached_view(lambda: ['tickets'], timeout=30)
 def get_service_tickets():
-    service_tickets = db.session.query(Service_Tickets).all()
-    return service_tickets_schema.jsonify(service_tickets), 200
+    try:
+        serializer = service_tickets_fast.only(get_fields_arg(service_tickets_fast.fields)) #?fields=id,status,...
+        query = filtered_service_tickets_query()
+        cursor = request.args.get('cursor')
+        if cursor:
+            last_date, last_id = decode_cursor(cursor)
+            query = query.where(tuple_(Service_Tickets.date_created, Service_Tickets.id) > tuple_(last_date, last_id))
+        #NDJSON export streams everything after the cursor, so limit only applies to JSON pages
+        if wants_ndjson():
+            return stream_ndjson(query.options(load_only(*serializer.columns)), serializer)
+        limit = get_limit()
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+
+    #fetch one extra row so we know if there is another page. Plain rows of the dumped columns, no ORM objects,
+    #plus the cursor columns in case ?fields= left them out
+    columns = serializer.columns + [Service_Tickets.date_created.label('cursor_date'), Service_Tickets.id.label('cursor_id')]
+    service_tickets = db.session.execute(query.with_only_columns(*columns).limit(limit + 1)).all()
+    next_cursor = None
+    if len(service_tickets) > limit:
+        service_tickets = service_tickets[:limit]
+        last = service_tickets[-1]
+        next_cursor = encode_cursor(last.cursor_date, last.cursor_id)
+
+    return jsonify({
+        "service_tickets": serializer.dump(service_tickets),
+        "next_cursor": next_cursor
+    }), 200
 
 
 #____________________________READ A SINGLE SERVICE TICKET ROUTE____________________________#
@@ -46,21 +104,56 @@ def get_service_tickets():
 #read a single service ticket but customers can only see their own tickets
 @service_tickets_bp.route('/<int:service_ticket_id>', methods=['GET'])
 @token_required
+@cached_view(lambda service_ticket_id: [f"ticket:{service_ticket_id}"])
 def get_service_ticket(service_ticket_id):
     service_ticket = db.session.get(Service_Tickets, service_ticket_id)
     if not service_ticket:
         return jsonify({"message": "Service Ticket not found"}), 404
     
-    if request.logged_in_role == 'mechanic':
-        pass  # Mechanics can access all tickets
-    #If the logged in user is a customer, ensure they can only access their own tickets
-    if request.logged_in_role == 'customer':
-        if service_ticket.customer_id != int(request.logged_in_user_id):
-            return jsonify({"message": "Access denied: You can only view your own service tickets."}), 403
+    #Mechanics can access all tickets, customers only their own
+    if not can_view_ticket(service_ticket):
+        return jsonify({"message": "Access denied: You can only view your own service tickets."}), 403
     
     return service_ticket_schema.jsonify(service_ticket), 200
 
 
+#____________________________SERVICE TICKET INVOICE ROUTE____________________________#
+
+#The total comes straight off the ticket row (kept up to date by the ledger), we never re-add the line items here
+@service_tickets_bp.route('/<int:service_ticket_id>/invoice', methods=['GET'])
+@token_required
+@cached_view(lambda service_ticket_id: [f"ticket:{service_ticket_id}"])
+def get_service_ticket_invoice(service_ticket_id):
+    service_ticket = db.session.get(Service_Tickets, service_ticket_id)
+    if not service_ticket:
+        return jsonify({"message": "Service Ticket not found"}), 404
+
+    if not can_view_ticket(service_ticket):
+        return jsonify({"message": "Access denied: You can only view your own service tickets."}), 403
+
+    items = load_line_items(service_ticket.id)
+    line_items = [
+        {
+            "part_id": item.part_id,
+            "part_name": item.part.part_name,
+            "quantity": item.quantity,
+            "unit_price": from_cents(item.unit_price_cents),
+            "line_total": from_cents(item.unit_price_cents * item.quantity)
+        }
+        for item in items
+    ]
+
+    return jsonify({
+        "service_ticket_id": service_ticket.id,
+        "customer_id": service_ticket.customer_id,
+        "status": service_ticket.status,
+        "line_items": line_items,
+        "parts": parts_summary(items),
+        "total_cents": service_ticket.total_cents,
+        "total": from_cents(service_ticket.total_cents)
+    }), 200
+
+
 #____________________________DELETE SERVICE TICKET ROUTE____________________________#
 
 @service_tickets_bp.route('', methods=['DELETE'])
@@ -86,10 +179,15 @@ def update_service_ticket():
     if not service_ticket:
         return jsonify({"message": "Service Ticket not found"}), 404
     
+    #Validate the fields being changed. id, date_created, price and total_cents are dump_only, so sending them is a 400
+    try:
+        data = service_ticket_schema.load({key: value for key, value in request.json.items() if key != 'service_ticket_id'}, partial=True)
+    except ValidationError as e:
+        return jsonify({"message": e.messages}), 400
+
     #Update fields
-    for key, value in request.json.items():
-        if key != 'service_ticket_id' and hasattr(service_ticket, key):
-            setattr(service_ticket, key, value)
+    for key, value in data.items():
+        setattr(service_ticket, key, value)
     #If status is being updated to "Complete", set the completion_date to today
     if 'status' in request.json and request.json['status'] == "Complete":
         from datetime import date
@@ -99,6 +197,74 @@ def update_service_ticket():
     return service_ticket_schema.jsonify(service_ticket), 200
 
 
+#____________________________BULK STATUS UPDATE ROUTE____________________________#
+
+#{"status": "Complete", "service_ticket_ids": [1, 2, 3]} or {"status": "Complete", "filter": {"status": "In Progress", "date_to": "2024-01-31"}}
+#filter takes status, customer_id, date_from and date_to (at least one). The tickets move in set-based UPDATEs, see status.py.
+#Either way at most MAX_BULK_TICKETS tickets move per request.
+def get_bulk_conditions(body):
+    ids, ticket_filter = body.get('service_ticket_ids'), body.get('filter')
+    if (ids is None) == (ticket_filter is None):
+        return None, "Send either service_ticket_ids or filter"
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return None, "service_ticket_ids must be a non-empty list of integers"
+        if len(ids) > MAX_BULK_TICKETS:
+            return None, f"At most {MAX_BULK_TICKETS} tickets per request"
+        return [Service_Tickets.id.in_(set(ids))], None
+
+    if not isinstance(ticket_filter, dict) or not ticket_filter or set(ticket_filter) - {'status', 'customer_id', 'date_from', 'date_to'}:
+        return None, "filter must have one or more of status, customer_id, date_from, date_to"
+    conditions = []
+    if 'status' in ticket_filter:
+        if ticket_filter['status'] not in STATUSES:
+            return None, f"filter status must be one of: {', '.join(STATUSES)}"
+        conditions.append(Service_Tickets.status == ticket_filter['status'])
+    if 'customer_id' in ticket_filter:
+        if not isinstance(ticket_filter['customer_id'], int) or isinstance(ticket_filter['customer_id'], bool):
+            return None, "customer_id must be an integer"
+        conditions.append(Service_Tickets.customer_id == ticket_filter['customer_id'])
+    for name, compare in (('date_from', Service_Tickets.date_created.__ge__), ('date_to', Service_Tickets.date_created.__le__)):
+        if name in ticket_filter:
+            try:
+                conditions.append(compare(date.fromisoformat(ticket_filter[name])))
+            except (TypeError, ValueError):
+                return None, f"{name} must be a date in YYYY-MM-DD format"
+    return conditions, None
+
+
+@service_tickets_bp.route('/status', methods=['PUT'])
+@token_required
+@mechanic_required
+def bulk_update_status():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"message": "Request body must be a JSON object"}), 400
+    status = body.get('status')
+    if status not in STATUS_TRANSITIONS:
+        return jsonify({"message": f"status must be one of: {', '.join(STATUS_TRANSITIONS)}"}), 400
+    conditions, error = get_bulk_conditions(body)
+    if error:
+        return jsonify({"message": error}), 400
+    if body.get('filter') is not None:
+        matches = filter_matches(status, conditions)
+        if matches is None:
+            return jsonify({"message": f"filter matches more than {MAX_BULK_TICKETS} tickets, narrow it down"}), 400
+        conditions.append(Service_Tickets.id.in_(matches))
+
+    updated = transition_tickets(status, conditions)
+    db.session.commit()
+
+    response = {"status": status, "updated": updated}
+    if body.get('service_ticket_ids') is not None:
+        #tickets that didn't move: missing, or in a state that can't go to status (already Complete, say)
+        left = set(body['service_ticket_ids']) - set(updated)
+        statuses = current_statuses(left) if left else {}
+        response["skipped"] = [{"id": ticket_id, "status": statuses[ticket_id]} for ticket_id in sorted(statuses)]
+        response["not_found"] = sorted(left - set(statuses))
+    return jsonify(response), 200
+
+
 #____________________________ASSIGN MECHANIC TO SERVICE TICKET ROUTE____________________________#
 
 @service_tickets_bp.route('/assign_mechanic/', methods=['PUT'])
@@ -142,6 +308,46 @@ def assign_mechanic_to_service_ticket():
 
 
 
+#____________________________AUTO ASSIGN A MECHANIC____________________________#
+
+#Assigns the mechanic with the fewest open tickets, optionally only mechanics with {"specialty": "..."}.
+#The pick comes from the in-memory workload index (app/utility/scheduler.py), not a scan of everyone's tickets.
+@service_tickets_bp.route('/<int:service_ticket_id>/auto_assign', methods=['POST'])
+@token_required
+@mechanic_required
+def auto_assign_mechanic(service_ticket_id):
+    service_ticket = db.session.get(Service_Tickets, service_ticket_id)
+    if not service_ticket:
+        return jsonify({"message": "Service Ticket not found"}), 404
+    if service_ticket.status not in OPEN_STATUSES:
+        return jsonify({"message": f"Service Ticket {service_ticket.id} is {service_ticket.status}, only open tickets can be assigned."}), 400
+
+    specialty = (request.get_json(silent=True) or {}).get('specialty')
+    if specialty is not None and not isinstance(specialty, str):
+        return jsonify({"message": "specialty must be a string"}), 400
+
+    #the assignment row goes in with the capacity check in the same statement, see assign_if_room in scheduler.py
+    assigned = {mechanic.id for mechanic in service_ticket.mechanics_service_tickets}
+    picked = assign_mechanic(db.session, service_ticket.id, specialty, exclude=assigned)
+    if picked is None:
+        wanted = f" with specialty {specialty}" if specialty else ""
+        return jsonify({"message": f"No mechanic{wanted} has room for another ticket."}), 409
+
+    touch_tickets(db.session, [service_ticket.id])
+    db.session.expire(service_ticket, ['mechanics_service_tickets'])
+    mechanic = db.session.get(Mechanics, picked[0])
+    service_ticket.status = "In Progress"
+    db.session.commit()
+
+    response = service_ticket_schema.dump(service_ticket)
+    response["mechanic_id"] = mechanic.id
+    response["confirmation"] = (
+        f"Mechanic {mechanic.id}, {mechanic.first_name} {mechanic.last_name} assigned to Service Ticket {service_ticket.id} "
+        f"({picked[1] + 1} open tickets). Status set to In Progress."
+    )
+    return jsonify(response), 200
+
+
 #____________________________REMOVE MECHANIC FROM SERVICE TICKET ROUTE____________________________#
 
 @service_tickets_bp.route('/remove_mechanic/', methods=['PUT'])
@@ -185,6 +391,15 @@ def remove_mechanic_from_service_ticket():
     return jsonify(response), 200
 
 
+#JSON numbers for ids and part counts: bools are ints in Python and 2.5 parts can't go on an integer ledger
+def is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_quantity(value):
+    return is_integer(value) and value > 0
+
+
 #_________________ADD PART TO SERVICE TICKET______________________
 
 #we will need to query the service ticket to see of the part already exists. If it does, we will just update the quantity and price. We will not create a duplicate entry in the service ticket parts association table. Then we will subtract the part quantity from the parts stock in the parts table and update the service ticket price accordingly.
@@ -203,37 +418,17 @@ def add_part_to_service_ticket():
     if not part:
         return jsonify({"message": "Part not found"}), 404
 
-    # Validate quantity
+    # Validate quantity, a whole number of parts
     quantity = request.json.get('quantity', 1)
-    if quantity is None or quantity <= 0:
-        return jsonify({"message": "Quantity must be greater than zero"}), 400
-    if part.stock < quantity:
+    if not is_quantity(quantity):
+        return jsonify({"message": "Quantity must be a whole number greater than zero"}), 400
+
+    # Reserve the stock first. The check and the decrement are one conditional UPDATE so two mechanics can't oversell
+    if not reserve_stock(part.id, quantity, service_ticket.id):
         return jsonify({"message": "Insufficient stock for the requested part"}), 400
 
-    # Check if part already exists in the service ticket
-    service_ticket_part = db.session.query(Service_Ticket_Parts).filter_by(service_ticket_id=service_ticket.id, part_id=part.id).first()
-
-    if service_ticket_part:
-        # Update quantity
-        service_ticket_part.quantity += quantity
-    else:
-        # Create new association
-        service_ticket_part = Service_Ticket_Parts(service_ticket_id=service_ticket.id, part_id=part.id, quantity=quantity)
-        db.session.add(service_ticket_part)
-
-    # Update stock
-    part.stock -= quantity
-
-    # Update price (initialize if None)
-    if service_ticket.price is None:
-        service_ticket.price = 0.0
-    service_ticket.price += (part.price * quantity)
-
-    # Regenerate the parts field from the association table
-    service_ticket.parts = ", ".join(
-        f"{p.part.part_name} (x{p.quantity})"
-        for p in db.session.query(Service_Ticket_Parts).filter_by(service_ticket_id=service_ticket.id).all()
-    )
+    # Add to the ticket's ledger (bumps the existing line if the part is already on the ticket) and move the total
+    add_line_item(service_ticket, part, quantity)
     
     confirmation_message = f"Added {quantity} x {part.part_name} to Service Ticket {service_ticket.id}."
 
@@ -261,43 +456,23 @@ def remove_part_from_service_ticket():
     if not part:
         return jsonify({"message": "Part not found"}), 404
 
-    # Validate quantity
+    # Validate quantity, a whole number of parts
     quantity = request.json.get('quantity', 1)
-    if quantity is None or quantity <= 0:
-        return jsonify({"message": "Quantity must be greater than zero"}), 400
+    if not is_quantity(quantity):
+        return jsonify({"message": "Quantity must be a whole number greater than zero"}), 400
 
     # Check if part exists in the service ticket
-    service_ticket_part = db.session.query(Service_Ticket_Parts).filter_by(service_ticket_id=service_ticket.id,part_id=part.id).first()
+    service_ticket_part = get_line_item(service_ticket.id, part.id)
 
     if not service_ticket_part:
         return jsonify({"message": "Part not found on this Service Ticket"}), 404
 
-    # Ensure we don't remove more than exists
-    if service_ticket_part.quantity < quantity:
+    # Update or delete the line item and move the total. Fails if there aren't that many on the ticket
+    if not retry_on_lock(remove_line_item, service_ticket, service_ticket_part, quantity):
         return jsonify({"message": "Cannot remove more parts than are on the ticket"}), 400
 
-    
-    
-    # Update or delete association
-    service_ticket_part.quantity -= quantity
-    if service_ticket_part.quantity == 0:
-        db.session.delete(service_ticket_part)
-
     # Restore stock
-    part.stock += quantity
-
-    # Update price (initialize if None)
-    if service_ticket.price is None:
-        service_ticket.price = 0.0
-    service_ticket.price -= (part.price * quantity)
-    if service_ticket.price < 0:
-        service_ticket.price = 0.0  # safety guard
-
-    # Regenerate the parts field from association table
-    service_ticket.parts = ", ".join(
-        f"{p.part.part_name} (x{p.quantity})"
-        for p in db.session.query(Service_Ticket_Parts).filter_by(service_ticket_id=service_ticket.id).all()
-    )
+    return_stock(part.id, quantity, service_ticket.id)
     
     confirmation_message = f"Removed {quantity} x {part.part_name} from Service Ticket {service_ticket.id}."
 
@@ -309,8 +484,84 @@ def remove_part_from_service_ticket():
     return jsonify(response), 200
 
 
-    
-    
- 
+#_________________ADD / REMOVE MANY PARTS IN ONE REQUEST______________________
+
+#body: {"service_ticket_id": 1, "parts": [{"part_id": 3, "quantity": 2}, ...]}
+#Returns ({part_id: quantity}, None) or (None, error message). The same part listed twice is added up.
+def get_part_quantities(items):
+    if not isinstance(items, list) or not items:
+        return None, "parts must be a non-empty list of {part_id, quantity}"
+    quantities = {}
+    for item in items:
+        if not isinstance(item, dict) or not is_integer(item.get('part_id')):
+            return None, "Each part needs an integer part_id"
+        quantity = item.get('quantity', 1)
+        if not is_quantity(quantity):
+            return None, "Quantity must be a whole number greater than zero"
+        quantities[item['part_id']] = quantities.get(item['part_id'], 0) + quantity
+    return quantities, None
+
+
+#Everything happens in one transaction: one IN query for the parts, one conditional UPDATE for the stock,
+#one for existing lines and one total update, however many parts are in the job.
+@service_tickets_bp.route('/add_parts', methods=['PUT'])
+@token_required
+@mechanic_required
+def add_parts_to_service_ticket():
+    service_ticket = db.session.get(Service_Tickets, request.json.get('service_ticket_id'))
+    if not service_ticket:
+        return jsonify({"message": "Service Ticket not found"}), 404
+
+    quantities, error = get_part_quantities(request.json.get('parts'))
+    if error:
+        return jsonify({"message": error}), 400
+
+    parts = {part.id: part for part in db.session.scalars(select(Parts).where(Parts.id.in_(quantities)))}
+    missing = sorted(set(quantities) - set(parts))
+    if missing:
+        return jsonify({"message": f"Parts not found: {missing}"}), 404
+
+    # All or nothing: if any part is short on stock nothing is reserved
+    if not reserve_stock_many(quantities, service_ticket.id):
+        return jsonify({"message": "Insufficient stock for one or more of the requested parts"}), 400
+
+    add_line_items(service_ticket, parts, quantities)
+
+    confirmation_message = f"Added {sum(quantities.values())} parts ({len(quantities)} line items) to Service Ticket {service_ticket.id}."
+
+    db.session.commit()
+    response = service_ticket_schema.dump(service_ticket)
+    response["confirmation"] = confirmation_message
+    return jsonify(response), 200
+
+
+@service_tickets_bp.route('/remove_parts', methods=['PUT'])
+@token_required
+@mechanic_required
+def remove_parts_from_service_ticket():
+    service_ticket = db.session.get(Service_Tickets, request.json.get('service_ticket_id'))
+    if not service_ticket:
+        return jsonify({"message": "Service Ticket not found"}), 404
 
+    quantities, error = get_part_quantities(request.json.get('parts'))
+    if error:
+        return jsonify({"message": error}), 400
+
+    line_items = get_line_items(service_ticket.id, list(quantities))
+    missing = sorted(set(quantities) - set(line_items))
+    if missing:
+        return jsonify({"message": f"Parts not found on this Service Ticket: {missing}"}), 404
+
+    # All or nothing: if any line has fewer than asked for nothing is removed
+    if not retry_on_lock(remove_line_items, service_ticket, line_items, quantities):
+        return jsonify({"message": "Cannot remove more parts than are on the ticket"}), 400
+
+    return_stock_many(quantities, service_ticket.id)
+
+    confirmation_message = f"Removed {sum(quantities.values())} parts ({len(quantities)} line items) from Service Ticket {service_ticket.id}."
+
+    db.session.commit()
+    response = service_ticket_schema.dump(service_ticket)
+    response["confirmation"] = confirmation_message
+    return jsonify(response), 200
 
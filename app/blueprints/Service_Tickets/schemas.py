@@ -1,11 +1,16 @@
 from app.extensions import ma
+from app.utility.serializers import FastSerializer
 from app.models import Service_Tickets
 
 class ServiceTicketSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Service_Tickets
         include_fk = True
+        dump_only = ('id', 'date_created', 'price', 'total_cents') #price and total_cents follow the line items, see line_items.py
 
 
 service_ticket_schema = ServiceTicketSchema()
-service_tickets_schema = ServiceTicketSchema(many=True)
\ No newline at end of file
+service_tickets_schema = ServiceTicketSchema(many=True)
+
+#same output, compiled, for the list endpoints (see app/utility/serializers.py)
+service_tickets_fast = FastSerializer(service_tickets_schema)
\ No newline at end of file
@@ -0,0 +1,66 @@
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import select, update
+from app.models import db, STATUS_TRANSITIONS, Service_Tickets
+from app.utility.caching import touch_tickets
+from app.utility.rollups import record_tickets
+from app.utility.scheduler import touch_mechanics
+
+MAX_BULK_TICKETS = 5000
+
+
+#Moves every ticket matching conditions (a list of WHERE clauses) to status, in the current transaction.
+#The state machine lives in the WHERE clause: one UPDATE per allowed source status (at most two), each only touching
+#tickets that are still in that status, so a ticket can't be moved from a state it isn't allowed to leave even if
+#another request changed it a moment ago. RETURNING hands back what the rollups need, no SELECT before the UPDATE.
+#Returns the ids that moved.
+def transition_tickets(status, conditions):
+    values = {'status': status}
+    if status == "Complete":
+        values['completion_date'] = date.today()
+
+    moved = []
+    changes = defaultdict(lambda: [0, 0]) #(day, status) -> [tickets, revenue_cents]
+    for from_status in STATUS_TRANSITIONS[status]:
+        rows = db.session.execute(
+            update(Service_Tickets)
+            .where(Service_Tickets.status == from_status, *conditions)
+            .values(values)
+            .returning(Service_Tickets.id, Service_Tickets.date_created, Service_Tickets.total_cents)
+            .execution_options(synchronize_session=False)
+        ).all()
+        for ticket_id, day, total_cents in rows:
+            moved.append(ticket_id)
+            for key, sign in (((day, from_status), -1), ((day, status), 1)):
+                changes[key][0] += sign
+                changes[key][1] += sign * total_cents
+    if not moved:
+        return moved
+
+    #Core UPDATE, none of the flush hooks see it
+    connection = db.session.connection()
+    touch_tickets(db.session, moved, connection=connection)
+    record_tickets(connection, [(day, name, tickets, revenue) for (day, name), (tickets, revenue) in changes.items()])
+    if status == "Complete":
+        touch_mechanics(db.session, ticket_ids=moved, connection=connection)
+    moved_ids = set(moved)
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, Service_Tickets) and obj.id in moved_ids:
+            db.session.expire(obj, ['status', 'completion_date'])
+    return sorted(moved)
+
+
+#The tickets a filter would move, at most MAX_BULK_TICKETS of them: their ids, or None if there are more. The UPDATEs
+#are then pinned to these ids, so the cache, rollup and scheduler updates after them stay bounded too.
+def filter_matches(status, conditions):
+    ids = db.session.scalars(
+        select(Service_Tickets.id)
+        .where(Service_Tickets.status.in_(STATUS_TRANSITIONS[status]), *conditions)
+        .limit(MAX_BULK_TICKETS + 1)
+    ).all()
+    return ids if len(ids) <= MAX_BULK_TICKETS else None
+
+
+#Current status of the tickets that didn't move, to tell the client why: {id: status}
+def current_statuses(ticket_ids):
+    return dict(db.session.execute(select(Service_Tickets.id, Service_Tickets.status).where(Service_Tickets.id.in_(ticket_ids))).all())
@@ -1,12 +1,18 @@
 from app.blueprints.customers import customers_bp
-from .schemas import customer_schema, customers_schema, login_customer_schema
-from app.blueprints.Service_Tickets.schemas import service_tickets_schema
-from app.utility.auth import customer_required, encode_token, mechanic_required, token_required
+from .schemas import customer_schema, login_customer_schema, customers_fast
+from app.blueprints.Service_Tickets.schemas import service_tickets_fast
+from app.utility.auth import current_principal, current_user, customer_required, encode_token, mechanic_required, self_required, token_required
 from flask import request, jsonify
 from marshmallow import ValidationError
 from app.models import Customers, db
 from app.extensions import limiter
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utility.caching import cached_view
+from app.utility.pagination import PaginationError, get_fields_arg
+from app.utility.streaming import wants_ndjson, stream_ndjson
+from app.utility.importer import HTTP_HASH_BATCH, ImportTooLarge, import_format, import_rows, request_rows
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from app.utility.passwords import check_and_upgrade, hash_password
 
 #____________________CUSTOMER LOGIN ROUTE____________________
 
@@ -19,7 +25,8 @@ def login():
     
     customer = db.session.query(Customers).where(Customers.email == data['email']).first()
 
-    if customer and check_password_hash(customer.password, data['password']):
+    if customer and check_and_upgrade(customer, data['password']):
+        db.session.commit() #saves the new hash if the hash settings changed since their last login
         #create token for customer
         token = encode_token(customer.id, role='customer')
         return jsonify({
@@ -39,7 +46,7 @@ def create_customer():
     except ValidationError as err:
         return jsonify(err.messages), 400
     
-    data['password'] = generate_password_hash(data['password'])
+    data['password'] = hash_password(data['password'])
     #create a new customer instance
     new_customer = Customers(**data) #Unpack the data dictionary into the Customer model
     
@@ -49,28 +56,52 @@ def create_customer():
     return customer_schema.jsonify(new_customer), 201
 
 
+#____________________________IMPORT CUSTOMERS ROUTE____________________________
+
+#Body is a CSV file (Content-Type: text/csv, header row of column names) or NDJSON (application/x-ndjson), one customer per row.
+#Bad rows are reported by line number and skipped, see app/utility/importer.py. Big files go through the CLI (413 here).
+@customers_bp.route('/import', methods=['POST'])
+@token_required
+@mechanic_required
+def import_customers():
+    fmt = import_format(request.content_type)
+    if fmt is None:
+        return jsonify({"message": "Send text/csv or application/x-ndjson"}), 415
+    try:
+        rows = request_rows(request, fmt)
+    except ImportTooLarge as err:
+        return jsonify({"message": str(err)}), 413
+    return jsonify(import_rows(Customers, customer_schema, rows, hash_batch=HTTP_HASH_BATCH)), 200
+
+
 #____________________________READ ALL CUSTOMERS ROUTE____________________________
 #read all customers. Only mechanics can see all customers. 
+#?fields=id,first_name,... picks the columns, only those are selected. Passwords are never returned.
 @customers_bp.route("", methods=['GET'])
 @token_required
 @mechanic_required
 def get_customers():
-    customers = db.session.query(Customers).all()
-    return customers_schema.jsonify(customers), 200
+    try:
+        serializer = customers_fast.only(get_fields_arg(customers_fast.fields))
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+    if wants_ndjson():
+        return stream_ndjson(select(Customers).options(load_only(*serializer.columns)).order_by(Customers.id), serializer)
+    customers = db.session.execute(select(*serializer.columns).order_by(Customers.id)).all()
+    return serializer.jsonify(customers), 200
 
 
 #____________________________READ A SINGLE CUSTOMER ROUTE____________________________
 
 @customers_bp.route('/<int:customer_id>', methods=['GET'])
 @token_required
+@customer_required
+@self_required('customer_id', 'Access forbidden: You can only view your own customer data')
 def get_customer(customer_id):
-    # Query by primary key
-    customer = db.session.get(Customers, customer_id)
+    customer = current_user()
 
     if not customer:
         return jsonify({'message': 'Customer not found'}), 404
-    if str(customer.id) != request.logged_in_user_id:
-        return jsonify({'message': 'Access forbidden: You can only view your own customer data'}), 403
         
     response = {
         'id': customer.id,
@@ -88,12 +119,11 @@ def get_customer(customer_id):
 @customers_bp.route('/<int:customer_id>', methods=['DELETE'])
 @token_required
 @customer_required
+@self_required('customer_id', "You can only delete your own account")
 def delete_customer(customer_id):
-    customer = db.session.get(Customers, customer_id)
+    customer = current_user()
     if not customer:
         return jsonify({"message": "Customer not found"}), 404
-    if str(customer.id) != request.logged_in_user_id:
-        return jsonify({"message": "You can only delete your own account"}), 403
     
     
     db.session.delete(customer)
@@ -106,13 +136,11 @@ def delete_customer(customer_id):
 @customers_bp.route('/<int:customer_id>', methods=["PUT"])
 @token_required
 @customer_required
+@self_required('customer_id', "You can only update your own account")
 def update_customer(customer_id):
-    #Query the customer by id
-    customer = db.session.get(Customers, customer_id) #Query for our customer to update
+    customer = current_user() #Our customer to update
     if not customer: #Checking if I got a customer with that id
         return jsonify({"message": "Customer not found"}), 404 
-    if str(customer.id) != request.logged_in_user_id:
-        return jsonify({"message": "You can only update your own account"}), 403
     #Validate and Deserialize the updates that they are sending in the body of the request
     try:
         customer_data = customer_schema.load(request.json, partial=True) #partial=True allows us to only send some of the fields to update
@@ -122,6 +150,8 @@ def update_customer(customer_id):
     
     
     for key, value in customer_data.items():
+        if key == 'password':
+            value = hash_password(value)
         setattr(customer, key, value)
     
     db.session.commit() #Save the changes to the database
@@ -132,20 +162,18 @@ def update_customer(customer_id):
 @customers_bp.route('/my_tickets', methods=['GET'])
 @token_required
 @customer_required
+@cached_view(lambda: [f"customer_tickets:{current_principal().id}"])
 def get_my_tickets():
-    customer_id = request.logged_in_user_id #Get the customer ID from the token
-    customer = db.session.get(Customers, customer_id) #Query for the customer
+    customer = current_user() #The customer from the token
     if not customer:
         return jsonify({"message": "Customer not found"}), 404 #If no customer found, return 404
-    if str(customer.id) != request.logged_in_user_id:
-        return jsonify({"message": "You can only view your own tickets"}), 403
     
     tickets = customer.service_tickets_customer
     if not tickets:
         return jsonify({"message": "No service tickets found"}), 404
     
     
-    return service_tickets_schema.jsonify(tickets), 200
+    return service_tickets_fast.jsonify(tickets), 200
 
 
 #___________logout route (for token-based auth, this is typically handled on the client side)___________
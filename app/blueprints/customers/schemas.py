@@ -1,13 +1,18 @@
 from dataclasses import fields
 from app.extensions import ma
+from app.utility.serializers import FastSerializer
 from app.models import Customers
 
 class CustomerSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Customers
+        load_only = ('password',) #the hash is read from requests but never written into a response
         
         
 customer_schema = CustomerSchema()
 customers_schema = CustomerSchema(many=True)   
 login_customer_schema = CustomerSchema(only=('email','password'))
 
+#same output, compiled, for the list endpoints (see app/utility/serializers.py)
+customers_fast = FastSerializer(customers_schema)
+
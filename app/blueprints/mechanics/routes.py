@@ -1,11 +1,17 @@
 from app.blueprints.mechanics import mechanics_bp
-from .schemas import mechanic_schema, mechanics_schema, login_mechanic_schema
-from app.blueprints.Service_Tickets.schemas import service_tickets_schema
+from .schemas import mechanic_schema, login_mechanic_schema, mechanics_fast
+from app.blueprints.Service_Tickets.schemas import service_tickets_fast
 from flask import request, jsonify
 from marshmallow import ValidationError
 from app.models import db, Mechanics
-from werkzeug.security import generate_password_hash, check_password_hash
-from app.utility.auth import encode_token, mechanic_required, token_required
+from app.utility.passwords import check_and_upgrade, hash_password
+from app.utility.auth import current_principal, current_user, encode_token, mechanic_required, self_required, token_required
+from app.utility.caching import cached_view
+from app.utility.pagination import PaginationError, get_fields_arg
+from app.utility.streaming import wants_ndjson, stream_ndjson
+from app.utility.importer import HTTP_HASH_BATCH, ImportTooLarge, import_format, import_rows, request_rows
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
 
 
 #________________________#MECHANIC LOGIN ROUTE________________________
@@ -21,8 +27,9 @@ def login_mechanic():
     
     mechanic = db.session.query(Mechanics).filter_by(email=data['email']).first()
     
-    if not mechanic or not check_password_hash(mechanic.password, data['password']):
+    if not mechanic or not check_and_upgrade(mechanic, data['password']):
         return jsonify({"message": "Invalid email or password"}), 400
+    db.session.commit() #saves the new hash if the hash settings changed since their last login
     
     token = encode_token(mechanic.id, 'mechanic')
     
@@ -49,7 +56,7 @@ def create_mechanic():
     existing_mechanic_phone = db.session.query(Mechanics).filter_by(phone=data['phone']).first()
     if existing_mechanic_phone:
         return jsonify({"message": "Phone number already exists"}), 400
-    data['password'] = generate_password_hash(data['password'])
+    data['password'] = hash_password(data['password'])
     new_mechanic = Mechanics(**data)
     db.session.add(new_mechanic)
     db.session.commit()
@@ -58,18 +65,41 @@ def create_mechanic():
   
   
 
+#________________________#IMPORT MECHANICS ROUTE________________________
+
+#Body is a CSV file (Content-Type: text/csv, header row of column names) or NDJSON (application/x-ndjson), one mechanic per row.
+#Bad rows are reported by line number and skipped, see app/utility/importer.py. Big files go through the CLI (413 here).
+@mechanics_bp.route('/import', methods=['POST'])
+@token_required
+@mechanic_required
+def import_mechanics():
+    fmt = import_format(request.content_type)
+    if fmt is None:
+        return jsonify({"message": "Send text/csv or application/x-ndjson"}), 415
+    try:
+        rows = request_rows(request, fmt)
+    except ImportTooLarge as err:
+        return jsonify({"message": str(err)}), 413
+    return jsonify(import_rows(Mechanics, mechanic_schema, rows, hash_batch=HTTP_HASH_BATCH)), 200
+
+
 #________________________#READ MECHANICS ROUTES________________________
 
+#?fields=id,first_name,... picks the columns, only those are selected. Passwords are never returned.
 @mechanics_bp.route('', methods=['GET'])
 @token_required
 @mechanic_required
 def get_mechanics():
-    mechanics = db.session.query(Mechanics).all()
-    if request.logged_in_role != 'mechanic':
-        return jsonify({'message': 'Access forbidden: Mechanics only'}), 403
+    try:
+        serializer = mechanics_fast.only(get_fields_arg(mechanics_fast.fields))
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+    if wants_ndjson():
+        return stream_ndjson(select(Mechanics).options(load_only(*serializer.columns)).order_by(Mechanics.id), serializer)
+    mechanics = db.session.execute(select(*serializer.columns).order_by(Mechanics.id)).all()
     if not mechanics:
         return jsonify({"message": "No mechanics found"}), 404
-    return mechanics_schema.jsonify(mechanics), 200
+    return serializer.jsonify(mechanics), 200
   
 
 #________________________#READ A MECHANIC ROUTE________________________
@@ -79,8 +109,6 @@ def get_mechanics():
 @mechanic_required
 def get_mechanic(mechanic_id):
     mechanic = db.session.get(Mechanics, mechanic_id)
-    if request.logged_in_role != 'mechanic':
-        return jsonify({'message': 'Access forbidden: Mechanics only'}), 403
     if not mechanic:
         return jsonify({"message": "Mechanic not found"}), 404
     return mechanic_schema.jsonify(mechanic), 200
@@ -91,12 +119,11 @@ def get_mechanic(mechanic_id):
 @mechanics_bp.route("/<int:mechanic_id>", methods=['DELETE']) #Deleted the ID in the route so that users can only delete their own info
 @token_required
 @mechanic_required
+@self_required('mechanic_id', "You can only delete your own account")
 def delete_mechanic(mechanic_id):
-    mechanic = db.session.get(Mechanics, mechanic_id)
+    mechanic = current_user()
     if not mechanic:
         return jsonify({"message": "Mechanic not found"}), 404
-    if str(mechanic.id) != request.logged_in_user_id:
-        return jsonify({"message": "You can only delete your own account"}), 403
     
     db.session.delete(mechanic)
     db.session.commit()
@@ -110,13 +137,10 @@ def delete_mechanic(mechanic_id):
 @token_required
 @mechanic_required
 def update_mechanic():
-    mechanic_id = request.logged_in_user_id
-    mechanic = db.session.get(Mechanics, mechanic_id) #Query for our mechanic to update
+    mechanic = current_user() #the mechanic from the token, no id in the route so it's always their own account
     
     if not mechanic: #Checking if I got a mechanic with that id
         return jsonify({"message": "Mechanic not found"}), 404
-    if str(mechanic.id) != request.logged_in_user_id:
-        return jsonify({"message": "You can only update your own account"}), 403
     
     #Validate and Deserialize the updates that they are sending in the body of the request
     try:
@@ -126,7 +150,7 @@ def update_mechanic():
       
     for key, value in mechanic_data.items():
         if key == 'password':
-            value = generate_password_hash(value)
+            value = hash_password(value)
         setattr(mechanic, key, value)  #Set the attribute on the mechanic instance
     
     db.session.commit() #Save the changes to the database
@@ -137,15 +161,15 @@ def update_mechanic():
 @mechanics_bp.route('/my_tickets', methods=['GET'])
 @token_required
 @mechanic_required
+@cached_view(lambda: [f"mechanic_tickets:{current_principal().id}"])
 def get_my_tickets():
-    mechanic_id = request.logged_in_user_id #Get the mechanic ID from the token
-    mechanic = db.session.get(Mechanics, mechanic_id) #Query for the mechanic
+    mechanic = current_user() #The mechanic from the token
     if not mechanic:
         return jsonify({"message": "Mechanic not found"}), 404 #If no mechanic found, return 404
     tickets = mechanic.service_tickets_mechanics #Create a variable and show the tickets associated with that mechanic based on the relationship defined in the model. 
     if not tickets:
         return jsonify({"message": "No tickets found for this mechanic"}), 404
-    return service_tickets_schema.jsonify(tickets), 200
+    return service_tickets_fast.jsonify(tickets), 200
   
   
 #____________________LOGOUT ROUTE (for token-based auth, this is typically handled on the client side)____________________
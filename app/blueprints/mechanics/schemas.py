@@ -1,10 +1,15 @@
 from app.extensions import ma
+from app.utility.serializers import FastSerializer
 from app.models import Mechanics
 
 class MechanicSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Mechanics
+        load_only = ('password',) #the hash is read from requests but never written into a response
 
 mechanic_schema = MechanicSchema()
 mechanics_schema = MechanicSchema(many=True)
-login_mechanic_schema = MechanicSchema(only=['email', 'password'])
\ No newline at end of file
+login_mechanic_schema = MechanicSchema(only=['email', 'password'])
+
+#same output, compiled, for the list endpoints (see app/utility/serializers.py)
+mechanics_fast = FastSerializer(mechanics_schema)
@@ -1,9 +1,16 @@
 from app.utility.auth import mechanic_required, token_required
 from . import parts_bp
-from .schemas import parts_schema, part_schema
+from .schemas import part_schema, parts_fast
 from flask import request, jsonify
 from marshmallow import ValidationError
-from app.models import Parts, db, Service_Ticket_Parts
+from app.models import Parts, Reorder_Queue, db, Service_Ticket_Parts
+from app.utility.inventory import return_stock, retry_on_lock
+from app.utility.ledger import parse_utc, stock_at, utc_now
+from app.utility.pagination import PaginationError, get_fields_arg, get_limit
+from app.utility.streaming import wants_ndjson, stream_ndjson
+from app.utility.importer import HTTP_HASH_BATCH, ImportTooLarge, import_format, import_rows, request_rows
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only
 
 #_________________CREATE PART______________________
 @parts_bp.route('', methods=['POST'])
@@ -11,8 +18,6 @@ from app.models import Parts, db, Service_Ticket_Parts
 @mechanic_required
 def create_part():
     
-    if request.logged_in_role != 'mechanic':
-        return jsonify({'message': 'Access forbidden: Mechanics only'}), 403
     try:
         data = part_schema.load(request.json)
     except ValidationError as err:
@@ -23,16 +28,58 @@ def create_part():
     db.session.commit()
     return part_schema.jsonify(new_part), 201
 
+#__________________IMPORT PARTS______________________
+
+#Body is a CSV file (Content-Type: text/csv, header row of column names) or NDJSON (application/x-ndjson), one part per row.
+#Bad rows are reported by line number and skipped, see app/utility/importer.py. Big files go through the CLI (413 here).
+@parts_bp.route('/import', methods=['POST'])
+@token_required
+@mechanic_required
+def import_parts():
+    fmt = import_format(request.content_type)
+    if fmt is None:
+        return jsonify({"message": "Send text/csv or application/x-ndjson"}), 415
+    try:
+        rows = request_rows(request, fmt)
+    except ImportTooLarge as err:
+        return jsonify({"message": str(err)}), 413
+    return jsonify(import_rows(Parts, part_schema, rows, hash_batch=HTTP_HASH_BATCH)), 200
+
+
 #__________________GET ALL PARTS______________________
 @parts_bp.route('', methods=['GET'])
 @token_required
 @mechanic_required
 def get_parts():
-    if request.logged_in_role != 'mechanic':
-        return jsonify({'message': 'Access forbidden: Mechanics only'}), 403
+    try:
+        serializer = parts_fast.only(get_fields_arg(parts_fast.fields)) #?fields=id,part_name,...
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+    if wants_ndjson():
+        return stream_ndjson(select(Parts).options(load_only(*serializer.columns)).order_by(Parts.id), serializer)
     
-    parts = db.session.query(Parts).all()
-    return parts_schema.jsonify(parts), 200
+    parts = db.session.execute(select(*serializer.columns).order_by(Parts.id)).all()
+    return serializer.jsonify(parts), 200
+
+#__________________LOW STOCK PARTS______________________
+#parts at or under their reorder threshold, the ones that went low first at the top. Read from the reorder queue
+#(app/utility/reorder.py), not by filtering every part. ?limit= (default 25, max 200), total is the whole queue.
+@parts_bp.route('/low_stock', methods=['GET'])
+@token_required
+@mechanic_required
+def get_low_stock():
+    try:
+        limit = get_limit()
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+    rows = db.session.execute(
+        select(Parts.id, Parts.part_name, Parts.stock, Parts.reorder_threshold, Reorder_Queue.queued_at)
+        .join(Reorder_Queue, Reorder_Queue.part_id == Parts.id)
+        .order_by(Reorder_Queue.queued_at, Reorder_Queue.part_id)
+        .limit(limit)
+    ).mappings().all()
+    total = db.session.scalar(select(func.count()).select_from(Reorder_Queue))
+    return jsonify({"parts": [dict(row) for row in rows], "total": total}), 200
 
 #__________________GET PART BY ID______________________
 
@@ -41,20 +88,32 @@ def get_parts():
 @token_required
 @mechanic_required
 def get_part_by_id(part_id):
-    if request.logged_in_role != 'mechanic':
-        return jsonify({'message': 'Access forbidden: Mechanics only'}), 403
     part = db.session.get(Parts, part_id)
     if not part:
         return jsonify({"message": "Part not found"}), 404
     return part_schema.jsonify(part), 200
 
+#__________________STOCK AT A POINT IN TIME______________________
+#?at=2026-10-18T09:30:00 (UTC unless it has an offset, default now). Answered from the stock ledger, the nearest
+#snapshot before at plus the movements after it (app/utility/ledger.py). Deleted parts still have their history.
+@parts_bp.route('/<int:part_id>/stock', methods=['GET'])
+@token_required
+@mechanic_required
+def get_part_stock_at(part_id):
+    try:
+        at = parse_utc(request.args['at']) if request.args.get('at') else utc_now()
+    except ValueError:
+        return jsonify({"message": "at must be an ISO 8601 date or datetime"}), 400
+    history = stock_at(db.session.connection(), part_id, at)
+    if history is None:
+        return jsonify({"message": f"No stock history for part {part_id} at {at.isoformat()}"}), 404
+    return jsonify(history), 200
+
 #__________________UPDATE PART______________________
 @parts_bp.route('/<int:part_id>', methods=['PUT'])
 @token_required
 @mechanic_required
 def update_part(part_id):
-    if request.logged_in_role != 'mechanic':
-        return jsonify({'message': 'Access forbidden: Mechanics only'}), 403
     part = db.session.get(Parts, part_id)
     if not part:
         return jsonify({"message": "Part not found"}), 404
@@ -75,8 +134,6 @@ def update_part(part_id):
 @token_required
 @mechanic_required
 def delete_part():
-    if request.logged_in_role != 'mechanic':
-        return jsonify({'message': 'Access forbidden: Mechanics only'}), 403
     part_id = request.json.get('part_id')
     part = db.session.get(Parts, part_id)
     if not part:
@@ -97,8 +154,6 @@ def delete_part():
 @token_required
 @mechanic_required
 def add_stock():
-    if request.logged_in_role != 'mechanic':
-        return jsonify({'message': 'Access forbidden: Mechanics only'}), 403
     part_id = request.json.get('part_id')
     part = db.session.get(Parts, part_id)
     if not part:
@@ -111,7 +166,7 @@ def add_stock():
     except (TypeError, ValueError):
         return jsonify({"message": "Invalid input for additional stock"}), 400
     
-    part.stock += additional_stock 
+    retry_on_lock(return_stock, part.id, additional_stock) #atomic stock = stock + n so concurrent deliveries don't overwrite each other
     db.session.commit()
     return jsonify({"message": f"Successfully added {additional_stock} to part {part_id}. New stock: {part.stock}"}), 200
 
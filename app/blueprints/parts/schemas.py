@@ -1,11 +1,18 @@
+from marshmallow import validate
 from app.extensions import ma
+from app.utility.serializers import FastSerializer
 from app.models import Parts
 
 class PartSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Parts
+    
+    reorder_threshold = ma.auto_field(validate=validate.Range(min=0))
         
 
 part_schema = PartSchema()
 parts_schema = PartSchema(many=True)
 
+#same output, compiled, for the list endpoints (see app/utility/serializers.py)
+parts_fast = FastSerializer(parts_schema)
+
@@ -0,0 +1,113 @@
+from sqlalchemy import Date, case, cast, func, select
+from app.models import db, Daily_Part_Rollups, Daily_Ticket_Rollups, Mechanics, OPEN_STATUSES, Parts, Service_Tickets, mechanic_service_ticket
+
+#Every report is one GROUP BY in the database, we only shape the rows into dicts here.
+#A few date functions differ between SQLite and Postgres, the helpers below pick the right one.
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+#Monday of the row's week
+def _week_start(column):
+    if _dialect() == 'postgresql':
+        return cast(func.date_trunc('week', column), Date)
+    return func.date(column, '-6 days', 'weekday 1') #back 6 days, then forward to the next Monday
+
+
+def _days_between(start, end):
+    if _dialect() == 'postgresql':
+        return end - start #date - date is already a number of days
+    return func.julianday(end) - func.julianday(start)
+
+
+def _isoformat(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _date_filters(query, column, date_from, date_to):
+    if date_from:
+        query = query.where(column >= date_from)
+    if date_to:
+        query = query.where(column <= date_to)
+    return query
+
+
+#Ticket count and revenue (sum of the ticket totals) per day or week the tickets were opened.
+#Reads the daily rollups (app/utility/rollups.py), so the cost follows the number of days, not tickets.
+def revenue(period='day', date_from=None, date_to=None, status=None):
+    day = Daily_Ticket_Rollups.day
+    bucket = day if period == 'day' else _week_start(day)
+    query = select(
+        bucket.label('period'),
+        func.sum(Daily_Ticket_Rollups.tickets).label('tickets'),
+        func.sum(Daily_Ticket_Rollups.revenue_cents).label('revenue_cents')
+    ).group_by(bucket).order_by(bucket)
+    query = _date_filters(query, day, date_from, date_to)
+    if status:
+        query = query.where(Daily_Ticket_Rollups.status == status)
+    return [
+        {"period": _isoformat(row.period), "tickets": row.tickets, "revenue_cents": row.revenue_cents, "revenue": row.revenue_cents / 100}
+        for row in db.session.execute(query)
+    ]
+
+
+#Parts by quantity used on tickets (opened in the date range), with what they billed. Also from the rollups.
+def top_parts(limit, date_from=None, date_to=None):
+    quantity = func.sum(Daily_Part_Rollups.quantity)
+    query = (
+        select(
+            Parts.id, Parts.part_name, quantity.label('quantity'),
+            func.sum(Daily_Part_Rollups.revenue_cents).label('revenue_cents'),
+            func.sum(Daily_Part_Rollups.lines).label('tickets')
+        )
+        .join(Parts, Parts.id == Daily_Part_Rollups.part_id)
+        .group_by(Parts.id, Parts.part_name)
+        .order_by(quantity.desc(), Parts.id)
+        .limit(limit)
+    )
+    query = _date_filters(query, Daily_Part_Rollups.day, date_from, date_to)
+    return [
+        {"part_id": row.id, "part_name": row.part_name, "quantity": row.quantity, "tickets": row.tickets,
+         "revenue_cents": row.revenue_cents, "revenue": row.revenue_cents / 100}
+        for row in db.session.execute(query)
+    ]
+
+
+#Tickets and revenue per status across all days, the numbers the dashboards poll
+def status_totals():
+    query = select(
+        Daily_Ticket_Rollups.status,
+        func.sum(Daily_Ticket_Rollups.tickets).label('tickets'),
+        func.sum(Daily_Ticket_Rollups.revenue_cents).label('revenue_cents')
+    ).group_by(Daily_Ticket_Rollups.status).order_by(Daily_Ticket_Rollups.status)
+    return [
+        {"status": row.status, "tickets": row.tickets, "revenue_cents": row.revenue_cents, "revenue": row.revenue_cents / 100}
+        for row in db.session.execute(query)
+    ]
+
+
+#Per mechanic: open tickets, completed tickets and average days from date_created to completion_date.
+#Outer joins so mechanics with nothing assigned still show up with zeros.
+def mechanic_workload():
+    is_open = Service_Tickets.status.in_(OPEN_STATUSES)
+    is_done = Service_Tickets.completion_date.is_not(None)
+    query = (
+        select(
+            Mechanics.id, Mechanics.first_name, Mechanics.last_name, Mechanics.specialty,
+            func.count(case((is_open, Service_Tickets.id))).label('open_tickets'),
+            func.count(case((is_done, Service_Tickets.id))).label('completed_tickets'),
+            func.avg(case((is_done, _days_between(Service_Tickets.date_created, Service_Tickets.completion_date)))).label('avg_turnaround_days')
+        )
+        .outerjoin(mechanic_service_ticket, mechanic_service_ticket.c.mechanic_id == Mechanics.id)
+        .outerjoin(Service_Tickets, Service_Tickets.id == mechanic_service_ticket.c.service_ticket_id)
+        .group_by(Mechanics.id, Mechanics.first_name, Mechanics.last_name, Mechanics.specialty)
+        .order_by(func.count(case((is_open, Service_Tickets.id))).desc(), Mechanics.id)
+    )
+    return [
+        {"mechanic_id": row.id, "name": f"{row.first_name} {row.last_name}", "specialty": row.specialty,
+         "open_tickets": row.open_tickets, "completed_tickets": row.completed_tickets,
+         "avg_turnaround_days": round(float(row.avg_turnaround_days), 2) if row.avg_turnaround_days is not None else None}
+        for row in db.session.execute(query)
+    ]
@@ -0,0 +1,60 @@
+from app.utility.auth import mechanic_required, token_required
+from app.utility.caching import cached_view
+from app.utility.pagination import PaginationError, get_limit, get_date_arg
+from . import reports_bp
+from .queries import revenue, top_parts, status_totals, mechanic_workload
+from flask import request, jsonify
+
+#Reports are cached under the "reports" namespace, which every committed ticket, line item or assignment change
+#bumps (app/utility/caching.py), so a dashboard polling them only costs a GROUP BY after something changed.
+REPORT_CACHE_TIMEOUT = 300
+
+
+#__________________REVENUE______________________
+#GET /reports/revenue?period=day|week&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD&status=Complete
+@reports_bp.route('/revenue', methods=['GET'])
+@token_required
+@mechanic_required
+@cached_view(lambda: ['reports'], timeout=REPORT_CACHE_TIMEOUT)
+def get_revenue():
+    period = request.args.get('period', 'day')
+    if period not in ('day', 'week'):
+        return jsonify({"message": "period must be day or week"}), 400
+    try:
+        rows = revenue(period, get_date_arg('date_from'), get_date_arg('date_to'), request.args.get('status'))
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({"period": period, "rows": rows}), 200
+
+
+#__________________TOP PARTS______________________
+#GET /reports/top_parts?limit=10&date_from=...&date_to=...
+@reports_bp.route('/top_parts', methods=['GET'])
+@token_required
+@mechanic_required
+@cached_view(lambda: ['reports'], timeout=REPORT_CACHE_TIMEOUT)
+def get_top_parts():
+    try:
+        rows = top_parts(get_limit(), get_date_arg('date_from'), get_date_arg('date_to'))
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({"parts": rows}), 200
+
+
+#__________________STATUS TOTALS______________________
+#Tickets and revenue per status, straight off the rollups. Cheap enough to poll every few seconds.
+@reports_bp.route('/status_totals', methods=['GET'])
+@token_required
+@mechanic_required
+@cached_view(lambda: ['reports'], timeout=REPORT_CACHE_TIMEOUT)
+def get_status_totals():
+    return jsonify({"statuses": status_totals()}), 200
+
+
+#__________________MECHANIC WORKLOAD______________________
+@reports_bp.route('/mechanic_workload', methods=['GET'])
+@token_required
+@mechanic_required
+@cached_view(lambda: ['reports'], timeout=REPORT_CACHE_TIMEOUT)
+def get_mechanic_workload():
+    return jsonify({"mechanics": mechanic_workload()}), 200
@@ -0,0 +1,30 @@
+from app.utility.auth import mechanic_required, token_required
+from app.utility.pagination import PaginationError, get_limit
+from app.utility.search import MAX_RESULTS, SEARCH_INDEXES, search
+from . import search_bp
+from flask import request, jsonify
+
+
+#__________________SEARCH______________________
+#GET /search?q=brake&types=parts,service_tickets&limit=20
+#Every word in q has to match (as a prefix) somewhere in the row. Results from all types come back in one list,
+#best match first. Mechanics only, the results include customer contact details.
+@search_bp.route('', methods=['GET'])
+@token_required
+@mechanic_required
+def search_all():
+    query = request.args.get('q', '').strip()
+    if len(query) < 2:
+        return jsonify({"message": "q must be at least 2 characters"}), 400
+
+    kinds = [kind.strip() for kind in request.args.get('types', '').split(',') if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in SEARCH_INDEXES]
+    if unknown:
+        return jsonify({"message": f"Unknown types: {', '.join(unknown)}. Use {', '.join(SEARCH_INDEXES)}"}), 400
+    try:
+        limit = min(get_limit(), MAX_RESULTS)
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+
+    results = search(query, kinds or None, limit=limit)
+    return jsonify({"query": query, "results": results}), 200
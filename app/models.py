@@ -1,8 +1,8 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Float, Table
-from datetime import date
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Float, Table, Index, text
+from datetime import date, datetime
 
 #Base Class
 class Base(DeclarativeBase):
@@ -14,11 +14,13 @@ db = SQLAlchemy(model_class=Base)
 
 #junction table object
 #many to many relationship between mechanics and service tickets
+#(mechanic_id, service_ticket_id) is the primary key so a mechanic can't be assigned twice and mechanic -> tickets
+#is an index lookup. The extra index on service_ticket_id covers ticket -> mechanics.
 mechanic_service_ticket = Table(
     "mechanic_service_ticket", 
     Base.metadata,
-    Column("mechanic_id", Integer, ForeignKey("mechanics.id")),
-    Column("service_ticket_id", Integer, ForeignKey("service_tickets.id"))
+    Column("mechanic_id", Integer, ForeignKey("mechanics.id"), primary_key=True),
+    Column("service_ticket_id", Integer, ForeignKey("service_tickets.id"), primary_key=True, index=True)
 )
 #___________________________CUSTOMERS_____________________________
 
@@ -29,7 +31,7 @@ class Customers(Base):
     first_name: Mapped[str] = mapped_column(String(150), nullable=False)
     last_name: Mapped[str] = mapped_column(String(150), nullable=False)
     email: Mapped[str] = mapped_column(String(250), nullable=False, unique=True)
-    password: Mapped[str] = mapped_column(String(128), nullable=False)
+    password: Mapped[str] = mapped_column(String(256), nullable=False) #scrypt hashes are ~160 chars
     phone: Mapped[str] = mapped_column(String(20), nullable=False, unique=True)
     address: Mapped[str] = mapped_column(String(300), nullable=False)
     role: Mapped[str] = mapped_column(String(50), nullable=False, default="customer")
@@ -41,19 +43,27 @@ class Customers(Base):
 
 #___________________________SERVICE TICKETS_____________________________
 
+OPEN_STATUSES = ("Pending", "In Progress") #a ticket in one of these still needs work, "Complete" is the only closed one
+STATUSES = OPEN_STATUSES + ("Complete",)
+#status -> the statuses a ticket may move to it from. Complete is final.
+STATUS_TRANSITIONS = {
+    "In Progress": ("Pending",),
+    "Complete": ("Pending", "In Progress"),
+}
+
 class Service_Tickets(Base):
     __tablename__ = "service_tickets"
     
     id: Mapped[int] = mapped_column(primary_key=True)
-    customer_id: Mapped[int] = mapped_column (Integer, ForeignKey("customers.id"), nullable=False)
+    customer_id: Mapped[int] = mapped_column (Integer, ForeignKey("customers.id"), nullable=False, index=True)
     vehicle_make: Mapped[str] = mapped_column(String(100), nullable=False)
     vehicle_model: Mapped[str] = mapped_column(String(100), nullable=False)
     vehicle_year: Mapped[int] = mapped_column(nullable=False)
     service_description: Mapped[str] = mapped_column(String(500), nullable=False)
-    date_created: Mapped[date] = mapped_column(Date, default=date.today, nullable=False)
+    date_created: Mapped[date] = mapped_column(Date, default=date.today, nullable=False, index=True) #also serves the (date_created, id) keyset pagination
     price: Mapped[float] = mapped_column(Float, default=0.0, nullable=True)
-    status: Mapped[str] = mapped_column(String(50), nullable=False, default="Pending")
-    parts: Mapped[str] = mapped_column(String(500), nullable=True)
+    total_cents: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False) #running total of the line items, price is kept as total_cents / 100
+    status: Mapped[str] = mapped_column(String(50), nullable=False, default="Pending", index=True)
     completion_date: Mapped[date] = mapped_column(Date, nullable=True)
 
     
@@ -80,7 +90,7 @@ class Mechanics(Base):
     specialty: Mapped[str] = mapped_column(String(200), nullable=False)
     phone: Mapped[str] = mapped_column(String(20), nullable=False, unique=True)
     email: Mapped[str] = mapped_column(String(250), nullable=False, unique=True)
-    password: Mapped[str] = mapped_column(String(128), nullable=False)
+    password: Mapped[str] = mapped_column(String(256), nullable=False) #scrypt hashes are ~160 chars
     role: Mapped[str] = mapped_column(String(50), nullable=False, default="mechanic")
     
     #--------RELATIONSHIPS---------
@@ -90,13 +100,23 @@ class Mechanics(Base):
 
 #___________________________PARTS_____________________________
 
+LOW_STOCK = "stock <= reorder_threshold"
+
 class Parts(Base):
     __tablename__ = "parts"
+    __table_args__ = (
+        #partial index, only the parts at or under their reorder threshold are in it, so finding them reads a handful
+        #of index entries instead of scanning parts
+        Index("ix_parts_low_stock", "id", sqlite_where=text(LOW_STOCK), postgresql_where=text(LOW_STOCK)),
+        #the stock ledger outlives deleted parts, so SQLite mustn't hand a deleted part's id to a new one
+        {"sqlite_autoincrement": True},
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     part_name: Mapped[str] = mapped_column(String(200), nullable=False)
     price: Mapped[float] = mapped_column(Float, nullable=False)
-    stock: Mapped[int] = mapped_column(Integer, nullable=False)
+    stock: Mapped[int] = mapped_column(Integer, nullable=False, active_history=True) #old value always loaded on change, the stock ledger records the difference
+    reorder_threshold: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0") #stock at or below this puts the part on the reorder queue
     
     #--------RELATIONSHIPS---------
     
@@ -107,11 +127,16 @@ class Parts(Base):
 
 class Service_Ticket_Parts(Base): #association table to show the many to many relationship between service tickets and parts
     __tablename__ = "service_ticket_parts"
+    __table_args__ = (
+        #one line per part per ticket, and the index behind every (service_ticket_id, part_id) lookup
+        Index("uq_service_ticket_parts_ticket_part", "service_ticket_id", "part_id", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     service_ticket_id: Mapped[int] = mapped_column(Integer, ForeignKey("service_tickets.id"), nullable=True)
-    part_id: Mapped[int] = mapped_column(Integer, ForeignKey("parts.id"), nullable=False)
+    part_id: Mapped[int] = mapped_column(Integer, ForeignKey("parts.id"), nullable=False, index=True)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    unit_price_cents: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False) #part price when it was first added to the ticket
     
     #--------RELATIONSHIPS---------
     #many to one with service tickets
@@ -121,3 +146,67 @@ class Service_Ticket_Parts(Base): #association table to show the many to many re
     part: Mapped["Parts"] = relationship("Parts", back_populates="service_tickets_parts")
 
 
+
+#__________________DAILY ROLLUPS_____________________
+#Running totals for the dashboards, kept up to date by app/utility/rollups.py on every ticket / line item write.
+#"flask rollups rebuild" recomputes them from the base tables.
+
+class Daily_Ticket_Rollups(Base): #tickets and revenue per day created x status
+    __tablename__ = "daily_ticket_rollups"
+    
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    status: Mapped[str] = mapped_column(String(50), primary_key=True)
+    tickets: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue_cents: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class Daily_Part_Rollups(Base): #parts used per part x day the ticket was created
+    __tablename__ = "daily_part_rollups"
+    
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    part_id: Mapped[int] = mapped_column(Integer, ForeignKey("parts.id"), primary_key=True)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue_cents: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lines: Mapped[int] = mapped_column(Integer, nullable=False, default=0) #one line per part per ticket, so this is the ticket count
+
+
+#__________________REORDER QUEUE_____________________
+#Parts that are at or under their reorder threshold, kept in step with parts.stock by app/utility/reorder.py.
+#"flask reorder rebuild" recomputes it from parts.
+
+class Reorder_Queue(Base):
+    __tablename__ = "reorder_queue"
+    
+    part_id: Mapped[int] = mapped_column(Integer, ForeignKey("parts.id", ondelete="CASCADE"), primary_key=True)
+    queued_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True) #when the part went low, the queue is served oldest first
+
+
+#__________________STOCK LEDGER_____________________
+#Append-only history of parts.stock, written by app/utility/ledger.py in the same transaction as every change, plus a
+#checkpoint of each part's stock every STOCK_SNAPSHOT_EVERY movements so "stock at time T" starts from the nearest
+#checkpoint instead of replaying everything. No foreign keys: the history stays when a part or ticket is deleted.
+
+class Stock_Movements(Base):
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        Index("ix_stock_movements_part_id_id", "part_id", "id"), #one part's movements between two checkpoints
+    )
+    
+    id: Mapped[int] = mapped_column(primary_key=True)
+    part_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False) #signed: + into stock, - out of it
+    reason: Mapped[str] = mapped_column(String(20), nullable=False) #created, imported, adjusted, deleted, used, returned, delivery
+    service_ticket_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False) #UTC
+
+
+class Stock_Snapshots(Base): #stock of a part right after one of its movements (movement 0 = when the ledger started)
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (
+        Index("ix_stock_snapshots_part_id_taken_at", "part_id", "taken_at"),
+    )
+    
+    part_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    movement_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    stock: Mapped[int] = mapped_column(Integer, nullable=False)
+    taken_at: Mapped[datetime] = mapped_column(DateTime, nullable=False) #UTC, the created_at of that movement
@@ -1,10 +1,64 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import cached_property
 from datetime import datetime, timedelta, timezone
 from jose import jwt
 import jose
 from functools import wraps
-from flask import request, jsonify
+from flask import current_app, g, has_app_context, request, jsonify
+from app.models import db, Customers, Mechanics
+
+try:
+    import jwt as pyjwt #PyJWT, optional. pip install PyJWT and set JWT_BACKEND = "pyjwt"
+except ImportError:
+    pyjwt = None
+
+logger = logging.getLogger(__name__)
 
 SECRET_KEY = "supersecretkey"
+ALGORITHM = 'HS256'
+DEFAULT_TOKEN_CACHE_SIZE = 1024
+
+
+class TokenExpired(Exception):
+    pass
+
+
+class TokenInvalid(Exception):
+    pass
+
+
+#_____________________BACKENDS_____________________
+#python-jose is the default. JWT_BACKEND = "pyjwt" verifies with PyJWT instead when it's installed (tokens are the
+#same HS256 either way). Run benchmarks/bench_auth.py before switching, with the cache on the backend barely matters.
+#Both raise our own TokenExpired / TokenInvalid so the decorator doesn't care.
+
+def _backend():
+    name = current_app.config.get('JWT_BACKEND', 'jose') if has_app_context() else 'jose'
+    if name == 'pyjwt' and pyjwt is None:
+        logger.warning("JWT_BACKEND is pyjwt but PyJWT isn't installed, using python-jose")
+        return 'jose'
+    return name
+
+
+def _decode(token):
+    if _backend() == 'pyjwt':
+        try:
+            return pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except pyjwt.ExpiredSignatureError:
+            raise TokenExpired()
+        except pyjwt.PyJWTError:
+            raise TokenInvalid()
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jose.exceptions.ExpiredSignatureError:
+        raise TokenExpired()
+    except jose.exceptions.JWTError:
+        raise TokenInvalid()
+
 
 def encode_token(user_id, role):
     payload = {
@@ -13,9 +67,95 @@ def encode_token(user_id, role):
         'sub': str(user_id), #VERY IMPORTANT, SET YOUR USER ID TO A STRING
         'role': role
     }
-    token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+    if _backend() == 'pyjwt':
+        return pyjwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
+
+#_____________________VERIFIED TOKEN CACHE_____________________
+#Clients send the same token on every request for an hour, so once a token's signature checked out we keep its
+#payload in a small LRU keyed by sha256(token) and skip the HMAC + JSON decode next time. The key covers the whole
+#token including the signature, so a tampered token never matches an entry. exp is still checked on every hit.
+#Per process, size from JWT_CACHE_SIZE (0 turns it off).
+
+class TokenCache:
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                return None
+            if payload['exp'] <= time.time():
+                del self._entries[key]
+                raise TokenExpired()
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key, payload, max_size):
+        if max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
+#Returns the token's payload, from the cache when we've already verified it
+def verify_token(token):
+    max_size = current_app.config.get('JWT_CACHE_SIZE', DEFAULT_TOKEN_CACHE_SIZE)
+    if max_size <= 0:
+        return _decode(token)
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = _decode(token)
+        token_cache.put(key, payload, max_size)
+    return payload
+
+
+#_____________________PRINCIPAL_____________________
+#Who is making the request. token_required builds it from the token and puts it on flask.g, so everything after
+#that (policy decorators, routes, cache keys) reads the same object. The user row is only loaded if something asks
+#for principal.user, and then only once per request.
+
+USER_MODELS = {'mechanic': Mechanics, 'customer': Customers}
+
+
+class Principal:
+    def __init__(self, user_id, role):
+        self.id = int(user_id)
+        self.role = role
+
+    @cached_property
+    def user(self):
+        model = USER_MODELS.get(self.role)
+        return db.session.get(model, self.id) if model else None
+
+
+def current_principal():
+    return g.get('principal')
+
+
+#The logged in user's row (Mechanics or Customers), None if the account is gone
+def current_user():
+    return g.principal.user
+
+
 def token_required(f): #f stands for the function that is getting wrapped. Delete user function from routes is f. 
     @wraps(f)
     def decoration(*args, **kwargs): #The function that runs before the function that we're wrapping  
@@ -27,23 +167,27 @@ def token_required(f): #f stands for the function that is getting wrapped. Delet
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
         try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-            print(data)
-            request.logged_in_user_id = data['sub'] 
-            request.logged_in_role = data['role']
-        except jose.exceptions.ExpiredSignatureError:
+            data = verify_token(token)
+            g.principal = Principal(data['sub'], data['role'])
+        except TokenExpired:
             return jsonify({'message': 'Token has expired!'}), 403
-        except jose.exceptions.JWTError:
+        except (TokenInvalid, KeyError, ValueError):
             return jsonify({'message': 'Token is invalid!'}), 401
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("authenticated request", extra={'user_id': data['sub'], 'role': data['role'], 'path': request.path})
         
         return f(*args, **kwargs)
     
     return decoration
 
+#_____________________POLICY_____________________
+#All the role and ownership checks live here, routes just stack the decorators after @token_required.
+#None of them touch the database, they only look at the principal.
+
 def mechanic_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        if request.logged_in_role != 'mechanic':
+        if g.principal.role != 'mechanic':
             return jsonify({'message': 'Mechanic access required'}), 403
         return f(*args, **kwargs)
     return wrapper
@@ -51,7 +195,24 @@ def mechanic_required(f):
 def customer_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        if request.logged_in_role != 'customer':
+        if g.principal.role != 'customer':
             return jsonify({'message': 'Customer access required'}), 403
         return f(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+#The route's id_arg (e.g. customer_id in /customers/<customer_id>) has to be the logged in user's own id.
+#Goes under mechanic_required / customer_required, which settle what kind of account the id belongs to.
+def self_required(id_arg, message="You can only access your own account"):
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if kwargs.get(id_arg) != g.principal.id:
+                return jsonify({'message': message}), 403
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+#Mechanics can see every ticket, customers only their own
+def can_view_ticket(service_ticket):
+    principal = g.principal
+    return principal.role != 'customer' or service_ticket.customer_id == principal.id
@@ -0,0 +1,151 @@
+import hashlib
+import uuid
+from functools import wraps
+from flask import g, has_app_context, make_response, request
+from sqlalchemy import event, select
+from app.extensions import cache
+from app.models import db, Service_Tickets, Service_Ticket_Parts, Mechanics, Parts, mechanic_service_ticket
+from app.utility.streaming import wants_ndjson
+
+#Version-stamped read cache.
+#
+#Every cached read belongs to one or more namespaces:
+#   tickets                  - any ticket list (GET /service_tickets)
+#   ticket:<id>              - one ticket (GET /service_tickets/<id>, its invoice)
+#   customer_tickets:<id>    - a customer's my_tickets
+#   mechanic_tickets:<id>    - a mechanic's my_tickets
+#   reports                  - everything under /reports (any ticket, line item, assignment, mechanic or part change)
+#Each namespace has a version stored in the cache and the version is part of every key. When a transaction that
+#touched a ticket commits, the namespaces it affects get a new version, so the old entries are never read again
+#(they just expire). Nothing has to find and delete keys, which also works when the cache is shared by workers.
+
+TOUCHED_KEY = 'cache_touched_namespaces'
+
+
+def _version_key(namespace):
+    return f"ver:{namespace}"
+
+
+def _versions(namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = dict(zip(keys, cache.get_many(*keys)))
+    missing = {key: uuid.uuid4().hex for key, version in versions.items() if version is None}
+    if missing:
+        cache.set_many(missing, timeout=0) #0 = never expire, losing a version would make stale entries reachable
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(namespaces):
+    if namespaces:
+        cache.set_many({_version_key(namespace): uuid.uuid4().hex for namespace in namespaces}, timeout=0)
+
+
+#Mechanics all see the same data, customers only ever see their own, so that's the part of the user that goes in the key
+def _scope():
+    principal = g.get('principal')
+    if principal is None:
+        return 'anonymous'
+    if principal.role == 'customer':
+        return f"customer:{principal.id}"
+    return principal.role
+
+
+def view_cache_key(namespaces):
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    raw = "|".join([request.path, query, _scope()] + _versions(namespaces))
+    return "view:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+#Caches successful responses of a read route under versioned keys. namespaces gets the route's kwargs and returns
+#the namespaces the response depends on. Goes under @token_required so the key can include who is asking.
+def cached_view(namespaces, timeout=None):
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if wants_ndjson():
+                return f(*args, **kwargs)
+            key = view_cache_key(namespaces(**kwargs))
+            cached = cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                return make_response(body, 200, {'Content-Type': mimetype})
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                cache.set(key, (response.get_data(), response.content_type), timeout=timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+#_____________________INVALIDATION_____________________
+
+def _touched(session):
+    return session.info.setdefault(TOUCHED_KEY, set())
+
+
+#Records that these tickets changed. Looks up their customer and assigned mechanics so the right
+#my_tickets lists are invalidated too. Call it after writes the ORM doesn't see (Core UPDATE statements).
+def touch_tickets(session, ticket_ids, connection=None):
+    ticket_ids = set(ticket_ids)
+    if not ticket_ids:
+        return
+    touched = _touched(session)
+    touched.update({'tickets', 'reports'})
+    connection = connection or session.connection()
+    rows = connection.execute(
+        select(Service_Tickets.id, Service_Tickets.customer_id, mechanic_service_ticket.c.mechanic_id)
+        .outerjoin(mechanic_service_ticket, mechanic_service_ticket.c.service_ticket_id == Service_Tickets.id)
+        .where(Service_Tickets.id.in_(ticket_ids))
+    )
+    for ticket_id, customer_id, mechanic_id in rows:
+        touched.add(f"customer_tickets:{customer_id}")
+        if mechanic_id is not None:
+            touched.add(f"mechanic_tickets:{mechanic_id}")
+    touched.update(f"ticket:{ticket_id}" for ticket_id in ticket_ids)
+
+
+#Namespaces to bump when the session commits, for Core writes that aren't tickets
+def touch_namespaces(session, namespaces):
+    _touched(session).update(namespaces)
+
+
+def _after_flush(session, flush_context):
+    touched = _touched(session)
+    ticket_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Service_Tickets):
+            ticket_ids.add(obj.id)
+            if obj in session.deleted:
+                #the row is gone, so take what we need off the object
+                touched.update({'tickets', 'reports', f"ticket:{obj.id}", f"customer_tickets:{obj.customer_id}"})
+                for mechanic in obj.__dict__.get('mechanics_service_tickets', []):
+                    touched.add(f"mechanic_tickets:{mechanic.id}")
+        elif isinstance(obj, Service_Ticket_Parts):
+            ticket_ids.add(obj.service_ticket_id)
+        elif isinstance(obj, Mechanics):
+            #assign/remove changes the mechanic's side of the relationship too
+            touched.update({f"mechanic_tickets:{obj.id}", 'reports'})
+        elif isinstance(obj, Parts):
+            touched.add('reports') #part names show up in top_parts
+    ticket_ids.discard(None)
+    if ticket_ids:
+        touch_tickets(session, ticket_ids, connection=session.connection())
+
+
+def _after_commit(session):
+    namespaces = session.info.pop(TOUCHED_KEY, None)
+    if namespaces and has_app_context():
+        bump_versions(namespaces)
+
+
+def _after_rollback(session):
+    session.info.pop(TOUCHED_KEY, None)
+
+
+#Hooks the invalidation into every session commit. Safe to call once per create_app.
+def register_cache_invalidation():
+    for name, listener in (('after_flush', _after_flush), ('after_commit', _after_commit), ('after_rollback', _after_rollback)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
@@ -0,0 +1,24 @@
+from sqlalchemy import event
+from app.models import db
+
+
+#Runs the PRAGMA statements on every new DBAPI connection. Most SQLite pragmas (synchronous, busy_timeout,
+#mmap_size, cache_size) only last for the connection, so setting them once at startup isn't enough.
+def apply_sqlite_pragmas(engine, pragmas):
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+#Engine tuning that has to happen after db.init_app created the engines
+def configure_engines(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, app.config.get('SQLITE_PRAGMAS'))
+
@@ -0,0 +1,231 @@
+import csv
+import io
+import json
+import os
+import time
+from types import SimpleNamespace
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from marshmallow import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Customers, Mechanics, Parts
+from app.utility.caching import touch_namespaces
+from app.utility.ledger import record_movements
+from app.utility.passwords import hash_passwords
+from app.utility.reorder import sync_reorder_queue
+from app.utility.scheduler import touch_mechanics
+from app.utility.search import MODEL_KINDS, index_rows, search_index_exists
+
+#Bulk import of customers, mechanics and parts from CSV (header row = column names) or NDJSON (one object per line).
+#
+#The file is read as a stream and handled CHUNK_SIZE rows at a time, each chunk in its own transaction:
+#   1. every row goes through the same schema the create route uses
+#   2. one SELECT ... WHERE email IN (...) per unique column finds clashes with existing rows, a set finds the ones
+#      inside the chunk (earlier chunks are committed, so the SELECT covers them)
+#   3. passwords are hashed on the process pool, the whole chunk in one go (see hash_passwords)
+#   4. one INSERT ... RETURNING id for the chunk (SQLAlchemy sends it as multi-row VALUES batches)
+#Rows that fail are reported by line number and skipped, the rest of the file still goes in. A chunk the database
+#rejects anyway (a row created by someone else between the check and the insert) is rolled back and its rows reported.
+#
+#Over HTTP (request_rows) the body is capped at IMPORT_MAX_BYTES and IMPORT_MAX_ROWS and passwords are hashed
+#HTTP_HASH_BATCH at a time, so an import can't hog the hashing pool logins use. Bigger files go through the CLI.
+#
+#These are Core inserts, so the session hooks don't see them. The search index, the cache, the scheduler, the stock
+#ledger and the reorder queue are updated here instead.
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+UNIQUE_COLUMNS = {Customers: ('email', 'phone'), Mechanics: ('email', 'phone'), Parts: ()}
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_MAX_ROWS = 1000
+HTTP_HASH_BATCH = 16
+
+
+class ImportTooLarge(Exception):
+    pass
+
+
+#"text/csv; charset=utf-8" -> "csv", None for anything else
+def import_format(content_type):
+    mimetype = (content_type or "").split(";")[0].strip().lower()
+    return next((name for name, value in FORMATS.items() if value == mimetype), None)
+
+
+#(line number, row dict) for every row of a binary stream. Rows that can't be parsed come through as (line, message).
+def read_rows(stream, fmt):
+    text = io.TextIOWrapper(stream if isinstance(stream, io.BufferedIOBase) else io.BufferedReader(stream), encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, "More cells than columns"
+            else:
+                yield reader.line_num, row
+        return
+    for line, raw in enumerate(text, 1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            yield line, "Not valid JSON"
+            continue
+        yield line, row if isinstance(row, dict) else "Each line must be a JSON object"
+
+
+#Rows of an import request body, read up front so a request over the limits is turned away before anything is
+#written. Raises ImportTooLarge.
+def request_rows(request, fmt):
+    max_bytes = current_app.config.get('IMPORT_MAX_BYTES', DEFAULT_MAX_BYTES)
+    max_rows = current_app.config.get('IMPORT_MAX_ROWS', DEFAULT_MAX_ROWS)
+    if request.content_length is None or request.content_length > max_bytes:
+        raise ImportTooLarge(f"Imports over HTTP are limited to {max_bytes // 1024} KB with a Content-Length, use the CLI (flask import) for bigger files")
+    rows = list(read_rows(io.BytesIO(request.get_data(cache=False)), fmt))
+    if len(rows) > max_rows:
+        raise ImportTooLarge(f"Imports over HTTP are limited to {max_rows} rows, use the CLI (flask import) for bigger files")
+    return rows
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+#One load(many=True) for the chunk: marshmallow-sqlalchemy has a fixed cost per load call (it looks up the installed
+#marshmallow version every time) that costs more than validating the row
+def _validate(schema, chunk, errors):
+    parsed = []
+    for line, row in chunk:
+        if isinstance(row, str):
+            errors.append({"line": line, "errors": {"_schema": [row]}})
+        else:
+            parsed.append((line, row))
+    if not parsed:
+        return []
+    try:
+        loaded, messages = schema.load([row for line, row in parsed], many=True), {}
+    except ValidationError as err:
+        loaded, messages = err.valid_data, err.messages
+    valid = []
+    for index, ((line, row), data) in enumerate(zip(parsed, loaded)):
+        if index in messages:
+            errors.append({"line": line, "errors": messages[index]})
+        else:
+            valid.append((line, data))
+    return valid
+
+
+def _unique(model, valid, errors):
+    columns = UNIQUE_COLUMNS[model]
+    if not columns or not valid:
+        return valid
+    taken = {}
+    for name in columns:
+        column = getattr(model, name)
+        taken[name] = set(db.session.scalars(select(column).where(column.in_({data[name] for line, data in valid}))))
+    seen = {name: set() for name in columns}
+    kept = []
+    for line, data in valid:
+        clashes = [name for name in columns if data[name] in taken[name] or data[name] in seen[name]]
+        if clashes:
+            errors.append({"line": line, "errors": {name: [f"{name.capitalize()} already exists"] for name in clashes}})
+            continue
+        for name in columns:
+            seen[name].add(data[name])
+        kept.append((line, data))
+    return kept
+
+
+def _insert(model, rows, hash_batch=None):
+    if 'password' in model.__table__.c:
+        for row, hashed in zip(rows, hash_passwords([row['password'] for row in rows], hash_batch)):
+            row['password'] = hashed
+    ids = db.session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+
+    connection = db.session.connection()
+    if search_index_exists(connection):
+        index_rows(connection, MODEL_KINDS[model], [SimpleNamespace(**dict(row, id=row_id)) for row, row_id in zip(rows, ids)])
+    if model is not Customers:
+        touch_namespaces(db.session, {'reports'}) #mechanic and part names show up in reports
+    if model is Mechanics:
+        touch_mechanics(db.session, mechanic_ids=ids, connection=connection)
+    if model is Parts:
+        record_movements(connection, {row_id: row['stock'] for row, row_id in zip(rows, ids)}, 'imported')
+        sync_reorder_queue(connection, ids) #parts imported with stock at or under their threshold
+    return ids
+
+
+#Imports rows (from read_rows) into model, validated with schema. Commits every chunk. hash_batch: see hash_passwords.
+#Returns {"imported", "failed", "errors" (the first MAX_REPORTED_ERRORS), "seconds", "rows_per_sec"}.
+def import_rows(model, schema, rows, chunk_size=CHUNK_SIZE, hash_batch=None):
+    start = time.perf_counter()
+    imported = processed = 0
+    errors = []
+    for chunk in _chunks(rows, chunk_size):
+        processed += len(chunk)
+        valid = _unique(model, _validate(schema, chunk, errors), errors)
+        if valid:
+            try:
+                ids = _insert(model, [data for line, data in valid], hash_batch)
+                db.session.commit()
+                imported += len(ids)
+            except IntegrityError:
+                db.session.rollback()
+                errors.extend({"line": line, "errors": {"_schema": ["Clashed with a row saved while the import ran, nothing in its batch was imported"]}}
+                              for line, data in valid)
+            except Exception:
+                db.session.rollback()
+                raise
+    seconds = time.perf_counter() - start
+    errors.sort(key=lambda error: error['line'])
+    return {
+        "imported": imported,
+        "failed": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(processed / seconds) if seconds else processed,
+    }
+
+
+#flask --app "app:create_app('DevelopmentConfig')" import customers branch_customers.csv
+import_cli = AppGroup('import', help='Bulk import customers, mechanics and parts from CSV or NDJSON.')
+
+
+#the schemas live with the blueprints, which import this module
+def _import_targets():
+    from app.blueprints.customers.schemas import customer_schema
+    from app.blueprints.mechanics.schemas import mechanic_schema
+    from app.blueprints.parts.schemas import part_schema
+    return {'customers': (Customers, customer_schema), 'mechanics': (Mechanics, mechanic_schema), 'parts': (Parts, part_schema)}
+
+
+def _import_command(kind):
+    @import_cli.command(kind, help=f"Import {kind} from a .csv or .ndjson file.")
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), help='Default: from the file extension.')
+    @click.option('--chunk-size', default=CHUNK_SIZE, show_default=True, help='Rows per transaction.')
+    @click.option('--hash-workers', type=int, help='Password hashing processes. Default: one per CPU.')
+    def command(path, fmt, chunk_size, hash_workers):
+        fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        current_app.config['PASSWORD_HASH_WORKERS'] = hash_workers if hash_workers is not None else os.cpu_count() or 1
+        model, schema = _import_targets()[kind]
+        with open(path, 'rb') as stream:
+            report = import_rows(model, schema, read_rows(stream, fmt), chunk_size)
+        for error in report['errors']:
+            click.echo(f"line {error['line']}: {error['errors']}", err=True)
+        click.echo(f"{report['imported']} {kind} imported, {report['failed']} failed in {report['seconds']:.1f}s "
+                   f"({report['rows_per_sec']} rows/sec)")
+    return command
+
+
+for _kind in ('customers', 'mechanics', 'parts'):
+    _import_command(_kind)
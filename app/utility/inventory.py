@@ -0,0 +1,112 @@
+import time
+from flask import current_app
+from sqlalchemy import case, select, update
+from sqlalchemy.exc import OperationalError
+from app.models import db, Parts
+from app.utility.ledger import record_movements
+from app.utility.reorder import sync_reorder_queue
+
+#Every change to Parts.stock goes through here so the check and the write happen in the database,
+#not in Python where two workers can both read stock=1 and both sell it. The stock ledger and the reorder queue are
+#brought up to date in the same transaction (app/utility/ledger.py, app/utility/reorder.py).
+#
+#STOCK_RESERVATION_MODE
+#   "conditional" (default) - UPDATE parts SET stock = stock - :q WHERE id = :id AND stock >= :q
+#   "row_lock"              - SELECT ... FOR UPDATE first, then the same conditional update. Use on Postgres
+#                             when you want writers to queue on the row instead of racing the update.
+
+DEFAULT_LOCK_RETRIES = 5
+DEFAULT_LOCK_BACKOFF = 0.02 #seconds, doubled on every retry
+MAX_LOCK_BACKOFF = 0.5
+
+
+#Runs fn, and if the database reports a lock conflict (SQLite "database is locked", Postgres lock timeouts)
+#rolls back and tries again. Only safe as the FIRST write of a unit of work, since the rollback throws away
+#anything the session did before it.
+def retry_on_lock(fn, *args, **kwargs):
+    retries = current_app.config.get('STOCK_LOCK_RETRIES', DEFAULT_LOCK_RETRIES)
+    backoff = current_app.config.get('STOCK_LOCK_BACKOFF', DEFAULT_LOCK_BACKOFF)
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except OperationalError:
+            db.session.rollback()
+            if attempt == retries:
+                raise
+            time.sleep(min(backoff * (2 ** attempt), MAX_LOCK_BACKOFF))
+
+
+#stock change for each row: a plain number for one part, CASE parts.id WHEN ... for a batch so it's still one UPDATE
+def _per_part(quantities):
+    if len(quantities) == 1:
+        return next(iter(quantities.values()))
+    return case(quantities, value=Parts.id)
+
+
+def _reserve(quantities, service_ticket_id=None):
+    part_ids = sorted(quantities) #lock rows in id order so two batches can't deadlock each other
+    if current_app.config.get('STOCK_RESERVATION_MODE', 'conditional') == 'row_lock':
+        rows = db.session.execute(
+            select(Parts.id, Parts.stock).where(Parts.id.in_(part_ids)).order_by(Parts.id).with_for_update()
+        ).all()
+        if len(rows) != len(part_ids) or any(stock < quantities[part_id] for part_id, stock in rows):
+            return False
+
+    #still conditional in row_lock mode, SQLite ignores FOR UPDATE so this is what actually protects it there
+    result = db.session.execute(
+        update(Parts)
+        .where(Parts.id.in_(part_ids), Parts.stock >= _per_part(quantities))
+        .values(stock=Parts.stock - _per_part(quantities))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(part_ids):
+        if result.rowcount:
+            db.session.rollback() #some rows had enough stock and some didn't, undo the ones that went through
+        return False
+    connection = db.session.connection()
+    record_movements(connection, {part_id: -quantity for part_id, quantity in quantities.items()}, 'used', service_ticket_id)
+    sync_reorder_queue(connection, part_ids)
+    return True
+
+
+def _add(quantities, service_ticket_id=None):
+    db.session.execute(
+        update(Parts)
+        .where(Parts.id.in_(sorted(quantities)))
+        .values(stock=Parts.stock + _per_part(quantities))
+        .execution_options(synchronize_session=False)
+    )
+    connection = db.session.connection()
+    record_movements(connection, quantities, 'returned' if service_ticket_id else 'delivery', service_ticket_id)
+    sync_reorder_queue(connection, quantities)
+
+
+def _expire_stock(part_ids):
+    for part_id in part_ids:
+        part = db.session.identity_map.get(db.session.identity_key(Parts, part_id))
+        if part is not None:
+            db.session.expire(part, ['stock'])
+
+
+#Takes quantity out of stock for a ticket. Returns False (and changes nothing) if there isn't enough.
+def reserve_stock(part_id, quantity, service_ticket_id=None):
+    return reserve_stock_many({part_id: quantity}, service_ticket_id)
+
+
+#All-or-nothing version for a batch of {part_id: quantity}: either every part had enough stock and was
+#decremented, or False is returned and nothing changed. Like retry_on_lock, call it before any other write.
+def reserve_stock_many(quantities, service_ticket_id=None):
+    reserved = retry_on_lock(_reserve, quantities, service_ticket_id)
+    _expire_stock(quantities)
+    return reserved
+
+
+#Puts quantity back into stock: parts removed from a ticket (pass its id) or new deliveries (no ticket). Doesn't
+#retry by itself since it usually runs after the ticket changes, wrap it in retry_on_lock when it is the first write.
+def return_stock(part_id, quantity, service_ticket_id=None):
+    return_stock_many({part_id: quantity}, service_ticket_id)
+
+
+def return_stock_many(quantities, service_ticket_id=None):
+    _add(quantities, service_ticket_id)
+    _expire_stock(quantities)
@@ -0,0 +1,91 @@
+import dataclasses
+import decimal
+import json
+import logging
+import uuid
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson #optional, pip install orjson. Without it responses go through the stdlib json module
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+#Every jsonify / schema.jsonify / app.json.dumps goes through app.json. JSON_BACKEND picks what sits there:
+#   "orjson" (default)  serializes in C, straight to bytes, dates and datetimes as ISO 8601
+#   "json"              the stdlib module, with the same ISO dates and raw UTF-8, so switching doesn't change the data
+#Flask's own provider writes dates as HTTP dates ("Mon, 01 Jan 2024 00:00:00 GMT"), nothing we return relies on that:
+#the schemas already dump dates as ISO strings before they get here.
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+    ensure_ascii = False #orjson can't escape non-ASCII, keep both backends the same
+
+
+class OrjsonProvider(JSONProvider):
+
+    def _options(self, indent=None):
+        options = orjson.OPT_NON_STR_KEYS #ints as keys, like json.dumps does
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    #orjson takes no keyword arguments and only indents by 2, anything else (or a value it can't handle, like
+    #an int past 64 bits) goes to the stdlib path
+    def _dumpb(self, obj, kwargs):
+        if set(kwargs) - {'indent', 'separators'} or kwargs.get('indent') not in (None, 2):
+            return None
+        try:
+            return orjson.dumps(obj, default=_default, option=self._options(kwargs.get('indent')))
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        data = self._dumpb(obj, kwargs)
+        if data is None:
+            return super().dumps(obj, **kwargs)
+        return data.decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s) #JSONDecodeError is a ValueError, so request.get_json still answers 400
+
+    #Same as Flask's, minus the bytes -> str -> bytes round trip
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if self.compact is False or (self.compact is None and self._app.debug) else None
+        data = self._dumpb(obj, {'indent': indent})
+        if data is None:
+            return super().response(obj)
+        return self._app.response_class(data + b"\n", mimetype=self.mimetype)
+
+
+def json_provider_class(app):
+    backend = app.config.get('JSON_BACKEND', 'orjson')
+    if backend == 'orjson':
+        if orjson is not None:
+            return OrjsonProvider
+        logger.warning("JSON_BACKEND is orjson but orjson isn't installed, using the json module")
+    return JSONProvider
+
+
+def init_json(app):
+    app.json = json_provider_class(app)(app)
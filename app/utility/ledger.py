@@ -0,0 +1,209 @@
+from datetime import datetime, timezone
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, event, func, insert, inspect, select
+from app.models import db, Parts, Stock_Movements, Stock_Snapshots
+
+#Stock ledger.
+#
+#   stock_movements   one row per change to a part's stock: signed quantity, why, which ticket, when
+#   stock_snapshots   (part_id, movement_id) -> the part's stock right after that movement
+#
+#Nothing updates or deletes these rows. Movements are written in the same transaction as the change:
+#   Core UPDATEs in app/utility/inventory.py (tickets' parts, add_stock)   -> inventory calls record_movements
+#   parts created / deleted / stock set through the ORM                    -> the session hooks below
+#   parts bulk imported (app/utility/importer.py)                          -> importer calls record_movements
+#Whenever a part has STOCK_SNAPSHOT_EVERY movements since its last snapshot, a new snapshot is taken in the same
+#statement batch. So stock at any time T is the snapshot before T plus fewer than STOCK_SNAPSHOT_EVERY movements,
+#however long the history is. "flask stock audit" checks the ledger against parts.stock.
+
+MOVEMENTS = Stock_Movements.__table__
+SNAPSHOTS = Stock_Snapshots.__table__
+DEFAULT_SNAPSHOT_EVERY = 100
+OPENING_REASONS = ('created', 'imported') #recorded even at 0 stock, so the part's history has a start
+
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None) #stored naive, in UTC
+
+
+#"2026-10-18T09:30:00+02:00" -> naive UTC. No offset means UTC already. Raises ValueError.
+def parse_utc(value):
+    moment = datetime.fromisoformat(value)
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+
+
+#Appends a movement per part. deltas: {part_id: signed quantity}
+def record_movements(connection, deltas, reason, service_ticket_id=None):
+    now = utc_now()
+    rows = [{'part_id': part_id, 'quantity': quantity, 'reason': reason, 'service_ticket_id': service_ticket_id, 'created_at': now}
+            for part_id, quantity in deltas.items() if quantity or reason in OPENING_REASONS]
+    if not rows:
+        return
+    connection.execute(insert(MOVEMENTS), rows)
+    _checkpoint(connection, [row['part_id'] for row in rows], now)
+
+
+#Snapshots the parts that have had STOCK_SNAPSHOT_EVERY movements since their last snapshot. Runs in the
+#transaction that wrote the movements, so parts.stock is the stock right after the newest one (0 for a deleted part).
+def _checkpoint(connection, part_ids, now):
+    every = current_app.config.get('STOCK_SNAPSHOT_EVERY', DEFAULT_SNAPSHOT_EVERY)
+    last = (
+        select(SNAPSHOTS.c.part_id, func.max(SNAPSHOTS.c.movement_id).label('movement_id'))
+        .where(SNAPSHOTS.c.part_id.in_(part_ids))
+        .group_by(SNAPSHOTS.c.part_id)
+        .subquery()
+    )
+    due = connection.execute(
+        select(MOVEMENTS.c.part_id, func.max(MOVEMENTS.c.id))
+        .outerjoin(last, last.c.part_id == MOVEMENTS.c.part_id)
+        .where(MOVEMENTS.c.part_id.in_(part_ids), MOVEMENTS.c.id > func.coalesce(last.c.movement_id, 0))
+        .group_by(MOVEMENTS.c.part_id)
+        .having(func.count() >= every)
+    ).all()
+    if due:
+        stock = dict(connection.execute(select(Parts.id, Parts.stock).where(Parts.id.in_([part_id for part_id, movement_id in due]))).all())
+        connection.execute(insert(SNAPSHOTS), [{'part_id': part_id, 'movement_id': movement_id, 'stock': stock.get(part_id, 0), 'taken_at': now}
+                                               for part_id, movement_id in due])
+
+
+#_____________________SESSION HOOKS_____________________
+
+#deleted parts: the row is gone after the flush, so their stock is read before it and written off after it.
+#It's kept on the flush itself, so a flush that fails and is rolled back takes it with it.
+def _before_flush(session, flush_context, instances):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Parts) and obj.id is not None]
+    if deleted:
+        stock = session.connection().execute(select(Parts.id, Parts.stock).where(Parts.id.in_(deleted))).all()
+        flush_context.attributes['ledger_deleted'] = {part_id: -quantity for part_id, quantity in stock}
+
+
+def _after_flush(session, flush_context):
+    created, adjusted = {}, {}
+    deleted = flush_context.attributes.get('ledger_deleted')
+    for obj in session.new:
+        if isinstance(obj, Parts):
+            created[obj.id] = obj.stock
+    for obj in session.dirty:
+        if isinstance(obj, Parts):
+            history = inspect(obj).attrs.stock.history
+            if history.has_changes() and history.deleted and history.added:
+                adjusted[obj.id] = history.added[0] - history.deleted[0]
+    if created:
+        record_movements(session.connection(), created, 'created')
+    if adjusted:
+        record_movements(session.connection(), adjusted, 'adjusted')
+    if deleted:
+        record_movements(session.connection(), deleted, 'deleted')
+
+
+def register_ledger_hooks():
+    for name, listener in (('before_flush', _before_flush), ('after_flush', _after_flush)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+
+#_____________________QUERIES_____________________
+
+#Stock of a part at time at (naive UTC): the newest snapshot at or before it plus the movements after that snapshot
+#up to at. The next snapshot after at caps the range, so at most STOCK_SNAPSHOT_EVERY movements are read.
+#Returns None when the ledger has nothing for the part by then (it didn't exist yet, or never did).
+def stock_at(connection, part_id, at):
+    before = connection.execute(
+        select(SNAPSHOTS.c.movement_id, SNAPSHOTS.c.stock, SNAPSHOTS.c.taken_at)
+        .where(SNAPSHOTS.c.part_id == part_id, SNAPSHOTS.c.taken_at <= at)
+        .order_by(SNAPSHOTS.c.taken_at.desc(), SNAPSHOTS.c.movement_id.desc())
+        .limit(1)
+    ).first()
+    after = connection.scalar(
+        select(SNAPSHOTS.c.movement_id)
+        .where(SNAPSHOTS.c.part_id == part_id, SNAPSHOTS.c.taken_at > at)
+        .order_by(SNAPSHOTS.c.taken_at, SNAPSHOTS.c.movement_id)
+        .limit(1)
+    )
+    query = select(func.coalesce(func.sum(MOVEMENTS.c.quantity), 0), func.count()).where(MOVEMENTS.c.part_id == part_id, MOVEMENTS.c.created_at <= at)
+    if before is not None:
+        query = query.where(MOVEMENTS.c.id > before.movement_id)
+    if after is not None:
+        query = query.where(MOVEMENTS.c.id <= after)
+    delta, scanned = connection.execute(query).one()
+    if before is None and not scanned:
+        return None
+    return {
+        "part_id": part_id,
+        "at": at,
+        "stock": (before.stock if before is not None else 0) + delta,
+        "snapshot": dict(before._mapping) if before is not None else None,
+        "movements_scanned": scanned,
+    }
+
+
+def _latest_snapshots():
+    newest = select(SNAPSHOTS.c.part_id, func.max(SNAPSHOTS.c.movement_id).label('movement_id')).group_by(SNAPSHOTS.c.part_id).subquery()
+    return (
+        select(SNAPSHOTS.c.part_id, SNAPSHOTS.c.movement_id, SNAPSHOTS.c.stock)
+        .join(newest, and_(newest.c.part_id == SNAPSHOTS.c.part_id, newest.c.movement_id == SNAPSHOTS.c.movement_id))
+        .subquery()
+    )
+
+
+#Parts whose stock doesn't match what the ledger says it should be: [(part_id, parts.stock, ledger stock)].
+#Each part is its newest snapshot plus the movements after it, so this is one pass over parts, not a replay.
+def stock_drift(connection):
+    latest = _latest_snapshots()
+    since = (
+        select(MOVEMENTS.c.part_id, func.sum(MOVEMENTS.c.quantity).label('quantity'))
+        .outerjoin(latest, latest.c.part_id == MOVEMENTS.c.part_id)
+        .where(MOVEMENTS.c.id > func.coalesce(latest.c.movement_id, 0))
+        .group_by(MOVEMENTS.c.part_id)
+        .subquery()
+    )
+    ledger = func.coalesce(latest.c.stock, 0) + func.coalesce(since.c.quantity, 0)
+    return connection.execute(
+        select(Parts.id, Parts.stock, ledger)
+        .outerjoin(latest, latest.c.part_id == Parts.id)
+        .outerjoin(since, since.c.part_id == Parts.id)
+        .where(Parts.stock != ledger)
+        .order_by(Parts.id)
+    ).all()
+
+
+#Snapshots every part that has moved since its last snapshot, whatever the count. For a periodic job, so history
+#queries for quiet parts start close to now too. Returns how many snapshots were taken.
+#The stock is the ledger's own: the last snapshot plus the movements up to the new one, in the same statement that
+#finds them. parts.stock read separately could already include a movement committed after the newest one seen here.
+def snapshot_all(connection):
+    latest = _latest_snapshots()
+    moved = connection.execute(
+        select(MOVEMENTS.c.part_id, func.max(MOVEMENTS.c.id), func.coalesce(func.max(latest.c.stock), 0) + func.sum(MOVEMENTS.c.quantity))
+        .outerjoin(latest, latest.c.part_id == MOVEMENTS.c.part_id)
+        .where(MOVEMENTS.c.id > func.coalesce(latest.c.movement_id, 0))
+        .group_by(MOVEMENTS.c.part_id)
+    ).all()
+    taken_at = dict(connection.execute(select(MOVEMENTS.c.id, MOVEMENTS.c.created_at).where(MOVEMENTS.c.id.in_([movement_id for part_id, movement_id, stock in moved]))).all())
+    rows = [{'part_id': part_id, 'movement_id': movement_id, 'stock': stock, 'taken_at': taken_at[movement_id]}
+            for part_id, movement_id, stock in moved]
+    if rows:
+        connection.execute(insert(SNAPSHOTS), rows)
+    return len(rows)
+
+
+#flask --app "app:create_app('DevelopmentConfig')" stock audit / stock snapshot
+stock_cli = AppGroup('stock', help='Stock movement ledger.')
+
+
+@stock_cli.command('audit')
+def audit_command():
+    with db.engine.connect() as connection:
+        drift = stock_drift(connection)
+    for part_id, stock, ledger in drift:
+        click.echo(f"part {part_id}: stock {stock}, ledger says {ledger}")
+    click.echo(f"{len(drift)} part(s) don't match the ledger.")
+
+
+@stock_cli.command('snapshot')
+def snapshot_command():
+    with db.engine.begin() as connection:
+        taken = snapshot_all(connection)
+    click.echo(f"{taken} snapshot(s) taken.")
@@ -0,0 +1,97 @@
+import os
+import click
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+from app.models import db
+from app.utility.search import is_search_table
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'migrations')
+BASELINE_REVISION = '0001' #the schema db.create_all built before migrations existed
+ADVISORY_LOCK_ID = 7263401 #any constant, as long as nothing else in the database takes the same advisory lock
+LOCK_TIMEOUT = 600 #seconds a worker waits for another one's SQLite migration to finish
+
+
+#Tables that exist in the database but not in models.py on purpose (the FTS5 search tables), so autogenerate
+#doesn't try to drop them
+def include_name(name, type_, parent_names):
+    return not (type_ == 'table' and is_search_table(name))
+
+
+def alembic_config(connection):
+    config = Config()
+    config.set_main_option('script_location', MIGRATIONS_DIR)
+    config.set_main_option('sqlalchemy.url', connection.engine.url.render_as_string(hide_password=False))
+    config.attributes['connection'] = connection
+    return config
+
+
+#Only one upgrade runs at a time: every worker starting at once would otherwise see the same old heads and run the
+#same DDL. SQLite: BEGIN IMMEDIATE takes the database's write lock, waiting up to LOCK_TIMEOUT for it (instead of
+#the usual busy_timeout, a migration can take a while). Postgres: an advisory lock held until the transaction ends.
+def _lock(connection):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f"PRAGMA busy_timeout = {LOCK_TIMEOUT * 1000}")
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    elif connection.dialect.name == 'postgresql':
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {'id': ADVISORY_LOCK_ID})
+
+
+def _current_heads(connection):
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+#Brings the database to the latest migration. When it's already there this costs one SELECT on alembic_version
+#and a read of the migrations folder: no env.py, no reflection of the tables, no lock. Returns True if it migrated,
+#False if there was nothing to do (or another worker did it while this one waited for the lock).
+def upgrade_database(engine):
+    heads = set(ScriptDirectory(MIGRATIONS_DIR).get_heads())
+    with engine.connect() as connection:
+        if _current_heads(connection) == heads:
+            return False
+
+    with engine.begin() as connection:
+        busy_timeout = connection.exec_driver_sql("PRAGMA busy_timeout").scalar() if connection.dialect.name == 'sqlite' else None
+        try:
+            _lock(connection)
+            current = _current_heads(connection) #again, now that nobody else can be migrating
+            if current == heads:
+                return False
+            config = alembic_config(connection)
+            if not current and inspect(connection).has_table('customers'):
+                #created by db.create_all before there were migrations, start it from the baseline
+                command.stamp(config, BASELINE_REVISION)
+            command.upgrade(config, 'head')
+        finally:
+            if busy_timeout is not None:
+                connection.exec_driver_sql(f"PRAGMA busy_timeout = {busy_timeout}") #it's a pooled connection
+    return True
+
+
+#flask --app "app:create_app('DevelopmentConfig')" db upgrade / db revision -m "..." / db current
+db_cli = AppGroup('db', help='Database migrations (Alembic).')
+
+
+@db_cli.command('upgrade')
+def upgrade_command():
+    if upgrade_database(db.engine):
+        click.echo('Database upgraded.')
+    else:
+        click.echo('Database already up to date.')
+
+
+@db_cli.command('revision')
+@click.option('-m', '--message', required=True)
+@click.option('--empty', is_flag=True, help="Don't autogenerate from models.py.")
+def revision_command(message, empty):
+    with db.engine.begin() as connection:
+        command.revision(alembic_config(connection), message=message, autogenerate=not empty)
+
+
+@db_cli.command('current')
+def current_command():
+    with db.engine.connect() as connection:
+        click.echo(', '.join(MigrationContext.configure(connection).get_current_heads()) or 'none')
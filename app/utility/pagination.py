@@ -0,0 +1,67 @@
+import base64
+from datetime import date
+from flask import request
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+
+class PaginationError(ValueError): #raised when the client sends a bad limit, cursor or filter value
+    pass
+
+
+def get_limit():
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be an integer")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise PaginationError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def get_date_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise PaginationError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def get_int_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise PaginationError(f"{name} must be an integer")
+
+
+#Sparse fieldsets: ?fields=id,first_name. Returns the names in the order given, or None for every field.
+def get_fields_arg(allowed):
+    value = request.args.get('fields')
+    if value is None:
+        return None
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    if not fields or any(name not in allowed for name in fields):
+        raise PaginationError(f"fields must be a comma separated list of: {', '.join(allowed)}")
+    return fields
+
+
+#The cursor is the (date_created, id) of the last row on the page, base64 encoded so clients treat it as opaque.
+def encode_cursor(row_date, row_id):
+    raw = f"{row_date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        row_date, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return date.fromisoformat(row_date), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise PaginationError("cursor is invalid")
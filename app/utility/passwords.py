@@ -0,0 +1,120 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+#Password hashing is slow on purpose (scrypt / pbkdf2 burn CPU), so it doesn't run on the request thread.
+#
+#PASSWORD_HASH_METHOD   werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000". Raise the cost
+#                       here; existing users are moved to the new settings the next time they log in.
+#PASSWORD_HASH_WORKERS  size of the process pool that does the hashing. 0 = hash inline (tests, CLI scripts).
+#PASSWORD_HASH_QUEUE    how many hashes may be waiting for the pool at once. Past that, callers get HashingBusy
+#                       instead of piling up behind a login storm.
+
+DEFAULT_METHOD = 'scrypt:32768:8:1' #werkzeug's own default
+DEFAULT_QUEUE = 64
+QUEUE_WAIT = 5 #seconds to wait for a queue slot before giving up
+
+
+class HashingBusy(Exception):
+    pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = None
+
+
+#One pool per process. Checks the pid so a gunicorn worker forked after the pool was made builds its own.
+def _get_pool(workers, queue_size):
+    global _pool, _pool_pid, _slots
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(queue_size)
+        return _pool, _slots
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def _run(fn, *args):
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 0)
+    if workers <= 0:
+        return fn(*args)
+    pool, slots = _get_pool(workers, current_app.config.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE))
+    if not slots.acquire(timeout=QUEUE_WAIT):
+        raise HashingBusy()
+    try:
+        return pool.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def _method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, _method())
+
+
+#Many passwords at once (bulk imports), batch at a time (default: all of them), each batch under one queue slot.
+#HTTP imports send small batches so logins get a slot and a free process in between, the CLI has its own pool and
+#sends the whole chunk.
+def hash_passwords(passwords, batch=None):
+    method = _method()
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 0)
+    if workers <= 0:
+        return [generate_password_hash(password, method) for password in passwords]
+    pool, slots = _get_pool(workers, current_app.config.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE))
+    batch = batch or max(1, len(passwords))
+    hashed = []
+    for start in range(0, len(passwords), batch):
+        part = passwords[start:start + batch]
+        if not slots.acquire(timeout=QUEUE_WAIT):
+            raise HashingBusy()
+        try:
+            hashed.extend(pool.map(generate_password_hash, part, repeat(method), chunksize=max(1, len(part) // (workers * 4))))
+        finally:
+            slots.release()
+    return hashed
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+#werkzeug fills in defaults ("scrypt" is stored as "scrypt:32768:8:1"), so hash once to see what a method
+#string turns into and compare stored hashes against that
+@lru_cache(maxsize=8)
+def _stored_prefix(method):
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != _stored_prefix(_method())
+
+
+#Checks the password and, if the stored hash was made with older settings, replaces it with one made with the
+#current ones. The caller commits. Returns False for a wrong password.
+def check_and_upgrade(user, password):
+    if not verify_password(user.password, password):
+        return False
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+    return True
@@ -0,0 +1,84 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, exists, insert, inspect, literal, select
+from app.models import db, Parts, Reorder_Queue
+from app.utility.ledger import utc_now
+
+#Reorder queue: a part has a row in reorder_queue exactly while stock <= reorder_threshold, stamped with when it
+#went low. GET /parts/low_stock reads the queue (a handful of rows) instead of filtering every part.
+#
+#Nothing here recomputes the whole queue on a write. sync_reorder_queue looks only at the parts a write touched,
+#with two set-based statements, in the same transaction as the write:
+#   stock moved by a Core UPDATE (app/utility/inventory.py)            -> inventory calls sync_reorder_queue
+#   part created / deleted / stock or threshold changed through the ORM -> the session hook below
+#   parts bulk imported (app/utility/importer.py)                       -> importer calls sync_reorder_queue
+#Anything that changes stock some other way should call sync_reorder_queue, or run "flask reorder rebuild".
+
+QUEUE = Reorder_Queue.__table__
+WATCHED = ('stock', 'reorder_threshold')
+
+
+def _low(part_ids=None):
+    query = select(Parts.id).where(Parts.stock <= Parts.reorder_threshold)
+    return query if part_ids is None else query.where(Parts.id.in_(part_ids))
+
+
+#Brings the queue rows of these parts in line with their stock. Parts that went low are added, parts that are back
+#above their threshold (or gone) are removed, parts that stay low keep their place in the queue.
+def sync_reorder_queue(connection, part_ids):
+    part_ids = set(part_ids)
+    part_ids.discard(None)
+    if not part_ids:
+        return
+    connection.execute(delete(QUEUE).where(QUEUE.c.part_id.in_(part_ids), QUEUE.c.part_id.not_in(_low(part_ids))))
+    connection.execute(insert(QUEUE).from_select(
+        ['part_id', 'queued_at'],
+        _low(part_ids).add_columns(literal(utc_now(), Reorder_Queue.queued_at.type)).where(~exists().where(QUEUE.c.part_id == Parts.id))
+    ))
+
+
+def _after_flush(session, flush_context):
+    part_ids = set()
+    for obj in session.new:
+        if isinstance(obj, Parts):
+            part_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Parts):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in WATCHED):
+                part_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Parts):
+            part_ids.add(obj.id) #ON DELETE CASCADE covers databases that enforce foreign keys, this covers SQLite
+    if part_ids:
+        sync_reorder_queue(session.connection(), part_ids)
+
+
+def register_reorder_hooks():
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+
+
+#Recomputes the queue from parts. The low parts come off the partial index (ix_parts_low_stock), so this reads the
+#low parts, not the whole table. Parts that were already queued keep their queued_at. Returns how many parts were
+#missing from the queue or queued when they shouldn't be.
+def rebuild_reorder_queue(connection):
+    queued = set(connection.scalars(select(QUEUE.c.part_id)))
+    low = set(connection.scalars(_low()))
+    connection.execute(delete(QUEUE).where(QUEUE.c.part_id.not_in(_low())))
+    connection.execute(insert(QUEUE).from_select(
+        ['part_id', 'queued_at'],
+        _low().add_columns(literal(utc_now(), Reorder_Queue.queued_at.type)).where(~exists().where(QUEUE.c.part_id == Parts.id))
+    ))
+    return len(queued ^ low)
+
+
+#flask --app "app:create_app('DevelopmentConfig')" reorder rebuild
+reorder_cli = AppGroup('reorder', help='Reorder queue behind /parts/low_stock.')
+
+
+@reorder_cli.command('rebuild')
+def rebuild_command():
+    with db.engine.begin() as connection:
+        drift = rebuild_reorder_queue(connection)
+    click.echo(f"Reorder queue rebuilt, {drift} part(s) were out of date.")
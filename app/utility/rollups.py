@@ -0,0 +1,213 @@
+from collections import defaultdict
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import db, Daily_Ticket_Rollups, Daily_Part_Rollups, Service_Tickets, Service_Ticket_Parts
+
+#Daily rollups for dashboards.
+#
+#   daily_ticket_rollups  (day, status)  -> tickets, revenue_cents     day = Service_Tickets.date_created
+#   daily_part_rollups    (day, part_id) -> quantity, revenue_cents, lines
+#
+#Every write adds a delta to the affected rows (INSERT ... ON CONFLICT DO UPDATE SET x = x + delta) in the same
+#transaction as the change itself, so the rollups commit or roll back with it. Where the deltas come from:
+#   ticket created / deleted / status, date or total changed through the ORM  -> the session hooks below
+#   total moved by a Core UPDATE (line_items.apply_total_delta)               -> record_revenue
+#   line items added / removed (line_items.add_line_items / remove_line_items) -> record_parts
+#Anything that writes these tables some other way should call the record_* functions, or run
+#"flask rollups rebuild" afterwards to recompute everything from the base tables.
+
+TICKET_ROLLUPS = Daily_Ticket_Rollups.__table__
+PART_ROLLUPS = Daily_Part_Rollups.__table__
+ROLLUP_KEYS = {
+    TICKET_ROLLUPS: (('day', 'status'), 'tickets'), #key columns, and the count that says the row still means something
+    PART_ROLLUPS: (('day', 'part_id'), 'lines'),
+}
+
+
+#Adds deltas to rollup rows, creating them if needed. rows: {key tuple: {column: delta}}
+def _apply(connection, table, rows):
+    keys, count = ROLLUP_KEYS[table]
+    params = [dict(zip(keys, key), **deltas) for key, deltas in rows.items() if any(deltas.values())]
+    if not params:
+        return
+    columns = [column for column in params[0] if column not in keys]
+
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect == 'sqlite' else postgresql).insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: table.c[column] + statement.excluded[column] for column in columns}
+        )
+        connection.execute(statement, params)
+    else:
+        for row in params:
+            result = connection.execute(
+                update(table).where(*[table.c[key] == row[key] for key in keys]).values({column: table.c[column] + row[column] for column in columns})
+            )
+            if not result.rowcount:
+                connection.execute(insert(table).values(row))
+
+    #rows that went back to zero are removed, so the tables only hold real data and match a rebuild exactly
+    emptied = [{f"b_{key}": row[key] for key in keys} for row in params if row[count] < 0]
+    if emptied:
+        connection.execute(
+            delete(table).where(*[table.c[key] == bindparam(f"b_{key}") for key in keys], table.c[count] <= 0),
+            emptied
+        )
+
+
+def record_tickets(connection, changes):
+    rows = defaultdict(lambda: {'tickets': 0, 'revenue_cents': 0})
+    for day, status, tickets, revenue_cents in changes:
+        rows[(day, status)]['tickets'] += tickets
+        rows[(day, status)]['revenue_cents'] += revenue_cents
+    _apply(connection, TICKET_ROLLUPS, rows)
+
+
+#A ticket's total moved by delta_cents. The ticket's day and status come off the loaded object, which is current
+#because the UPDATE that moved the total autoflushed any pending changes first.
+def record_revenue(connection, service_ticket, delta_cents):
+    record_tickets(connection, [(service_ticket.date_created, service_ticket.status, 0, delta_cents)])
+
+
+#changes: {part_id: (quantity delta, revenue_cents delta, lines delta)} for one ticket's day
+def record_parts(connection, day, changes):
+    rows = defaultdict(lambda: {'quantity': 0, 'revenue_cents': 0, 'lines': 0})
+    for part_id, (quantity, revenue_cents, lines) in changes.items():
+        row = rows[(day, part_id)]
+        row['quantity'] += quantity
+        row['revenue_cents'] += revenue_cents
+        row['lines'] += lines
+    _apply(connection, PART_ROLLUPS, rows)
+
+
+#Takes a ticket's line items out of one day (sign=-1) or puts them into another (sign=1)
+def _record_ticket_lines(connection, ticket_days, sign):
+    if not ticket_days:
+        return
+    lines = connection.execute(
+        select(Service_Ticket_Parts.service_ticket_id, Service_Ticket_Parts.part_id, Service_Ticket_Parts.quantity, Service_Ticket_Parts.unit_price_cents)
+        .where(Service_Ticket_Parts.service_ticket_id.in_(ticket_days))
+    )
+    by_day = defaultdict(dict)
+    for ticket_id, part_id, quantity, unit_price_cents in lines:
+        changes = by_day[ticket_days[ticket_id]]
+        old = changes.get(part_id, (0, 0, 0))
+        changes[part_id] = (old[0] + sign * quantity, old[1] + sign * quantity * unit_price_cents, old[2] + sign)
+    for day, changes in by_day.items():
+        record_parts(connection, day, changes)
+
+
+#_____________________SESSION HOOKS_____________________
+
+#Deleted tickets: take them (and their line items, which the delete is about to orphan) out of the rollups while
+#the rows are still there to read
+def _before_flush(session, flush_context, instances):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Service_Tickets) and obj.id is not None]
+    if not deleted:
+        return
+    connection = session.connection()
+    rows = connection.execute(
+        select(Service_Tickets.id, Service_Tickets.date_created, Service_Tickets.status, Service_Tickets.total_cents)
+        .where(Service_Tickets.id.in_(deleted))
+    ).all()
+    record_tickets(connection, [(day, status, -1, -total) for ticket_id, day, status, total in rows])
+    _record_ticket_lines(connection, {ticket_id: day for ticket_id, day, status, total in rows}, -1)
+
+
+def _old_value(state, attribute, current):
+    history = state.attrs[attribute].history
+    return history.deleted[0] if history.has_changes() and history.deleted else current
+
+
+def _after_flush(session, flush_context):
+    changes = []
+    moved = [] #(ticket, old day, old status, old total) for tickets whose rollup key or total changed
+    for obj in session.new:
+        if isinstance(obj, Service_Tickets):
+            changes.append((obj.date_created, obj.status, 1, obj.total_cents or 0))
+    for obj in session.dirty:
+        if isinstance(obj, Service_Tickets):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in ('date_created', 'status', 'total_cents')):
+                moved.append(obj)
+    if not (changes or moved):
+        return
+
+    connection = session.connection()
+    if moved:
+        #read the current values from the database: total_cents is usually expired after a Core UPDATE
+        current = {
+            row.id: row for row in connection.execute(
+                select(Service_Tickets.id, Service_Tickets.date_created, Service_Tickets.status, Service_Tickets.total_cents)
+                .where(Service_Tickets.id.in_([obj.id for obj in moved]))
+            )
+        }
+        old_days, new_days = {}, {}
+        for obj in moved:
+            now = current[obj.id]
+            state = inspect(obj)
+            old_day = _old_value(state, 'date_created', now.date_created)
+            changes.append((old_day, _old_value(state, 'status', now.status), -1, -_old_value(state, 'total_cents', now.total_cents)))
+            changes.append((now.date_created, now.status, 1, now.total_cents))
+            if old_day != now.date_created:
+                old_days[obj.id], new_days[obj.id] = old_day, now.date_created
+        _record_ticket_lines(connection, old_days, -1)
+        _record_ticket_lines(connection, new_days, 1)
+    record_tickets(connection, changes)
+
+
+def register_rollup_hooks():
+    for name, listener in (('before_flush', _before_flush), ('after_flush', _after_flush)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+
+#_____________________REBUILD_____________________
+
+def _snapshot(connection, table):
+    keys, count = ROLLUP_KEYS[table]
+    return {tuple(row[key] for key in keys): tuple(row) for row in connection.execute(select(table)).mappings()}
+
+
+#Recomputes both tables from the base tables with one INSERT ... SELECT ... GROUP BY each. Returns how many rollup
+#rows were wrong (missing, extra or different) before the rebuild, i.e. how far the incremental updates drifted.
+def rebuild_rollups(connection):
+    before = {table: _snapshot(connection, table) for table in ROLLUP_KEYS}
+
+    connection.execute(delete(TICKET_ROLLUPS))
+    connection.execute(insert(TICKET_ROLLUPS).from_select(
+        ['day', 'status', 'tickets', 'revenue_cents'],
+        select(Service_Tickets.date_created, Service_Tickets.status, func.count(), func.coalesce(func.sum(Service_Tickets.total_cents), 0))
+        .group_by(Service_Tickets.date_created, Service_Tickets.status)
+    ))
+    connection.execute(delete(PART_ROLLUPS))
+    connection.execute(insert(PART_ROLLUPS).from_select(
+        ['day', 'part_id', 'quantity', 'revenue_cents', 'lines'],
+        select(
+            Service_Tickets.date_created, Service_Ticket_Parts.part_id, func.sum(Service_Ticket_Parts.quantity),
+            func.sum(Service_Ticket_Parts.quantity * Service_Ticket_Parts.unit_price_cents), func.count()
+        )
+        .join(Service_Tickets, Service_Tickets.id == Service_Ticket_Parts.service_ticket_id)
+        .group_by(Service_Tickets.date_created, Service_Ticket_Parts.part_id)
+    ))
+
+    drift = 0
+    for table, old in before.items():
+        new = _snapshot(connection, table)
+        drift += sum(1 for key in old.keys() | new.keys() if old.get(key) != new.get(key))
+    return drift
+
+
+#flask --app "app:create_app('DevelopmentConfig')" rollups rebuild
+rollups_cli = AppGroup('rollups', help='Daily rollup tables behind /reports.')
+
+
+@rollups_cli.command('rebuild')
+def rebuild_command():
+    with db.engine.begin() as connection:
+        drift = rebuild_rollups(connection)
+    click.echo(f"Rollups rebuilt, {drift} row(s) were out of date.")
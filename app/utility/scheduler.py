@@ -0,0 +1,287 @@
+import heapq
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, func, insert, inspect, literal, select
+from app.models import db, Mechanics, OPEN_STATUSES, Service_Tickets, mechanic_service_ticket
+
+#Open-ticket counts per mechanic, kept in memory so auto-assign doesn't scan every mechanic's tickets.
+#
+#   _load               mechanic_id -> (specialty key, open tickets)      the truth, as far as this process knows
+#   _heaps[None]        [(open tickets, mechanic_id), ...]                every mechanic
+#   _heaps[specialty]   same, only mechanics with that specialty         keyed on the lowercased, stripped specialty
+#
+#Changing a count pushes a new heap entry instead of finding the old one. Entries that no longer match _load are
+#stale and get dropped when they reach the top, so a pick is O(log n) amortized. A heap is rebuilt from _load when
+#stale entries pile up past twice the live ones.
+#
+#The index is loaded from the database on first use after create_app, and kept current by the session hooks below,
+#which recount the mechanics a committed transaction touched. Other workers' writes only show up through the checks
+#in pick_mechanic (the picked mechanic is always recounted in the database) and the full reload every
+#SCHEDULER_MAX_AGE seconds. Writes the ORM doesn't see (Core UPDATEs) should call touch_mechanics.
+#
+#The index only decides who to try. MECHANIC_MAX_OPEN_TICKETS is enforced by the database when the assignment row
+#goes in (assign_if_room), since another worker may have filled the mechanic up since this one last looked.
+#scheduler.lock only guards the in-memory index, nothing holds it while waiting on the database.
+
+DEFAULT_MAX_OPEN_TICKETS = 10
+DEFAULT_MAX_AGE = 300
+UPDATES_KEY = 'scheduler_updates'
+
+
+def specialty_key(specialty):
+    return specialty.strip().lower() if specialty else None
+
+
+#Open tickets per mechanic, for all mechanics or just these ids: [(mechanic_id, specialty, open tickets)]
+def count_open_tickets(connection, mechanic_ids=None):
+    open_counts = (
+        select(mechanic_service_ticket.c.mechanic_id, func.count().label('open_tickets'))
+        .join(Service_Tickets, Service_Tickets.id == mechanic_service_ticket.c.service_ticket_id)
+        .where(Service_Tickets.status.in_(OPEN_STATUSES))
+        .group_by(mechanic_service_ticket.c.mechanic_id)
+    )
+    query = select(Mechanics.id, Mechanics.specialty)
+    if mechanic_ids is not None:
+        open_counts = open_counts.where(mechanic_service_ticket.c.mechanic_id.in_(mechanic_ids))
+        query = query.where(Mechanics.id.in_(mechanic_ids))
+    open_counts = open_counts.subquery()
+    query = query.add_columns(func.coalesce(open_counts.c.open_tickets, 0)).outerjoin(open_counts, open_counts.c.mechanic_id == Mechanics.id)
+    return connection.execute(query).all()
+
+
+class WorkloadScheduler:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loading = threading.Lock() #one reload at a time, the others keep using the index they have
+        self.reset()
+
+    #Forget everything, the next use reloads from the database
+    def reset(self):
+        with self.lock:
+            self.loaded_at = None
+            self._load = {}
+            self._heaps = {None: []}
+
+    def stale(self, max_age):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > max_age
+
+    def load(self, connection):
+        rows = count_open_tickets(connection)
+        with self.lock:
+            self._load = {mechanic_id: (specialty_key(specialty), count) for mechanic_id, specialty, count in rows}
+            self._heaps = {None: []}
+            for key in {key for key, count in self._load.values()}:
+                self._heaps[key] = []
+            for mechanic_id, (key, count) in self._load.items():
+                self._heaps[None].append((count, mechanic_id))
+                self._heaps[key].append((count, mechanic_id))
+            for heap in self._heaps.values():
+                heapq.heapify(heap)
+            self.loaded_at = time.monotonic()
+
+    def open_tickets(self, mechanic_id):
+        entry = self._load.get(mechanic_id)
+        return entry[1] if entry else None
+
+    #count None means the mechanic is gone
+    def update(self, mechanic_id, specialty, count):
+        with self.lock:
+            if count is None:
+                self._load.pop(mechanic_id, None)
+                return
+            key = specialty_key(specialty)
+            if self._load.get(mechanic_id) == (key, count):
+                return
+            self._load[mechanic_id] = (key, count)
+            for heap_key in (None, key):
+                heap = self._heaps.setdefault(heap_key, [])
+                heapq.heappush(heap, (count, mechanic_id))
+                if len(heap) > 2 * len(self._load) + 64:
+                    self._compact(heap_key)
+
+    #Takes a slot for the mechanic if their count is still count, i.e. no other thread in this process took one since
+    #it was read. Returns False otherwise.
+    def reserve(self, mechanic_id, count):
+        with self.lock:
+            entry = self._load.get(mechanic_id)
+            if entry is None or entry[1] != count:
+                return False
+            self.update(mechanic_id, entry[0], count + 1)
+            return True
+
+    def _compact(self, heap_key):
+        heap = [(count, mechanic_id) for mechanic_id, (key, count) in self._load.items() if heap_key is None or key == heap_key]
+        heapq.heapify(heap)
+        self._heaps[heap_key] = heap
+
+    def _live(self, heap_key, entry):
+        count, mechanic_id = entry
+        current = self._load.get(mechanic_id)
+        return current is not None and current[1] == count and (heap_key is None or current[0] == heap_key)
+
+    #Least loaded mechanic (lowest id on ties) with the specialty, or any specialty for None, skipping exclude.
+    #Returns (mechanic_id, open tickets) or None.
+    def least_loaded(self, specialty=None, exclude=()):
+        heap_key = specialty_key(specialty)
+        with self.lock:
+            heap = self._heaps.get(heap_key)
+            if not heap:
+                return None
+            skipped, found = [], None
+            while heap:
+                entry = heap[0]
+                if not self._live(heap_key, entry):
+                    heapq.heappop(heap)
+                elif entry[1] in exclude:
+                    skipped.append(heapq.heappop(heap))
+                else:
+                    found = entry
+                    break
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+            return (found[1], found[0]) if found else None
+
+
+scheduler = WorkloadScheduler()
+
+
+#Loads the index if it's older than SCHEDULER_MAX_AGE. Only the first load makes other threads wait, after that
+#a thread that finds another one reloading carries on with the index as it is.
+def _refresh(connection, max_age):
+    if not scheduler.stale(max_age):
+        return
+    if scheduler.loading.acquire(blocking=scheduler.loaded_at is None):
+        try:
+            if scheduler.stale(max_age):
+                scheduler.load(connection)
+        finally:
+            scheduler.loading.release()
+
+
+#Picks the least loaded mechanic for a ticket and reserves the slot in the index (the commit hook corrects it either
+#way). The pick is recounted in the database, if another worker moved it the index is fixed and we pick again.
+#Returns (mechanic_id, open tickets before this one) or None when nobody with that specialty has room.
+def pick_mechanic(connection, specialty=None, exclude=()):
+    config = current_app.config
+    capacity = config.get('MECHANIC_MAX_OPEN_TICKETS', DEFAULT_MAX_OPEN_TICKETS)
+    _refresh(connection, config.get('SCHEDULER_MAX_AGE', DEFAULT_MAX_AGE))
+    for _ in range(10):
+        picked = scheduler.least_loaded(specialty, exclude)
+        if picked is None or (capacity and picked[1] >= capacity):
+            return None
+        mechanic_id, count = picked
+        rows = count_open_tickets(connection, [mechanic_id])
+        if not rows:
+            scheduler.update(mechanic_id, None, None)
+            continue
+        actual_id, actual_specialty, actual = rows[0]
+        if actual != count or (specialty and specialty_key(actual_specialty) != specialty_key(specialty)):
+            scheduler.update(mechanic_id, actual_specialty, actual)
+            continue
+        if scheduler.reserve(mechanic_id, count):
+            return mechanic_id, count
+    return None
+
+
+#Inserts the assignment only if the mechanic has fewer than capacity open tickets, counted by the same statement.
+#The mechanic's row is locked first (FOR UPDATE, SQLite leaves it out and has a single writer anyway), so two workers
+#can't both count the last free slot. Returns True if the row went in.
+def assign_if_room(connection, mechanic_id, service_ticket_id, capacity):
+    connection.execute(select(Mechanics.id).where(Mechanics.id == mechanic_id).with_for_update())
+    row = select(literal(mechanic_id), literal(service_ticket_id))
+    if capacity:
+        open_tickets = (
+            select(func.count())
+            .select_from(mechanic_service_ticket)
+            .join(Service_Tickets, Service_Tickets.id == mechanic_service_ticket.c.service_ticket_id)
+            .where(mechanic_service_ticket.c.mechanic_id == mechanic_id, Service_Tickets.status.in_(OPEN_STATUSES))
+            .scalar_subquery()
+        )
+        row = row.where(open_tickets < capacity)
+    result = connection.execute(insert(mechanic_service_ticket).from_select(['mechanic_id', 'service_ticket_id'], row))
+    return result.rowcount == 1
+
+
+#Picks a mechanic for the ticket and assigns them in the session's transaction. A mechanic the database says is full
+#is recounted into the index and the next one is tried. Returns (mechanic_id, open tickets before this one) or None.
+def assign_mechanic(session, service_ticket_id, specialty=None, exclude=()):
+    capacity = current_app.config.get('MECHANIC_MAX_OPEN_TICKETS', DEFAULT_MAX_OPEN_TICKETS)
+    connection = session.connection()
+    for _ in range(10):
+        picked = pick_mechanic(connection, specialty, exclude)
+        if picked is None:
+            return None
+        mechanic_id, count = picked
+        if assign_if_room(connection, mechanic_id, service_ticket_id, capacity):
+            touch_mechanics(session, mechanic_ids=[mechanic_id], connection=connection) #a Core insert, the hooks don't see it
+            return picked
+        for actual_id, actual_specialty, actual in count_open_tickets(connection, [mechanic_id]):
+            scheduler.update(actual_id, actual_specialty, actual)
+    return None
+
+
+#_____________________SESSION HOOKS_____________________
+
+#Recount these mechanics (in this transaction) and apply the counts when it commits. Call it after writes the ORM
+#doesn't see, with the tickets whose status or assignments changed.
+def touch_mechanics(session, ticket_ids=(), mechanic_ids=(), connection=None):
+    connection = connection or session.connection()
+    mechanic_ids = set(mechanic_ids)
+    if ticket_ids:
+        mechanic_ids.update(connection.scalars(
+            select(mechanic_service_ticket.c.mechanic_id).where(mechanic_service_ticket.c.service_ticket_id.in_(set(ticket_ids)))
+        ))
+    mechanic_ids.discard(None)
+    if not mechanic_ids:
+        return
+    updates = session.info.setdefault(UPDATES_KEY, {})
+    counted = {mechanic_id: (specialty, count) for mechanic_id, specialty, count in count_open_tickets(connection, mechanic_ids)}
+    for mechanic_id in mechanic_ids:
+        updates[mechanic_id] = counted.get(mechanic_id, (None, None))
+
+
+def _mechanic_ids(history):
+    return {mechanic.id for mechanic in list(history.added) + list(history.deleted)}
+
+
+#Only what can move a count: a ticket's status or assignments, a mechanic's specialty or assignments, mechanics and
+#tickets coming and going. Editing a ticket's price or description recounts nobody.
+def _after_flush(session, flush_context):
+    ticket_ids, mechanic_ids = set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Service_Tickets):
+            state = inspect(obj)
+            #assignments that were just removed are already gone from the table, and so are deleted tickets' rows
+            mechanic_ids.update(_mechanic_ids(state.attrs.mechanics_service_tickets.history))
+            if obj in session.deleted:
+                mechanic_ids.update(mechanic.id for mechanic in obj.__dict__.get('mechanics_service_tickets', []))
+            elif obj in session.dirty and state.attrs.status.history.has_changes():
+                ticket_ids.add(obj.id)
+        elif isinstance(obj, Mechanics):
+            state = inspect(obj)
+            if obj in session.dirty and not any(state.attrs[name].history.has_changes() for name in ('specialty', 'service_tickets_mechanics')):
+                continue
+            mechanic_ids.add(obj.id)
+    ticket_ids.discard(None)
+    if ticket_ids or mechanic_ids:
+        touch_mechanics(session, ticket_ids, mechanic_ids, connection=session.connection())
+
+
+def _after_commit(session):
+    updates = session.info.pop(UPDATES_KEY, None)
+    if updates and scheduler.loaded_at is not None:
+        for mechanic_id, (specialty, count) in updates.items():
+            scheduler.update(mechanic_id, specialty, count)
+
+
+def _after_rollback(session):
+    session.info.pop(UPDATES_KEY, None)
+
+
+def register_scheduler_hooks():
+    scheduler.reset() #rebuilt from the database on first use
+    for name, listener in (('after_flush', _after_flush), ('after_commit', _after_commit), ('after_rollback', _after_rollback)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
@@ -0,0 +1,255 @@
+import re
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, or_, select, text
+from app.models import db, Base, Customers, Mechanics, Parts, Service_Tickets
+
+#Search over customers, mechanics, parts and tickets.
+#
+#On SQLite every searchable table gets an FTS5 table next to it (customers -> customers_fts) whose rowid is the row's
+#id, so keeping it in sync is a delete + insert by primary key. The ORM flush hook below does that for every insert,
+#update and delete that goes through the session. Code that writes these tables with Core statements has to call
+#index_rows / unindex_rows itself (or run "flask search rebuild" afterwards).
+#
+#Anywhere FTS5 isn't available (Postgres, a SQLite build without it) search falls back to ILIKE over the same columns.
+#That works but scans, it's there so the endpoint behaves the same everywhere, not for big tables.
+
+PREFIX_LENGTHS = '2 3 4' #prefix indexes FTS5 keeps so "bra*" doesn't scan every term starting with b
+MAX_RESULTS = 50
+#bm25 weight per FTS column, in column order: what identifies a row outranks free text, so "brake" puts the part
+#named Brake Pads above a ticket that mentions brakes once in a long description
+RANK_WEIGHTS = {
+    'customers': (4.0, 4.0, 2.0, 1.0, 1.0),
+    'mechanics': (4.0, 4.0, 2.0, 1.0, 1.0, 2.0),
+    'parts': (4.0,),
+    'service_tickets': (2.0, 2.0, 1.0),
+}
+PHONE_SEPARATORS = ' -().+/'
+
+
+def _digits(phone):
+    return "".join(ch for ch in (phone or "") if ch.isdigit())
+
+
+#same thing in SQL for rebuilds, phones here only ever contain digits and PHONE_SEPARATORS
+def _digits_sql(column):
+    for ch in PHONE_SEPARATORS:
+        column = f"REPLACE({column}, '{ch}', '')"
+    return column
+
+
+#kind -> (model, columns in the FTS table). A column is (name, python getter, SQL expression for rebuilds)
+def _column(name):
+    return (name, lambda obj: getattr(obj, name), name)
+
+
+def _phone_digits():
+    return ('phone_digits', lambda obj: _digits(obj.phone), _digits_sql('phone')) #so 5551234567 finds 555-123-4567
+
+
+SEARCH_INDEXES = {
+    'customers': (Customers, [_column('first_name'), _column('last_name'), _column('email'), _column('phone'), _phone_digits()]),
+    'mechanics': (Mechanics, [_column('first_name'), _column('last_name'), _column('email'), _column('phone'), _phone_digits(), _column('specialty')]),
+    'parts': (Parts, [_column('part_name')]),
+    'service_tickets': (Service_Tickets, [_column('vehicle_make'), _column('vehicle_model'), _column('service_description')]),
+}
+MODEL_KINDS = {model: kind for kind, (model, columns) in SEARCH_INDEXES.items()}
+
+
+def fts_table(kind):
+    return f"{kind}_fts"
+
+
+#True for the FTS tables and the shadow tables FTS5 creates for them (customers_fts_data, _idx, ...), which aren't
+#in models.py. Alembic's include_name uses it so autogenerate and the schema check leave them alone.
+def is_search_table(name):
+    return any(name == fts_table(kind) or name.startswith(fts_table(kind) + "_") for kind in SEARCH_INDEXES)
+
+
+def _fts5_available(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    cached = connection.info.get('fts5')
+    if cached is None:
+        options = {row[0] for row in connection.exec_driver_sql("PRAGMA compile_options")}
+        cached = connection.info['fts5'] = 'ENABLE_FTS5' in options
+    return cached
+
+
+def search_index_exists(connection):
+    return _fts5_available(connection) and inspect(connection).has_table(fts_table('customers'))
+
+
+#_____________________SCHEMA_____________________
+
+def create_search_index(connection):
+    if not _fts5_available(connection):
+        return
+    for kind, (model, columns) in SEARCH_INDEXES.items():
+        names = ", ".join(name for name, getter, sql in columns)
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table(kind)} USING fts5("
+            f"{names}, tokenize = 'unicode61 remove_diacritics 2', prefix = '{PREFIX_LENGTHS}')"
+        )
+
+
+def drop_search_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    for kind in SEARCH_INDEXES:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts_table(kind)}")
+
+
+#Fills the FTS tables from scratch with one INSERT ... SELECT per table
+def rebuild_search_index(connection):
+    if not search_index_exists(connection):
+        return
+    for kind, (model, columns) in SEARCH_INDEXES.items():
+        names = ", ".join(name for name, getter, sql in columns)
+        expressions = ", ".join(sql for name, getter, sql in columns)
+        connection.exec_driver_sql(f"DELETE FROM {fts_table(kind)}")
+        connection.exec_driver_sql(
+            f"INSERT INTO {fts_table(kind)} (rowid, {names}) SELECT id, {expressions} FROM {model.__tablename__}"
+        )
+
+
+#db.create_all / drop_all (tests, fresh databases) build and remove the FTS tables along with the models' tables.
+#Existing databases get them from migration 0004.
+def _after_create(target, connection, **kw):
+    create_search_index(connection)
+
+
+def _before_drop(target, connection, **kw):
+    drop_search_index(connection)
+
+
+#_____________________SYNC_____________________
+
+def index_rows(connection, kind, objects):
+    model, columns = SEARCH_INDEXES[kind]
+    rows = [dict({name: getter(obj) for name, getter, sql in columns}, rowid=obj.id) for obj in objects]
+    if not rows:
+        return
+    names = [name for name, getter, sql in columns]
+    unindex_rows(connection, kind, [row['rowid'] for row in rows])
+    connection.execute(
+        text(f"INSERT INTO {fts_table(kind)} (rowid, {', '.join(names)}) VALUES (:rowid, {', '.join(':' + name for name in names)})"),
+        rows
+    )
+
+
+def unindex_rows(connection, kind, ids):
+    if ids:
+        connection.execute(text(f"DELETE FROM {fts_table(kind)} WHERE rowid = :id"), [{'id': id} for id in ids])
+
+
+def _changed(obj, columns):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name, getter, sql in columns if name in state.attrs)
+
+
+def _after_flush(session, flush_context):
+    upserts, deletes = {}, {}
+    for obj in session.new:
+        kind = MODEL_KINDS.get(type(obj))
+        if kind:
+            upserts.setdefault(kind, []).append(obj)
+    for obj in session.dirty:
+        kind = MODEL_KINDS.get(type(obj))
+        if kind and _changed(obj, SEARCH_INDEXES[kind][1]):
+            upserts.setdefault(kind, []).append(obj)
+    for obj in session.deleted:
+        kind = MODEL_KINDS.get(type(obj))
+        if kind:
+            deletes.setdefault(kind, []).append(obj.id)
+    if not (upserts or deletes):
+        return
+    connection = session.connection()
+    if not search_index_exists(connection):
+        return
+    for kind, ids in deletes.items():
+        unindex_rows(connection, kind, ids)
+    for kind, objects in upserts.items():
+        index_rows(connection, kind, objects)
+
+
+def register_search_sync():
+    for target, name, listener in ((Base.metadata, 'after_create', _after_create), (Base.metadata, 'before_drop', _before_drop),
+                                   (db.session, 'after_flush', _after_flush)):
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+
+#_____________________QUERY_____________________
+
+#"555-12 bra" -> "555"* "12"* "bra"*  : every word has to match, each as a prefix. Only \w+ runs get through,
+#so nothing the user types can turn into FTS5 query syntax.
+def _terms(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def _fts_search(connection, kind, terms, limit):
+    model, columns = SEARCH_INDEXES[kind]
+    match = " ".join(f'"{term}"*' for term in terms)
+    names = [name for name, getter, sql in columns]
+    #"rank MATCH" swaps in the weighted bm25 for this query only. ORDER BY rank LIMIT is FTS5's own top-N path: every
+    #match is scored but only limit rows are kept and sorted, and only those come back to Python.
+    rows = connection.execute(
+        text(f"SELECT rowid, rank, {', '.join(names)} FROM {fts_table(kind)} WHERE {fts_table(kind)} MATCH :match AND rank MATCH :weights "
+             "ORDER BY rank LIMIT :limit"),
+        {'match': match, 'weights': f"bm25({', '.join(map(str, RANK_WEIGHTS[kind]))})", 'limit': limit}
+    ).mappings()
+    return [(row['rank'], row['rowid'], row) for row in rows]
+
+
+def _like_search(connection, kind, terms, limit):
+    model, columns = SEARCH_INDEXES[kind]
+    fields = [getattr(model, name) for name, getter, sql in columns if hasattr(model, name)]
+    query = select(model).order_by(model.id).limit(limit)
+    for term in terms:
+        query = query.where(or_(*[field.ilike(f"%{term}%") for field in fields]))
+    results = []
+    for obj in db.session.scalars(query):
+        results.append((None, obj.id, {name: getter(obj) for name, getter, sql in columns}))
+    return results
+
+
+def _label(kind, row):
+    if kind in ('customers', 'mechanics'):
+        return f"{row['first_name']} {row['last_name']} <{row['email']}> {row['phone']}"
+    if kind == 'parts':
+        return row['part_name']
+    return f"{row['vehicle_make']} {row['vehicle_model']}: {row['service_description']}"
+
+
+#Best matches across the requested kinds. FTS5's rank is bm25, lower is better, so merging is a plain sort.
+def search(query, kinds=None, limit=20):
+    terms = _terms(query)
+    if not terms:
+        return []
+    connection = db.session.connection()
+    fts = search_index_exists(connection)
+    results = []
+    for kind in kinds or SEARCH_INDEXES:
+        found = _fts_search(connection, kind, terms, limit) if fts else _like_search(connection, kind, terms, limit)
+        results.extend(
+            {'type': kind, 'id': row_id, 'label': _label(kind, row), 'score': score}
+            for score, row_id, row in found
+        )
+    if fts:
+        results.sort(key=lambda result: result['score'])
+    return results[:limit]
+
+
+#flask --app "app:create_app('DevelopmentConfig')" search rebuild
+search_cli = AppGroup('search', help='Full-text search index.')
+
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    with db.engine.begin() as connection:
+        if not search_index_exists(connection):
+            click.echo('No FTS5 search index on this database (search uses LIKE instead).')
+            return
+        rebuild_search_index(connection)
+    click.echo('Search index rebuilt.')
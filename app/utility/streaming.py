@@ -0,0 +1,22 @@
+from flask import Response, current_app, request, stream_with_context
+from app.models import db
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_BATCH_SIZE = 500
+
+
+#True when the client asked for newline delimited JSON (Accept: application/x-ndjson)
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+#Streams one JSON object per line. yield_per makes SQLAlchemy fetch rows from the cursor in batches
+#instead of loading the whole result, so memory stays flat and the first row goes out right away.
+#schema can be a marshmallow schema or a FastSerializer, rows are dumped one at a time whatever its many says.
+def stream_ndjson(query, schema, batch_size=STREAM_BATCH_SIZE):
+    def generate():
+        rows = db.session.scalars(query.execution_options(yield_per=batch_size))
+        for row in rows:
+            yield current_app.json.dumps(schema.dump(row, many=False)) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
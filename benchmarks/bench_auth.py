@@ -0,0 +1,61 @@
+#Per-request cost of the auth decorator stack (token_required + mechanic_required) on a route that does nothing.
+#"old" is what token_required used to do: jose decode + print(payload) on every request.
+#Run from the repo root: python benchmarks/bench_auth.py [requests]   (stdout of the old version goes to /dev/null)
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g, request
+from jose import jwt
+from app import create_app
+from app.utility.auth import SECRET_KEY, Principal, encode_token, mechanic_required, pyjwt, token_cache, token_required
+
+
+def view():
+    return "ok"
+
+
+def old_stack(devnull):
+    token = request.headers['Authorization'].split()[1]
+    data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+    print(data, file=devnull)
+    g.principal = Principal(data['sub'], data['role'])
+    return mechanic_required(view)()
+
+
+def run(app, token, stack, requests):
+    headers = {'Authorization': f"Bearer {token}"}
+    with app.test_request_context('/service_tickets', headers=headers):
+        stack() #warm up
+        start = time.perf_counter()
+        for _ in range(requests):
+            stack()
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = create_app('TestingConfig')
+    new_stack = token_required(mechanic_required(view))
+    with app.app_context():
+        token = encode_token(1, 'mechanic')
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        old = run(app, token, lambda: old_stack(devnull), requests)
+    print(f"{'old (jose + print)':28} {old:8.1f} us/request")
+
+    backends = ['jose'] + (['pyjwt'] if pyjwt else [])
+    for backend in backends:
+        for cache_size in (0, 1024):
+            app.config.update(JWT_BACKEND=backend, JWT_CACHE_SIZE=cache_size)
+            token_cache.clear()
+            took = run(app, token, new_stack, requests)
+            label = f"{backend}, cache {'on' if cache_size else 'off'}"
+            print(f"{label:28} {took:8.1f} us/request  ({old / took:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#Closing out a day's jobs: N tickets moved to Complete one PUT /service_tickets at a time (load, setattr, commit each)
+#against a single PUT /service_tickets/status with the id list, on a table of T tickets.
+#Run from the repo root: python benchmarks/bench_bulk_status.py [jobs] [tickets]   (default 300 and 100,000)
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from app import create_app
+from app.models import db, Service_Tickets
+from app.utility.auth import encode_token
+from app.utility.rollups import rebuild_rollups
+
+
+def make_app(db_path):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}"})
+    return create_app('BenchmarkConfig')
+
+
+def seed(connection, tickets):
+    connection.exec_driver_sql("INSERT INTO customers (id, first_name, last_name, email, password, phone, address, role) VALUES (1, 'A', 'B', 'a@b.com', 'x', '1', 'here', 'customer')")
+    connection.exec_driver_sql("INSERT INTO mechanics (id, first_name, last_name, specialty, phone, email, password, role) VALUES (1, 'Mech', 'One', 'Brakes', '2', 'm@b.com', 'x', 'mechanic')")
+    connection.exec_driver_sql(
+        "INSERT INTO service_tickets (id, customer_id, vehicle_make, vehicle_model, vehicle_year, service_description, date_created, status, total_cents) "
+        "VALUES (?, 1, 'Honda', 'Civic', 2015, 'oil change', '2026-01-01', ?, 5000)",
+        [(i, "In Progress" if i % 2 else "Pending") for i in range(1, tickets + 1)]
+    )
+    connection.exec_driver_sql("INSERT INTO mechanic_service_ticket (mechanic_id, service_ticket_id) VALUES (1, ?)", [(i,) for i in range(1, tickets + 1)])
+    rebuild_rollups(connection)
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    tickets = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    directory = tempfile.mkdtemp()
+    try:
+        app = make_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                seed(connection, tickets)
+        print(f"{jobs} jobs to close out of {tickets} tickets")
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {encode_token(1, 'mechanic')}"}
+        start = time.perf_counter()
+        for ticket_id in range(1, jobs + 1):
+            client.put('/service_tickets', json={"service_ticket_id": ticket_id, "status": "Complete"}, headers=headers)
+        one_by_one = (time.perf_counter() - start) * 1000
+        print(f"  {jobs} x PUT /service_tickets            {one_by_one:9.1f} ms")
+
+        start = time.perf_counter()
+        response = client.put('/service_tickets/status', json={"status": "Complete", "service_ticket_ids": list(range(jobs + 1, 2 * jobs + 1))}, headers=headers)
+        bulk = (time.perf_counter() - start) * 1000
+        print(f"  1 x PUT /service_tickets/status        {bulk:9.1f} ms   ({len(response.json['updated'])} moved, {one_by_one / bulk:.0f}x faster)")
+
+        with app.app_context():
+            complete = db.session.scalar(select(func.count()).where(Service_Tickets.status == "Complete"))
+            with db.engine.begin() as connection:
+                drift = rebuild_rollups(connection)
+        print(f"complete tickets: {complete}, rollup rows that drifted: {drift}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
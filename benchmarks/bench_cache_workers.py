@@ -0,0 +1,88 @@
+#Cache hit ratio across N worker processes: per-process SimpleCache vs a shared FileSystemCache.
+#Every worker reads random tickets through the real cached_view route; a request that sends no SQL was a hit.
+#Run from the repo root: python benchmarks/bench_cache_workers.py [workers] [requests_per_worker] [tickets]
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app
+from app.models import Customers, Mechanics, Service_Tickets, db
+from app.utility.auth import encode_token
+
+
+def make_app(db_path, cache_config):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), dict(cache_config, SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}"))
+    return create_app('BenchmarkConfig')
+
+
+def seed(db_path, tickets):
+    from sqlalchemy import create_engine
+    from app.models import Base
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Customers.__table__.insert(), [{"id": 1, "first_name": "A", "last_name": "B", "email": "a@b.c", "password": "x", "phone": "1", "address": "x", "role": "customer"}])
+        conn.execute(Mechanics.__table__.insert(), [{"id": 1, "first_name": "M", "last_name": "N", "email": "m@n.c", "password": "x", "phone": "2", "specialty": "x", "role": "mechanic"}])
+        conn.execute(Service_Tickets.__table__.insert(), [
+            {"customer_id": 1, "vehicle_make": "Ford", "vehicle_model": "F150", "vehicle_year": 2020, "service_description": "x", "status": "Pending"}
+            for _ in range(tickets)
+        ])
+    engine.dispose()
+
+
+def worker(db_path, cache_config, requests, tickets, seed_value, results):
+    app = make_app(db_path, cache_config)
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {encode_token(1, 'mechanic')}"}
+    rng = random.Random(seed_value)
+    hits = 0
+    sql = []
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", lambda *args: sql.append(1))
+    for _ in range(requests):
+        before = len(sql)
+        client.get(f"/service_tickets/{rng.randint(1, tickets)}", headers=headers)
+        hits += len(sql) == before
+    results.put(hits)
+
+
+def run(workers, requests, tickets, cache_config, db_path):
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(db_path, cache_config, requests, tickets, n, results))
+        for n in range(workers)
+    ]
+    for p in processes:
+        p.start()
+    hits = sum(results.get() for _ in processes)
+    for p in processes:
+        p.join()
+    return hits / (workers * requests)
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    tickets = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    folder = tempfile.mkdtemp()
+    try:
+        for label, cache_config in (
+            ("SimpleCache (per process)", {"CACHE_TYPE": "SimpleCache"}),
+            ("FileSystemCache (shared)", {"CACHE_TYPE": "FileSystemCache", "CACHE_DIR": os.path.join(folder, "cache")}),
+        ):
+            db_path = os.path.join(folder, f"{cache_config['CACHE_TYPE']}.db")
+            seed(db_path, tickets)
+            ratio = run(workers, requests, tickets, cache_config, db_path)
+            print(f"{label:28} {workers} workers x {requests} requests over {tickets} tickets: hit ratio {ratio:.1%}")
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,83 @@
+#Onboarding N customers: one POST /customers per row against POST /customers/import with the whole CSV, and the
+#import again with passwords hashed on a process pool. Hashing uses the cheap test settings unless a method is given,
+#with the production scrypt cost the hashing is most of the time and the pool is what matters.
+#Run from the repo root: python benchmarks/bench_import.py [rows] [hash method] [pool workers]
+#   (default 2,000, pbkdf2:sha256:1000, one per CPU)
+import csv
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db
+from app.utility.auth import encode_token
+from app.utility.passwords import shutdown_pool
+
+
+def make_app(db_path, method, workers):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}",
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_HASH_WORKERS': workers,
+    })
+    app = create_app('BenchmarkConfig')
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO mechanics (id, first_name, last_name, specialty, phone, email, password, role) VALUES (1, 'M', 'M', 'x', '0', 'm@m.com', 'x', 'mechanic')")
+    return app
+
+
+def customers(prefix, count):
+    return [{"first_name": "Jane", "last_name": f"Smith{i}", "email": f"{prefix}{i}@email.com", "password": f"secret{i}",
+             "phone": f"{prefix}-{i:07d}", "address": f"{i} Main St"} for i in range(count)]
+
+
+def as_csv(rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def report(label, count, seconds):
+    print(f"  {label:40} {seconds:8.2f} s   {count / seconds:9.0f} rows/sec")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    method = sys.argv[2] if len(sys.argv) > 2 else 'pbkdf2:sha256:1000'
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+    headers = {"Authorization": f"Bearer {encode_token(1, 'mechanic')}"}
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{count} customers, {method}")
+        for label, pool in (("inline hashing", 0), (f"{workers} hashing processes", workers)):
+            app = make_app(os.path.join(directory, f"bench{pool}.db"), method, pool)
+            client = app.test_client()
+            print(label)
+            if pool == 0:
+                start = time.perf_counter()
+                for row in customers("a", count):
+                    client.post('/customers', json=row)
+                report(f"{count} x POST /customers", count, time.perf_counter() - start)
+
+            body = as_csv(customers("b", count))
+            start = time.perf_counter()
+            response = client.post('/customers/import', data=body, content_type='text/csv', headers=headers)
+            report("POST /customers/import", response.json['imported'], time.perf_counter() - start)
+            shutdown_pool()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#JSON encoding cost of a big ticket list: service_tickets_schema.dump of N tickets, then the stdlib provider vs orjson
+#for the encode step and for the whole app.json.response() call that jsonify / schema.jsonify make.
+#Also encodes the raw rows with date objects in them, which orjson handles natively and the stdlib needs a default() for.
+#Run from the repo root: python benchmarks/bench_json.py [tickets]   (default 10,000)
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.blueprints.Service_Tickets.schemas import service_tickets_schema
+from app.models import Service_Tickets
+from app.utility import json_provider
+
+MAKES = [("Honda", "Civic"), ("Toyota", "Corolla"), ("Ford", "F-150"), ("Subaru", "Outback"), ("Tesla", "Model 3"), ("BMW", "X5")]
+PROBLEMS = ["squeaky brakes", "oil change", "check engine light", "rough idle", "battery dead", "AC not cold", "flat tire"]
+
+
+def make_tickets(count):
+    rng = random.Random(1)
+    tickets = []
+    for i in range(1, count + 1):
+        make, model = rng.choice(MAKES)
+        created = date(2025, 1, 1) + timedelta(days=rng.randint(0, 365))
+        total = rng.randint(0, 200000)
+        done = rng.random() < 0.5
+        tickets.append(Service_Tickets(
+            id=i, customer_id=rng.randint(1, 5000), vehicle_make=make, vehicle_model=model, vehicle_year=rng.randint(2000, 2025),
+            service_description=rng.choice(PROBLEMS), date_created=created, price=total / 100, total_cents=total,
+            status="Complete" if done else "Pending",
+            completion_date=created + timedelta(days=3) if done else None
+        ))
+    return tickets
+
+
+def timed(label, fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"  {label:44} median {statistics.median(timings):8.1f} ms   best {min(timings):8.1f} ms")
+    return statistics.median(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = 15
+    app = create_app('TestingConfig')
+    app.debug = False #compact output, like production
+    tickets = make_tickets(count)
+    columns = [column.key for column in Service_Tickets.__table__.columns]
+    raw_rows = [{column: getattr(ticket, column) for column in columns} for ticket in tickets]
+
+    with app.app_context():
+        dumped = service_tickets_schema.dump(tickets)
+        providers = {'json': json_provider.JSONProvider(app), 'orjson': json_provider.OrjsonProvider(app)}
+        size = len(providers['orjson'].dumps(dumped))
+        print(f"{count} tickets, {size / 1024:.0f} KB of JSON")
+
+        dump = timed("service_tickets_schema.dump", lambda: service_tickets_schema.dump(tickets), repeat)
+        encode, respond = {}, {}
+        for name, provider in providers.items():
+            encode[name] = timed(f"{name}: dumps(schema output)", lambda: provider.dumps(dumped), repeat)
+            respond[name] = timed(f"{name}: response(schema output)", lambda: provider.response(dumped), repeat)
+            timed(f"{name}: dumps(raw rows with date objects)", lambda: provider.dumps(raw_rows), repeat)
+
+        print(f"encode: orjson {encode['json'] / encode['orjson']:.1f}x faster")
+        print(f"schema.jsonify end to end: {dump + respond['json']:.1f} ms -> {dump + respond['orjson']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
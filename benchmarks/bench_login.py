@@ -0,0 +1,124 @@
+#Login latency under concurrency: hashing on the request thread vs on the password process pool.
+#Starts the app on a real threaded server and fires logins from C client threads, prints p50/p99. A probe thread
+#hits a cheap route (401 on a missing token) during the storm to show what hashing does to everyone else.
+#Run from the repo root: python benchmarks/bench_login.py [clients] [logins_per_client] [pool_workers]
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server
+from werkzeug.security import generate_password_hash
+from app import create_app
+from app.models import Customers, db
+from app.utility.passwords import shutdown_pool
+
+METHOD = 'scrypt:32768:8:1'
+
+
+def make_app(db_path, workers):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}",
+        'PASSWORD_HASH_METHOD': METHOD,
+        'PASSWORD_HASH_WORKERS': workers,
+        'PASSWORD_HASH_QUEUE': 1000,
+        'RATELIMIT_ENABLED': False,
+    })
+    return create_app('BenchmarkConfig')
+
+
+def seed(app, users):
+    with app.app_context():
+        db.create_all()
+        hashed = generate_password_hash("12345", METHOD)
+        db.session.add_all(Customers(first_name="C", last_name=str(i), email=f"c{i}@email.com", phone=f"555-{i:07d}",
+                                     address="1 Main St", password=hashed) for i in range(users))
+        db.session.commit()
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return statistics.median(latencies) * 1000, p99 * 1000
+
+
+def run(workers, clients, logins, db_path):
+    app = make_app(db_path, workers)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/customers/login"
+
+    latencies = []
+    lock = threading.Lock()
+
+    def client(n):
+        body = json.dumps({"email": f"c{n}@email.com", "password": "12345"}).encode()
+        for _ in range(logins):
+            request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+            start = time.perf_counter()
+            with urllib.request.urlopen(request) as response:
+                assert response.status == 200
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    probe_latencies = []
+    done = threading.Event()
+
+    def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/customers/logout", data=b"")
+            except urllib.error.HTTPError:
+                pass #401, that's the point
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    probe_thread = threading.Thread(target=probe)
+    probe_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    took = time.perf_counter() - start
+    done.set()
+    probe_thread.join()
+    server.shutdown()
+    shutdown_pool()
+
+    label = f"pool, {workers} processes" if workers else "inline (request thread)"
+    print(f"{label:26} {len(latencies) / took:6.1f} logins/s  login p50 {percentiles(latencies)[0]:7.1f} ms  p99 {percentiles(latencies)[1]:7.1f} ms"
+          f"  |  other requests p50 {percentiles(probe_latencies)[0]:6.1f} ms  p99 {percentiles(probe_latencies)[1]:6.1f} ms")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 2)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR) #no access log line per request
+    directory = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(directory, 'bench.db')
+        seed(make_app(db_path, 0), clients)
+        print(f"{clients} clients x {logins} logins, {METHOD}")
+        for pool_workers in (0, workers):
+            run(pool_workers, clients, logins, db_path)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
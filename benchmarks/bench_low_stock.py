@@ -0,0 +1,79 @@
+#Finding the parts that need reordering among N parts (about 1% of them low): GET /parts and filter on the client,
+#WHERE stock <= reorder_threshold without and with the partial index, and GET /parts/low_stock off the reorder queue.
+#Also what keeping the queue current costs a stock write (PUT /parts/add_stock).
+#Run from the repo root: python benchmarks/bench_low_stock.py [parts]   (default 100,000)
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app import create_app
+from app.models import db, Parts
+from app.utility.auth import encode_token
+from app.utility.reorder import rebuild_reorder_queue
+
+
+def make_app(db_path):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}"})
+    return create_app('BenchmarkConfig')
+
+
+def seed(connection, count):
+    rng = random.Random(1)
+    connection.exec_driver_sql("INSERT INTO mechanics (id, first_name, last_name, specialty, phone, email, password, role) VALUES (1, 'M', 'M', 'x', '0', 'm@m.com', 'x', 'mechanic')")
+    connection.exec_driver_sql(
+        "INSERT INTO parts (id, part_name, price, stock, reorder_threshold) VALUES (?, ?, 9.99, ?, 10)",
+        [(i, f"Part {i}", rng.randint(0, 10) if rng.random() < 0.01 else rng.randint(11, 500)) for i in range(1, count + 1)]
+    )
+    rebuild_reorder_queue(connection)
+
+
+def timed(label, fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"  {label:52} median {statistics.median(timings):9.2f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    directory = tempfile.mkdtemp()
+    try:
+        app = make_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                seed(connection, count)
+            low = select(Parts.id, Parts.part_name, Parts.stock).where(Parts.stock <= Parts.reorder_threshold)
+            print(f"{count} parts, {len(db.session.execute(low).all())} low")
+            with db.engine.connect() as connection:
+                timed("WHERE stock <= reorder_threshold, NOT INDEXED", lambda: connection.exec_driver_sql(
+                    "SELECT id, part_name, stock FROM parts NOT INDEXED WHERE stock <= reorder_threshold").all())
+                timed("WHERE stock <= reorder_threshold, partial index", lambda: connection.execute(low).all())
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {encode_token(1, 'mechanic')}"}
+        timed("GET /parts, filtered in Python", lambda: [part for part in client.get('/parts', headers=headers).json
+                                                          if part['stock'] <= part['reorder_threshold']], 5)
+        timed("GET /parts/low_stock?limit=200", lambda: client.get('/parts/low_stock?limit=200', headers=headers))
+        part_ids = iter(range(1, count + 1))
+        timed("PUT /parts/add_stock (update + queue sync)", lambda: client.put('/parts/add_stock', json={"part_id": next(part_ids), "additional_stock": 1}, headers=headers), 200)
+        with app.app_context():
+            with db.engine.begin() as connection:
+                print(f"queue entries out of date afterwards: {rebuild_reorder_queue(connection)}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
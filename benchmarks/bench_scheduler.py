@@ -0,0 +1,110 @@
+#Auto-assign at scale: M mechanics, T tickets (each assigned to one mechanic, a third of them still open).
+#Compares finding the least loaded mechanic with a GROUP BY over every assignment (what a dispatcher polling
+#my_tickets amounts to) against the in-memory index from app/utility/scheduler.py, with and without the database
+#recount of the pick that pick_mechanic does, and the whole POST /service_tickets/<id>/auto_assign request.
+#Run from the repo root: python benchmarks/bench_scheduler.py [mechanics] [tickets]   (default 10,000 and 1,000,000)
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from app import create_app
+from app.models import db
+from app.utility.auth import encode_token
+from app.utility.scheduler import count_open_tickets, pick_mechanic, scheduler
+
+SPECIALTIES = ["Brakes", "Engines", "Transmissions", "Electrical", "Suspension", "Tires", "Diagnostics", "Body Work"]
+
+
+def make_app(db_path):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}",
+        'MECHANIC_MAX_OPEN_TICKETS': 0, #no cap, we only care about finding the minimum
+    })
+    return create_app('BenchmarkConfig')
+
+
+def seed(connection, mechanics, tickets):
+    rng = random.Random(1)
+    connection.exec_driver_sql("INSERT INTO customers (id, first_name, last_name, email, password, phone, address, role) VALUES (1, 'A', 'B', 'a@b.com', 'x', '1', 'here', 'customer')")
+    connection.exec_driver_sql(
+        "INSERT INTO mechanics (id, first_name, last_name, specialty, phone, email, password, role) VALUES (?, 'Mech', ?, ?, ?, ?, 'x', 'mechanic')",
+        [(i, f"No{i}", rng.choice(SPECIALTIES), f"m{i}", f"mech{i}@email.com") for i in range(1, mechanics + 1)]
+    )
+    batch = 100000
+    for start in range(1, tickets + 1, batch):
+        ids = range(start, min(start + batch, tickets + 1))
+        connection.exec_driver_sql(
+            "INSERT INTO service_tickets (id, customer_id, vehicle_make, vehicle_model, vehicle_year, service_description, date_created, status, total_cents) "
+            "VALUES (?, 1, 'Honda', 'Civic', 2015, 'oil change', '2026-01-01', ?, 0)",
+            [(i, "In Progress" if rng.random() < 0.33 else "Complete") for i in ids]
+        )
+        connection.exec_driver_sql("INSERT INTO mechanic_service_ticket (mechanic_id, service_ticket_id) VALUES (?, ?)",
+                                   [(rng.randint(1, mechanics), i) for i in ids])
+    #a few unassigned open tickets for the request benchmark
+    connection.exec_driver_sql(
+        "INSERT INTO service_tickets (id, customer_id, vehicle_make, vehicle_model, vehicle_year, service_description, date_created, status, total_cents) "
+        "VALUES (?, 1, 'Honda', 'Civic', 2015, 'new job', '2026-01-02', 'Pending', 0)",
+        [(i,) for i in range(tickets + 1, tickets + 201)]
+    )
+
+
+def timed(label, fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"  {label:44} p50 {statistics.median(timings):9.3f} ms   p99 {timings[int(len(timings) * 0.99) - 1]:9.3f} ms")
+
+
+def main():
+    mechanics = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tickets = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    directory = tempfile.mkdtemp()
+    try:
+        app = make_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            with db.engine.begin() as connection:
+                seed(connection, mechanics, tickets)
+            print(f"{mechanics} mechanics, {tickets} tickets: seeded in {time.perf_counter() - start:.1f}s")
+
+            connection = db.session.connection()
+            start = time.perf_counter()
+            scheduler.load(connection)
+            print(f"  index load (startup, once per worker)       {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+            def scan():
+                rows = count_open_tickets(connection)
+                return min((count, mechanic_id) for mechanic_id, specialty, count in rows if specialty == "Brakes")
+            timed("GROUP BY every assignment, then min", scan, 5)
+            timed("index: least_loaded('brakes')", lambda: scheduler.least_loaded("brakes"), 2000)
+            timed("index: pick_mechanic (recount + reserve)", lambda: pick_mechanic(connection, "brakes"), 2000)
+            db.session.rollback()
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {encode_token(1, 'mechanic')}"}
+        ticket_ids = iter(range(tickets + 1, tickets + 201))
+        timed("POST /service_tickets/<id>/auto_assign", lambda: client.post(f"/service_tickets/{next(ticket_ids)}/auto_assign",
+                                                                             json={"specialty": "Brakes"}, headers=headers), 200)
+        with app.app_context():
+            actual = {mechanic_id: count for mechanic_id, specialty, count in count_open_tickets(db.session.connection())}
+            drift = sum(1 for mechanic_id, count in actual.items() if scheduler.open_tickets(mechanic_id) != count)
+            print(f"index entries that disagree with the database afterwards: {drift}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
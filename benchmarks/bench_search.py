@@ -0,0 +1,103 @@
+#Search latency on a big SQLite database: N customers, N/10 parts, N/2 tickets, FTS5 index built with a rebuild.
+#Times search() (what GET /search runs) for a few query shapes, plus the ILIKE fallback for comparison.
+#Run from the repo root: python benchmarks/bench_search.py [customers]   (default 1,000,000, takes a minute to seed)
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db
+from app.utility import search as search_module
+from app.utility.search import rebuild_search_index, search
+
+FIRST = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth", "Jose", "Chen", "Aisha", "Dmitri", "Yuki"]
+LAST = ["Smith", "Johnson", "Williams", "Brown", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez", "Nguyen", "Kowalski", "Okafor"]
+PARTS = ["Brake Pads", "Brake Rotor", "Oil Filter", "Air Filter", "Spark Plug", "Timing Belt", "Alternator", "Radiator Hose", "Wiper Blade", "Battery"]
+MAKES = [("Honda", "Civic"), ("Toyota", "Corolla"), ("Ford", "F-150"), ("Subaru", "Outback"), ("Tesla", "Model 3"), ("BMW", "X5")]
+PROBLEMS = ["squeaky brakes", "oil change", "check engine light", "rough idle", "battery dead", "AC not cold", "flat tire"]
+
+
+def make_app(db_path):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}"})
+    return create_app('BenchmarkConfig')
+
+
+def seed(connection, customers):
+    rng = random.Random(1)
+    batch = 50000
+    for start in range(0, customers, batch):
+        connection.exec_driver_sql(
+            "INSERT INTO customers (id, first_name, last_name, email, password, phone, address, role) VALUES (?, ?, ?, ?, 'x', ?, '1 Main St', 'customer')",
+            [(i, rng.choice(FIRST), rng.choice(LAST), f"user{i}@email.com", f"{200 + i // 10000000:03d}-{(i // 10000) % 1000:03d}-{i % 10000:04d}")
+             for i in range(start + 1, min(start + batch, customers) + 1)]
+        )
+    connection.exec_driver_sql(
+        "INSERT INTO parts (id, part_name, price, stock) VALUES (?, ?, 9.99, 10)",
+        [(i, f"{rng.choice(PARTS)} {i}") for i in range(1, customers // 10 + 1)]
+    )
+    for start in range(0, customers // 2, batch):
+        connection.exec_driver_sql(
+            "INSERT INTO service_tickets (id, customer_id, vehicle_make, vehicle_model, vehicle_year, service_description, date_created, status, total_cents) "
+            "VALUES (?, ?, ?, ?, 2015, ?, '2026-01-01', 'Pending', 0)",
+            [(i, rng.randint(1, customers), *rng.choice(MAKES), rng.choice(PROBLEMS)) for i in range(start + 1, min(start + batch, customers // 2) + 1)]
+        )
+
+
+def time_queries(app, label, queries, repeat):
+    timings = []
+    with app.app_context():
+        for _ in range(repeat):
+            for query, kinds in queries:
+                start = time.perf_counter()
+                search(query, kinds, limit=20)
+                timings.append((time.perf_counter() - start) * 1000)
+                db.session.rollback()
+    timings.sort()
+    print(f"  {label:34} p50 {statistics.median(timings):8.2f} ms   p99 {timings[int(len(timings) * 0.99) - 1]:8.2f} ms")
+
+
+def main():
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    directory = tempfile.mkdtemp()
+    try:
+        app = make_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            with db.engine.begin() as connection:
+                seed(connection, customers)
+            seeded = time.perf_counter() - start
+            start = time.perf_counter()
+            with db.engine.begin() as connection:
+                rebuild_search_index(connection)
+            print(f"{customers} customers, {customers // 10} parts, {customers // 2} tickets: seed {seeded:.1f}s, index rebuild {time.perf_counter() - start:.1f}s")
+
+        shapes = {
+            'name prefix ("jenn smi")': [("jenn smi", ['customers'])],
+            'phone digits ("2000421")': [("2000421", ['customers'])],
+            'email ("user123456")': [("user123456", ['customers'])],
+            'part prefix ("timing be 77")': [("timing be 77", ['parts'])],
+            'all types ("civic squeak")': [("civic squeak", None)],
+        }
+        print("FTS5")
+        for label, queries in shapes.items():
+            time_queries(app, label, queries, 50)
+        print("ILIKE fallback")
+        with patch.object(search_module, 'search_index_exists', return_value=False):
+            for label, queries in shapes.items():
+                time_queries(app, label, queries, 3)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
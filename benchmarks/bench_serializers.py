@@ -0,0 +1,93 @@
+#marshmallow dump vs the compiled serializers (app/utility/serializers.py) on N tickets, customers and parts:
+#dump only, then load + dump the way the list endpoints do it (ORM entities vs Row tuples of the dumped columns).
+#Run from the repo root: python benchmarks/bench_serializers.py [rows]   (default 10,000)
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app import create_app
+from app.blueprints.customers.schemas import customers_schema, customers_fast
+from app.blueprints.parts.schemas import parts_schema, parts_fast
+from app.blueprints.Service_Tickets.schemas import service_tickets_schema, service_tickets_fast
+from app.models import db, Customers, Parts, Service_Tickets
+
+MAKES = [("Honda", "Civic"), ("Toyota", "Corolla"), ("Ford", "F-150"), ("Subaru", "Outback"), ("Tesla", "Model 3"), ("BMW", "X5")]
+
+
+def make_app(db_path):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}"})
+    return create_app('BenchmarkConfig')
+
+
+def seed(connection, count):
+    rng = random.Random(1)
+    connection.exec_driver_sql(
+        "INSERT INTO customers (id, first_name, last_name, email, password, phone, address, role) VALUES (?, 'Jane', 'Smith', ?, ?, ?, '1 Main St', 'customer')",
+        [(i, f"user{i}@email.com", "scrypt:32768:8:1$" + "x" * 110, f"555-{i:07d}") for i in range(1, count + 1)]
+    )
+    connection.exec_driver_sql("INSERT INTO parts (id, part_name, price, stock) VALUES (?, ?, 9.99, 10)", [(i, f"Part {i}") for i in range(1, count + 1)])
+    tickets = []
+    for i in range(1, count + 1):
+        created = date(2025, 1, 1) + timedelta(days=rng.randint(0, 365))
+        done = rng.random() < 0.5
+        total = rng.randint(0, 200000)
+        tickets.append((i, rng.randint(1, count), *rng.choice(MAKES), rng.randint(2000, 2025), created.isoformat(), total / 100, total,
+                        "Complete" if done else "Pending", (created + timedelta(days=3)).isoformat() if done else None))
+    connection.exec_driver_sql(
+        "INSERT INTO service_tickets (id, customer_id, vehicle_make, vehicle_model, vehicle_year, service_description, date_created, price, total_cents, status, parts, completion_date) "
+        "VALUES (?, ?, ?, ?, ?, 'oil change', ?, ?, ?, ?, 'Oil Filter x1', ?)", tickets
+    )
+
+
+def timed(label, fn, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+        db.session.expunge_all() #every run loads fresh objects, like a new request
+    print(f"  {label:46} median {statistics.median(timings):8.1f} ms")
+    return statistics.median(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    directory = tempfile.mkdtemp()
+    try:
+        app = make_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                seed(connection, count)
+            print(f"{count} rows per table")
+
+            cases = [
+                ("service tickets", Service_Tickets, service_tickets_schema, service_tickets_fast),
+                ("customers", Customers, customers_schema, customers_fast),
+                ("parts", Parts, parts_schema, parts_fast),
+            ]
+            for label, model, schema, fast in cases:
+                print(label)
+                objects = db.session.scalars(select(model)).all()
+                slow = timed("dump only: marshmallow", lambda: schema.dump(objects))
+                quick = timed("dump only: compiled", lambda: fast.dump(objects))
+                timed("load entities + marshmallow dump", lambda: schema.dump(db.session.scalars(select(model)).all()))
+                timed("load entities + compiled dump", lambda: fast.dump(db.session.scalars(select(model)).all()))
+                timed("select columns (Row) + compiled dump", lambda: fast.dump(db.session.execute(select(*fast.columns)).all()))
+                print(f"  dump {slow / quick:.1f}x faster")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#Concurrent read/write throughput against a SQLite file, default settings vs config.SQLITE_PRAGMAS.
+#Run from the repo root: python benchmarks/bench_sqlite_concurrency.py [threads] [seconds]
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.models import Base, Parts
+from app.utility.database import apply_sqlite_pragmas
+from config import SQLITE_PRAGMAS
+
+WRITE_EVERY = 5 #1 write for every 4 reads, roughly what the ticket routes do
+
+
+def run(pragmas, threads, seconds):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", pool_size=threads, max_overflow=0)
+    apply_sqlite_pragmas(engine, pragmas)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(Parts(part_name=f"Part {i}", price=10.0, stock=1_000_000) for i in range(100))
+        session.commit()
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def worker(n):
+        reads = writes = errors = 0
+        i = 0
+        with Session(engine) as session:
+            while time.perf_counter() < stop:
+                i += 1
+                part_id = (i * 7 + n) % 100 + 1
+                try:
+                    if i % WRITE_EVERY == 0:
+                        session.execute(update(Parts).where(Parts.id == part_id, Parts.stock >= 1).values(stock=Parts.stock - 1))
+                        session.commit()
+                        writes += 1
+                    else:
+                        session.execute(select(Parts).where(Parts.id == part_id)).scalar_one()
+                        session.commit()
+                        reads += 1
+                except OperationalError:
+                    session.rollback()
+                    errors += 1
+        with lock:
+            counts["reads"] += reads
+            counts["writes"] += writes
+            counts["errors"] += errors
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    engine.dispose()
+    return {k: v / seconds for k, v in counts.items()}
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for label, pragmas in (("default", {}), ("tuned", SQLITE_PRAGMAS)):
+        result = run(pragmas, threads, seconds)
+        print(f"{label:8} {threads} threads: {result['reads']:9.0f} reads/s {result['writes']:8.0f} writes/s {result['errors']:6.1f} lock errors/s")
@@ -0,0 +1,101 @@
+#A part's stock at a point in time from the stock ledger: replaying every movement up to then vs the nearest snapshot
+#plus the movements after it (app/utility/ledger.py), for parts with a long history. Also the audit over every part
+#and what the ledger costs a stock write (PUT /parts/add_stock).
+#Run from the repo root: python benchmarks/bench_stock_ledger.py [movements per part]   (default 20,000, 20 parts)
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from app import create_app
+from app.models import db, Stock_Movements
+from app.utility.auth import encode_token
+from app.utility.ledger import DEFAULT_SNAPSHOT_EVERY, stock_at, stock_drift, utc_now
+
+PARTS = 20
+
+
+def make_app(db_path):
+    import config
+    #create_app loads configs by name from config.py, so hang the benchmark settings there
+    config.BenchmarkConfig = type('BenchmarkConfig', (config.TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}"})
+    return create_app('BenchmarkConfig')
+
+
+#the same rows the ledger would have written: movements a second apart, a snapshot every DEFAULT_SNAPSHOT_EVERY per part
+def seed(connection, per_part, start):
+    rng = random.Random(1)
+    connection.exec_driver_sql("INSERT INTO mechanics (id, first_name, last_name, specialty, phone, email, password, role) VALUES (1, 'M', 'M', 'x', '0', 'm@m.com', 'x', 'mechanic')")
+    stock = {part_id: 0 for part_id in range(1, PARTS + 1)}
+    counts = dict.fromkeys(stock, 0)
+    movements, snapshots = [], []
+    for movement_id in range(1, per_part * PARTS + 1):
+        part_id = rng.randint(1, PARTS)
+        quantity = rng.randint(1, 20) if rng.random() < 0.3 or stock[part_id] < 20 else -rng.randint(1, 5)
+        stock[part_id] += quantity
+        counts[part_id] += 1
+        created_at = start + timedelta(seconds=movement_id)
+        movements.append((movement_id, part_id, quantity, 'delivery' if quantity > 0 else 'used', created_at))
+        if counts[part_id] % DEFAULT_SNAPSHOT_EVERY == 0:
+            snapshots.append((part_id, movement_id, stock[part_id], created_at))
+    connection.exec_driver_sql("INSERT INTO stock_movements (id, part_id, quantity, reason, created_at) VALUES (?, ?, ?, ?, ?)", movements)
+    connection.exec_driver_sql("INSERT INTO stock_snapshots (part_id, movement_id, stock, taken_at) VALUES (?, ?, ?, ?)", snapshots)
+    connection.exec_driver_sql("INSERT INTO parts (id, part_name, price, stock) VALUES (?, ?, 9.99, ?)", [(part_id, f"Part {part_id}", quantity) for part_id, quantity in stock.items()])
+    return len(movements)
+
+
+def timed(label, fn, repeat=50):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"  {label:52} median {statistics.median(timings):9.2f} ms")
+
+
+def main():
+    per_part = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    directory = tempfile.mkdtemp()
+    try:
+        app = make_app(os.path.join(directory, 'bench.db'))
+        start = utc_now() - timedelta(days=365)
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                total = seed(connection, per_part, start)
+            print(f"{PARTS} parts, {total} movements, snapshot every {DEFAULT_SNAPSHOT_EVERY}")
+            rng = random.Random(2)
+            moments = [start + timedelta(seconds=rng.randint(1, total)) for _ in range(50)]
+            with db.engine.connect() as connection:
+                def replay():
+                    at = moments[rng.randrange(len(moments))]
+                    return connection.scalar(select(func.sum(Stock_Movements.quantity)).where(Stock_Movements.part_id == 1, Stock_Movements.created_at <= at))
+                def snapshot():
+                    return stock_at(connection, 1, moments[rng.randrange(len(moments))])
+                for at in moments[:10]: #same answer both ways
+                    assert stock_at(connection, 1, at)['stock'] == (connection.scalar(
+                        select(func.coalesce(func.sum(Stock_Movements.quantity), 0)).where(Stock_Movements.part_id == 1, Stock_Movements.created_at <= at)))
+                timed("stock at T, replay every movement", replay)
+                timed("stock at T, snapshot + movements since", snapshot)
+                timed("audit every part (stock_drift)", lambda: stock_drift(connection), 10)
+                print(f"  movements scanned per query: {statistics.median(snapshot()['movements_scanned'] for _ in range(50))}")
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {encode_token(1, 'mechanic')}"}
+        timed("PUT /parts/add_stock (update + movement)", lambda: client.put('/parts/add_stock', json={"part_id": rng.randint(1, PARTS), "additional_stock": 1}, headers=headers), 200)
+        with app.app_context():
+            with db.engine.connect() as connection:
+                print(f"parts out of line with the ledger afterwards: {len(stock_drift(connection))}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,98 @@
+import os
+import tempfile
+
+#Applied on every new SQLite connection (see app/utility/database.py).
+#WAL lets readers keep going while one writer commits, NORMAL is still crash safe in WAL mode,
+#busy_timeout makes writers wait for the lock instead of failing straight away, mmap cuts read syscalls.
+SQLITE_PRAGMAS = {
+  'journal_mode': 'WAL',
+  'synchronous': 'NORMAL',
+  'busy_timeout': 5000,
+  'mmap_size': 268435456, #256MB
+  'cache_size': -20000, #~20MB page cache per connection
+}
+
+
+def database_url(default):
+  url = os.environ.get('DATABASE_URL', default)
+  if url.startswith('postgres://'): #some hosts still hand out the old scheme, SQLAlchemy only accepts postgresql://
+    url = url.replace('postgres://', 'postgresql://', 1)
+  return url
+
+
+#Cache and rate limit storage. SimpleCache / memory:// live inside one process, so with several gunicorn workers
+#each one has its own cache and its own rate limit counters. Set REDIS_URL to share both across workers, or
+#CACHE_TYPE=FileSystemCache to share the cache between workers on one machine without running Redis.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+
+def cache_type(default):
+  if os.environ.get('CACHE_TYPE'):
+    return os.environ['CACHE_TYPE']
+  return 'RedisCache' if REDIS_URL else default
+
+
 class DevelopmentConfig:
   SQLALCHEMY_DATABASE_URI = 'sqlite:///Bagel_Repairs.db'#can rename the database anything. Developement makes sense
   DEBUG = True
-  CACHE_TYPE = "SimpleCache"
+  CACHE_TYPE = cache_type("SimpleCache")
   CACHE_DEFAULT_TIMEOUT = 300
+  CACHE_REDIS_URL = REDIS_URL
+  CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bagel_repairs_cache'))
+  RATELIMIT_STORAGE_URI = REDIS_URL or "memory://"
+  SQLITE_PRAGMAS = SQLITE_PRAGMAS
+  MIGRATE_ON_STARTUP = True
+  JWT_BACKEND = os.environ.get('JWT_BACKEND', 'jose')
+  JWT_CACHE_SIZE = 1024
+  JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson')
+  MECHANIC_MAX_OPEN_TICKETS = 10
+  PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+  PASSWORD_HASH_WORKERS = 2
   
 class TestingConfig:
   SQLALCHEMY_DATABASE_URI = 'sqlite:///testing.db'#can rename the database anything. Developement makes sense
   DEBUG = True
   CACHE_TYPE = "SimpleCache"
   CACHE_DEFAULT_TIMEOUT = 300
+  RATELIMIT_STORAGE_URI = "memory://"
+  SQLITE_PRAGMAS = SQLITE_PRAGMAS
+  PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000' #cheap on purpose, tests hash a lot of passwords
+  PASSWORD_HASH_WORKERS = 0 #hash inline
 
 
+#Point DATABASE_URL at Postgres in production (needs a driver, e.g. pip install psycopg2-binary).
+#Falls back to the SQLite file so the app still boots without it.
 class ProductionConfig:
-    pass
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = database_url('sqlite:///Bagel_Repairs.db')
+    DEBUG = False
+    #production runs several workers, so never fall back to a per-process cache
+    CACHE_TYPE = cache_type("FileSystemCache")
+    CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_REDIS_URL = REDIS_URL
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bagel_repairs_cache'))
+    CACHE_KEY_PREFIX = "bagel:"
+    CACHE_THRESHOLD = 10000 #FileSystemCache starts pruning past this many files
+    #limits has no file backend, rate limits are only shared across workers with REDIS_URL set
+    RATELIMIT_STORAGE_URI = REDIS_URL or "memory://"
+    SQLITE_PRAGMAS = SQLITE_PRAGMAS
+    #workers take a lock before migrating (app/utility/migrations.py). Set MIGRATE_ON_STARTUP=0 to migrate only as a deploy
+    #step instead: flask --app "app:create_app('ProductionConfig')" db upgrade
+    MIGRATE_ON_STARTUP = os.environ.get('MIGRATE_ON_STARTUP', '1') != '0'
+    JWT_BACKEND = os.environ.get('JWT_BACKEND', 'jose') #or "pyjwt" if PyJWT is installed
+    JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', 1024)) #verified tokens remembered per worker, 0 = off
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson') #"json" for the stdlib encoder (see app/utility/json_provider.py)
+    MECHANIC_MAX_OPEN_TICKETS = int(os.environ.get('MECHANIC_MAX_OPEN_TICKETS', 10)) #auto_assign skips mechanics with this many open tickets, 0 = no limit
+    SCHEDULER_MAX_AGE = int(os.environ.get('SCHEDULER_MAX_AGE', 300)) #seconds before a worker reloads its workload index (see app/utility/scheduler.py)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1') #users are rehashed on their next login after a change
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2)) #hashing processes per worker
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 64)) #hashes allowed to wait for the pool before we answer 503
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)), #connections kept open per worker
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)), #extra connections allowed during a burst
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)), #seconds to wait for a free connection
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)), #reconnect before the server drops idle connections
+        'pool_pre_ping': True, #check the connection is alive before handing it out
+    }
+    #Postgres honours FOR UPDATE, so let stock writers queue on the row (see app/utility/inventory.py)
+    STOCK_RESERVATION_MODE = 'row_lock' if SQLALCHEMY_DATABASE_URI.startswith('postgresql') else 'conditional'
+    STOCK_SNAPSHOT_EVERY = int(os.environ.get('STOCK_SNAPSHOT_EVERY', 100)) #movements per part between stock snapshots (see app/utility/ledger.py)
@@ -0,0 +1,46 @@
+#Alembic environment. Normally driven from app/utility/migrations.py, which hands us an open connection
+#in config.attributes['connection'] so migrations run on the app's engine (pragmas, pool and all).
+from alembic import context
+from sqlalchemy import create_engine
+from app.models import Base
+from app.utility.migrations import include_name
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(
+        url=config.get_main_option('sqlalchemy.url'),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_name=include_name
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_with_connection(connection):
+    #render_as_batch: SQLite can't ALTER most things in place, batch mode rebuilds the table (copy + rename)
+    #inside the migration's transaction instead
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True, include_name=include_name)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        run_with_connection(connection)
+        return
+    engine = create_engine(config.get_main_option('sqlalchemy.url'))
+    with engine.connect() as connection:
+        run_with_connection(connection)
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,95 @@
+"""baseline schema, as created by db.create_all before migrations existed
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'customers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('first_name', sa.String(length=150), nullable=False),
+        sa.Column('last_name', sa.String(length=150), nullable=False),
+        sa.Column('email', sa.String(length=250), nullable=False),
+        sa.Column('password', sa.String(length=128), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('address', sa.String(length=300), nullable=False),
+        sa.Column('role', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('phone')
+    )
+    op.create_table(
+        'mechanics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('first_name', sa.String(length=150), nullable=False),
+        sa.Column('last_name', sa.String(length=150), nullable=False),
+        sa.Column('specialty', sa.String(length=200), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('email', sa.String(length=250), nullable=False),
+        sa.Column('password', sa.String(length=128), nullable=False),
+        sa.Column('role', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('phone'),
+        sa.UniqueConstraint('email')
+    )
+    op.create_table(
+        'parts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('part_name', sa.String(length=200), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'service_tickets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('vehicle_make', sa.String(length=100), nullable=False),
+        sa.Column('vehicle_model', sa.String(length=100), nullable=False),
+        sa.Column('vehicle_year', sa.Integer(), nullable=False),
+        sa.Column('service_description', sa.String(length=500), nullable=False),
+        sa.Column('date_created', sa.Date(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('parts', sa.String(length=500), nullable=True),
+        sa.Column('completion_date', sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'mechanic_service_ticket',
+        sa.Column('mechanic_id', sa.Integer(), nullable=True),
+        sa.Column('service_ticket_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['mechanic_id'], ['mechanics.id']),
+        sa.ForeignKeyConstraint(['service_ticket_id'], ['service_tickets.id'])
+    )
+    op.create_table(
+        'service_ticket_parts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('service_ticket_id', sa.Integer(), nullable=True),
+        sa.Column('part_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['part_id'], ['parts.id']),
+        sa.ForeignKeyConstraint(['service_ticket_id'], ['service_tickets.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('service_ticket_parts')
+    op.drop_table('mechanic_service_ticket')
+    op.drop_table('service_tickets')
+    op.drop_table('parts')
+    op.drop_table('mechanics')
+    op.drop_table('customers')
@@ -0,0 +1,90 @@
+"""integer-cents ledger columns, foreign key / lookup indexes, junction table primary key
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+The indexes are declared in models.py like every other column option. They live here rather than in the
+baseline because databases create_all built before migrations existed are stamped at 0001 and still need them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    #_____ledger totals, backfilled from the old float prices_____
+    with op.batch_alter_table('service_tickets') as batch_op:
+        batch_op.add_column(sa.Column('total_cents', sa.Integer(), server_default='0', nullable=False))
+    op.execute("UPDATE service_tickets SET total_cents = CAST(ROUND(COALESCE(price, 0) * 100) AS INTEGER)")
+
+    with op.batch_alter_table('service_ticket_parts') as batch_op:
+        batch_op.add_column(sa.Column('unit_price_cents', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE service_ticket_parts SET unit_price_cents = "
+        "(SELECT CAST(ROUND(parts.price * 100) AS INTEGER) FROM parts WHERE parts.id = service_ticket_parts.part_id)"
+    )
+
+    #_____one line per part per ticket: fold duplicates into the oldest line before the unique index_____
+    op.execute(
+        "UPDATE service_ticket_parts SET quantity = ("
+        "  SELECT SUM(dup.quantity) FROM service_ticket_parts dup"
+        "  WHERE dup.service_ticket_id = service_ticket_parts.service_ticket_id AND dup.part_id = service_ticket_parts.part_id"
+        ") WHERE id IN ("
+        "  SELECT MIN(id) FROM service_ticket_parts GROUP BY service_ticket_id, part_id HAVING COUNT(*) > 1"
+        ")"
+    )
+    op.execute(
+        "DELETE FROM service_ticket_parts WHERE id NOT IN ("
+        "  SELECT MIN(id) FROM service_ticket_parts GROUP BY service_ticket_id, part_id"
+        ")"
+    )
+
+    #_____junction table primary key_____
+    op.execute("DELETE FROM mechanic_service_ticket WHERE mechanic_id IS NULL OR service_ticket_id IS NULL")
+    if bind.dialect.name == 'postgresql':
+        op.execute(
+            "DELETE FROM mechanic_service_ticket a USING mechanic_service_ticket b "
+            "WHERE a.ctid < b.ctid AND a.mechanic_id = b.mechanic_id AND a.service_ticket_id = b.service_ticket_id"
+        )
+    else:
+        op.execute(
+            "DELETE FROM mechanic_service_ticket WHERE rowid NOT IN ("
+            "  SELECT MIN(rowid) FROM mechanic_service_ticket GROUP BY mechanic_id, service_ticket_id"
+            ")"
+        )
+    #SQLite can't add a primary key in place, batch mode copies the rows into a rebuilt table
+    with op.batch_alter_table('mechanic_service_ticket', recreate='auto') as batch_op:
+        batch_op.alter_column('mechanic_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('service_ticket_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_primary_key('mechanic_service_ticket_pkey', ['mechanic_id', 'service_ticket_id'])
+
+    #_____indexes_____
+    op.create_index('ix_mechanic_service_ticket_service_ticket_id', 'mechanic_service_ticket', ['service_ticket_id'])
+    op.create_index('ix_service_tickets_customer_id', 'service_tickets', ['customer_id'])
+    op.create_index('ix_service_tickets_date_created', 'service_tickets', ['date_created'])
+    op.create_index('ix_service_tickets_status', 'service_tickets', ['status'])
+    op.create_index('uq_service_ticket_parts_ticket_part', 'service_ticket_parts', ['service_ticket_id', 'part_id'], unique=True)
+    op.create_index('ix_service_ticket_parts_part_id', 'service_ticket_parts', ['part_id'])
+
+
+def downgrade():
+    op.drop_index('ix_service_ticket_parts_part_id', table_name='service_ticket_parts')
+    op.drop_index('uq_service_ticket_parts_ticket_part', table_name='service_ticket_parts')
+    op.drop_index('ix_service_tickets_status', table_name='service_tickets')
+    op.drop_index('ix_service_tickets_date_created', table_name='service_tickets')
+    op.drop_index('ix_service_tickets_customer_id', table_name='service_tickets')
+    op.drop_index('ix_mechanic_service_ticket_service_ticket_id', table_name='mechanic_service_ticket')
+    with op.batch_alter_table('mechanic_service_ticket', recreate='auto') as batch_op:
+        batch_op.drop_constraint('mechanic_service_ticket_pkey', type_='primary')
+    with op.batch_alter_table('service_ticket_parts') as batch_op:
+        batch_op.drop_column('unit_price_cents')
+    with op.batch_alter_table('service_tickets') as batch_op:
+        batch_op.drop_column('total_cents')
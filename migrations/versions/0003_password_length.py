@@ -0,0 +1,28 @@
+"""widen password columns to fit scrypt hashes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+werkzeug's scrypt hashes are ~160 characters. SQLite never enforced the old VARCHAR(128), Postgres does.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('customers', 'mechanics'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('password', existing_type=sa.String(128), type_=sa.String(256), existing_nullable=False)
+
+
+def downgrade():
+    for table in ('customers', 'mechanics'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('password', existing_type=sa.String(256), type_=sa.String(128), existing_nullable=False)
@@ -0,0 +1,54 @@
+"""FTS5 search tables for customers, mechanics, parts and service tickets
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+SQLite only. Each table gets a <table>_fts virtual table whose rowid is the row id, filled from the existing rows.
+Other databases (and SQLite builds without FTS5) skip this and search falls back to ILIKE.
+"""
+from alembic import op
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+PHONE_DIGITS = "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(phone, ' ', ''), '-', ''), '(', ''), ')', ''), '.', ''), '+', ''), '/', '')"
+
+INDEXES = {
+    'customers': [('first_name', 'first_name'), ('last_name', 'last_name'), ('email', 'email'), ('phone', 'phone'), ('phone_digits', PHONE_DIGITS)],
+    'mechanics': [('first_name', 'first_name'), ('last_name', 'last_name'), ('email', 'email'), ('phone', 'phone'), ('phone_digits', PHONE_DIGITS), ('specialty', 'specialty')],
+    'parts': [('part_name', 'part_name')],
+    'service_tickets': [('vehicle_make', 'vehicle_make'), ('vehicle_model', 'vehicle_model'), ('service_description', 'service_description')],
+}
+
+
+def fts5_available(bind):
+    if bind.dialect.name != 'sqlite':
+        return False
+    return 'ENABLE_FTS5' in {row[0] for row in bind.exec_driver_sql("PRAGMA compile_options")}
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not fts5_available(bind):
+        return
+    for table, columns in INDEXES.items():
+        names = ", ".join(name for name, expression in columns)
+        expressions = ", ".join(expression for name, expression in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+            f"{names}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+        )
+        op.execute(f"DELETE FROM {table}_fts")
+        op.execute(f"INSERT INTO {table}_fts (rowid, {names}) SELECT id, {expressions} FROM {table}")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in INDEXES:
+        op.execute(f"DROP TABLE IF EXISTS {table}_fts")
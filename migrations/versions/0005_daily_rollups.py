@@ -0,0 +1,51 @@
+"""daily rollup tables for the reports, filled from the existing tickets and line items
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'daily_ticket_rollups',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False),
+        sa.Column('tickets', sa.Integer(), nullable=False),
+        sa.Column('revenue_cents', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'status')
+    )
+    op.create_table(
+        'daily_part_rollups',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('part_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('revenue_cents', sa.Integer(), nullable=False),
+        sa.Column('lines', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['part_id'], ['parts.id']),
+        sa.PrimaryKeyConstraint('day', 'part_id')
+    )
+    op.execute(
+        "INSERT INTO daily_ticket_rollups (day, status, tickets, revenue_cents) "
+        "SELECT date_created, status, COUNT(*), COALESCE(SUM(total_cents), 0) FROM service_tickets GROUP BY date_created, status"
+    )
+    op.execute(
+        "INSERT INTO daily_part_rollups (day, part_id, quantity, revenue_cents, lines) "
+        "SELECT service_tickets.date_created, service_ticket_parts.part_id, SUM(service_ticket_parts.quantity), "
+        "SUM(service_ticket_parts.quantity * service_ticket_parts.unit_price_cents), COUNT(*) "
+        "FROM service_ticket_parts JOIN service_tickets ON service_tickets.id = service_ticket_parts.service_ticket_id "
+        "GROUP BY service_tickets.date_created, service_ticket_parts.part_id"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_part_rollups')
+    op.drop_table('daily_ticket_rollups')
@@ -0,0 +1,39 @@
+"""per-part reorder thresholds, partial low-stock index and the reorder queue, filled from the current stock
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+LOW_STOCK = "stock <= reorder_threshold"
+
+
+def upgrade():
+    with op.batch_alter_table('parts') as batch_op:
+        batch_op.add_column(sa.Column('reorder_threshold', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_parts_low_stock', 'parts', ['id'], sqlite_where=sa.text(LOW_STOCK), postgresql_where=sa.text(LOW_STOCK))
+    op.create_table(
+        'reorder_queue',
+        sa.Column('part_id', sa.Integer(), nullable=False),
+        sa.Column('queued_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['part_id'], ['parts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('part_id')
+    )
+    op.create_index('ix_reorder_queue_queued_at', 'reorder_queue', ['queued_at'])
+    op.execute(f"INSERT INTO reorder_queue (part_id, queued_at) SELECT id, CURRENT_TIMESTAMP FROM parts WHERE {LOW_STOCK}")
+
+
+def downgrade():
+    op.drop_index('ix_reorder_queue_queued_at', table_name='reorder_queue')
+    op.drop_table('reorder_queue')
+    op.drop_index('ix_parts_low_stock', table_name='parts')
+    with op.batch_alter_table('parts') as batch_op:
+        batch_op.drop_column('reorder_threshold')
@@ -0,0 +1,54 @@
+"""append-only stock movement ledger and stock snapshots, starting from a snapshot of the current stock
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    #without AUTOINCREMENT SQLite reuses the id of the newest part once it's deleted, and the new part would
+    #inherit its stock history. Other databases never reuse ids.
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('parts', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+            pass
+    op.create_table(
+        'stock_movements',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('part_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(20), nullable=False),
+        sa.Column('service_ticket_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_movements_part_id_id', 'stock_movements', ['part_id', 'id'])
+    op.create_table(
+        'stock_snapshots',
+        sa.Column('part_id', sa.Integer(), nullable=False),
+        sa.Column('movement_id', sa.Integer(), nullable=False),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.Column('taken_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('part_id', 'movement_id')
+    )
+    op.create_index('ix_stock_snapshots_part_id_taken_at', 'stock_snapshots', ['part_id', 'taken_at'])
+    #movement 0: what every part had when the ledger started, history before this isn't known
+    op.execute("INSERT INTO stock_snapshots (part_id, movement_id, stock, taken_at) SELECT id, 0, stock, CURRENT_TIMESTAMP FROM parts")
+
+
+def downgrade():
+    op.drop_index('ix_stock_snapshots_part_id_taken_at', table_name='stock_snapshots')
+    op.drop_table('stock_snapshots')
+    op.drop_index('ix_stock_movements_part_id_id', table_name='stock_movements')
+    op.drop_table('stock_movements')
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('parts', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+            pass
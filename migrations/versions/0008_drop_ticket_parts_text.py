@@ -0,0 +1,24 @@
+"""drop service_tickets.parts, the invoice builds the parts text from the line items when it's read
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('service_tickets') as batch_op:
+        batch_op.drop_column('parts')
+
+
+def downgrade():
+    with op.batch_alter_table('service_tickets') as batch_op:
+        batch_op.add_column(sa.Column('parts', sa.String(length=500), nullable=True))
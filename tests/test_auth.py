@@ -0,0 +1,122 @@
+from app import create_app
+from app.models import Customers, Mechanics, db
+from app.utility import auth
+from app.utility.auth import encode_token, token_cache, pyjwt
+from datetime import datetime, timedelta, timezone
+from jose import jwt
+from sqlalchemy import event
+from unittest.mock import patch
+import unittest
+from werkzeug.security import generate_password_hash
+
+class TestAuth(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.mechanic = Mechanics(
+            first_name="Mech1",
+            last_name="Test1",
+            email="mech1@email.com",
+            password=generate_password_hash("12345"),
+            phone="555-555-5555",
+            specialty="Engine Repair",
+            role="mechanic"
+        )
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            self.customer = Customers(first_name="Cust", last_name="Test", email="cust@email.com", phone="555-555-0000", address="1 Main St", password=generate_password_hash("12345"))
+            db.session.add_all([self.mechanic, self.customer])
+            db.session.commit()
+            self.token = encode_token(self.mechanic.id, "mechanic")
+            self.customer_id = self.customer.id
+            self.token_customer = encode_token(self.customer.id, "customer")
+        token_cache.clear() #the cache lives for the whole process, start every test cold
+        self.client = self.app.test_client()
+
+    def get_tickets(self, token):
+        return self.client.get('/service_tickets', headers={'Authorization': f"Bearer {token}"})
+
+    def test_repeat_token_skips_decode(self):
+        with patch.object(auth, '_decode', wraps=auth._decode) as decode:
+            self.assertEqual(self.get_tickets(self.token).status_code, 200)
+            self.assertEqual(self.get_tickets(self.token).status_code, 200)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(len(token_cache), 1)
+
+    def test_tampered_token_not_served_from_cache(self):
+        self.get_tickets(self.token)
+        header, payload, signature = self.token.split('.')
+        tampered = f"{header}.{payload}.{signature[:-2]}AA"
+        self.assertEqual(self.get_tickets(tampered).status_code, 401)
+
+    def test_cached_token_still_expires(self):
+        self.get_tickets(self.token)
+        later = datetime.now(timezone.utc) + timedelta(hours=2)
+        with patch('app.utility.auth.time.time', return_value=later.timestamp()):
+            response = self.get_tickets(self.token)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json['message'], 'Token has expired!')
+        self.assertEqual(len(token_cache), 0)
+
+    def test_expired_token(self):
+        expired = jwt.encode({'exp': datetime.now(timezone.utc) - timedelta(minutes=1), 'sub': '1', 'role': 'mechanic'}, auth.SECRET_KEY, algorithm='HS256')
+        self.assertEqual(self.get_tickets(expired).status_code, 403)
+
+    def test_cache_is_bounded(self):
+        self.app.config['JWT_CACHE_SIZE'] = 3
+        for hours in range(1, 6):
+            token = jwt.encode({'exp': datetime.now(timezone.utc) + timedelta(hours=hours), 'sub': str(self.mechanic.id), 'role': 'mechanic'}, auth.SECRET_KEY, algorithm='HS256')
+            self.assertEqual(self.get_tickets(token).status_code, 200)
+        self.assertEqual(len(token_cache), 3)
+
+    def test_cache_can_be_turned_off(self):
+        self.app.config['JWT_CACHE_SIZE'] = 0
+        with patch.object(auth, '_decode', wraps=auth._decode) as decode:
+            self.get_tickets(self.token)
+            self.get_tickets(self.token)
+        self.assertEqual(decode.call_count, 2)
+        self.assertEqual(len(token_cache), 0)
+
+    @unittest.skipIf(pyjwt is None, "PyJWT not installed")
+    def test_pyjwt_backend_reads_jose_tokens(self):
+        self.app.config['JWT_BACKEND'] = 'pyjwt'
+        self.assertEqual(self.get_tickets(self.token).status_code, 200)
+        self.assertEqual(self.get_tickets("not.a.token").status_code, 401)
+
+    #_____________________PRINCIPAL / POLICY_____________________
+
+    def count_selects(self, method, url, token):
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = getattr(self.client, method)(url, headers={'Authorization': f"Bearer {token}"})
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return response, statements
+
+    def test_own_account_loaded_once(self):
+        response, selects = self.count_selects('get', f'/customers/{self.customer_id}', self.token_customer)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(selects), 1)
+
+    def test_someone_elses_account_rejected_without_query(self):
+        response, selects = self.count_selects('delete', f'/customers/{self.customer_id + 1}', self.token_customer)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json['message'], "You can only delete your own account")
+        self.assertEqual(selects, [])
+
+    def test_mechanic_cannot_read_customer_with_same_id(self):
+        response = self.client.get(f'/customers/{self.mechanic.id}', headers={'Authorization': f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_customer_blocked_from_mechanic_routes(self):
+        response, selects = self.count_selects('get', '/parts', self.token_customer)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json['message'], 'Mechanic access required')
+        self.assertEqual(selects, [])
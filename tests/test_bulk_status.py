@@ -0,0 +1,124 @@
+from app import create_app
+from app.models import Customers, Mechanics, Service_Tickets, db
+from app.utility.auth import encode_token
+from app.utility.rollups import rebuild_rollups
+from app.utility.scheduler import scheduler
+from datetime import date
+from sqlalchemy import select
+import unittest
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+
+class TestBulkStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            customers = [Customers(first_name="Bulk", last_name=f"Customer{i}", email=f"bulk{i}@email.com", password=generate_password_hash("12345"),
+                                   phone=f"222-333-444{i}", address="1 Bulk St") for i in range(2)]
+            mechanic = Mechanics(first_name="Bulk", last_name="Mech", email="bulkmech@email.com", password="x", phone="1", specialty="Brakes")
+            db.session.add_all(customers + [mechanic])
+            db.session.flush()
+            tickets = [Service_Tickets(customer_id=customers[i % 2].id, vehicle_make="Honda", vehicle_model="Civic", vehicle_year=2015,
+                                       service_description=f"Job {i}", total_cents=1000 * (i + 1)) for i in range(6)]
+            db.session.add_all(tickets)
+            mechanic.service_tickets_mechanics.extend(tickets[:3])
+            tickets[4].status = "In Progress"
+            tickets[5].status = "Complete"
+            db.session.commit()
+            self.customer_ids = [customer.id for customer in customers]
+            self.mechanic_id = mechanic.id
+            self.ticket_ids = [ticket.id for ticket in tickets]
+            self.token = encode_token(mechanic.id, "mechanic")
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+    def bulk(self, **body):
+        return self.client.put('/service_tickets/status', json=body, headers=self.headers)
+
+    def statuses(self):
+        with self.app.app_context():
+            return dict(db.session.execute(select(Service_Tickets.id, Service_Tickets.status)).all())
+
+    def assertNoDrift(self):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                self.assertEqual(rebuild_rollups(connection), 0)
+
+    def test_moves_tickets_by_id(self):
+        ids = self.ticket_ids
+        response = self.bulk(status="Complete", service_ticket_ids=[ids[0], ids[4], ids[5], 999])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['updated'], [ids[0], ids[4]])
+        self.assertEqual(response.json['skipped'], [{"id": ids[5], "status": "Complete"}])
+        self.assertEqual(response.json['not_found'], [999])
+        with self.app.app_context():
+            ticket = db.session.get(Service_Tickets, ids[0])
+            self.assertEqual(ticket.status, "Complete")
+            self.assertEqual(ticket.completion_date, date.today())
+            self.assertIsNone(db.session.get(Service_Tickets, ids[1]).completion_date)
+        self.assertNoDrift()
+
+    def test_state_machine_is_enforced(self):
+        ids = self.ticket_ids
+        response = self.bulk(status="In Progress", service_ticket_ids=ids)
+        self.assertEqual(response.status_code, 200)
+        #Pending moves, In Progress is already there, Complete can't go back
+        self.assertEqual(response.json['updated'], ids[:4])
+        self.assertEqual(response.json['skipped'], [{"id": ids[4], "status": "In Progress"}, {"id": ids[5], "status": "Complete"}])
+        self.assertEqual(self.statuses()[ids[5]], "Complete")
+        self.assertEqual(self.bulk(status="Pending", service_ticket_ids=ids).status_code, 400)
+        self.assertNoDrift()
+
+    def test_moves_tickets_by_filter(self):
+        ids = self.ticket_ids
+        response = self.bulk(status="Complete", filter={"customer_id": self.customer_ids[0], "status": "Pending"})
+        self.assertEqual(response.json['updated'], [ids[0], ids[2]])
+        self.assertNotIn('skipped', response.json)
+        response = self.bulk(status="Complete", filter={"date_from": date.today().isoformat(), "date_to": date.today().isoformat()})
+        self.assertEqual(response.json['updated'], [ids[1], ids[3], ids[4]])
+        self.assertEqual(set(self.statuses().values()), {"Complete"})
+        self.assertNoDrift()
+
+    def test_filter_is_capped(self):
+        with patch('app.blueprints.Service_Tickets.status.MAX_BULK_TICKETS', 3), patch('app.blueprints.Service_Tickets.routes.MAX_BULK_TICKETS', 3):
+            response = self.bulk(status="Complete", filter={"status": "Pending"}) #4 pending tickets
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("more than 3 tickets", response.json['message'])
+            self.assertEqual(list(self.statuses().values()).count("Pending"), 4)
+            response = self.bulk(status="Complete", filter={"customer_id": self.customer_ids[0]}) #3 open tickets
+            self.assertEqual(response.json['updated'], [self.ticket_ids[0], self.ticket_ids[2], self.ticket_ids[4]])
+        self.assertNoDrift()
+
+    def test_cache_and_scheduler_follow(self):
+        listed = self.client.get('/service_tickets', headers=self.headers).json['service_tickets']
+        self.assertEqual(sum(ticket['status'] == "Complete" for ticket in listed), 1)
+        self.client.post(f'/service_tickets/{self.ticket_ids[3]}/auto_assign', headers=self.headers) #loads the index
+        self.assertEqual(scheduler.open_tickets(self.mechanic_id), 4)
+
+        self.bulk(status="Complete", service_ticket_ids=self.ticket_ids[:2])
+        listed = self.client.get('/service_tickets', headers=self.headers).json['service_tickets']
+        self.assertEqual(sum(ticket['status'] == "Complete" for ticket in listed), 3)
+        self.assertEqual(scheduler.open_tickets(self.mechanic_id), 2)
+
+    def test_bad_requests(self):
+        for body in [
+            {"service_ticket_ids": [1]},
+            {"status": "Complete"},
+            {"status": "Complete", "service_ticket_ids": [1], "filter": {"status": "Pending"}},
+            {"status": "Complete", "service_ticket_ids": []},
+            {"status": "Complete", "service_ticket_ids": ["1"]},
+            {"status": "Complete", "service_ticket_ids": list(range(5001))},
+            {"status": "Complete", "filter": {}},
+            {"status": "Complete", "filter": {"vehicle_make": "Honda"}},
+            {"status": "Complete", "filter": {"date_from": "yesterday"}},
+            {"status": "Complete", "filter": {"customer_id": "1"}},
+            {"status": "Complete", "filter": {"customer_id": True}},
+            {"status": "Complete", "filter": {"status": ["Pending"]}},
+            {"status": "Complete", "filter": {"status": "Open"}},
+        ]:
+            self.assertEqual(self.bulk(**body).status_code, 400, body)
+        self.assertEqual(self.client.put('/service_tickets/status', data="nope", headers=self.headers).status_code, 400)
+        self.assertEqual(set(self.statuses().values()), {"Pending", "In Progress", "Complete"})
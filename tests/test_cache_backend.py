@@ -0,0 +1,64 @@
+from app import create_app
+from app.extensions import cache
+from app.models import Customers, Mechanics, Service_Tickets, db
+from app.utility.auth import encode_token
+from sqlalchemy import event
+import shutil
+import tempfile
+import unittest
+
+#Two app instances pointed at the same FileSystemCache folder stand in for two gunicorn workers
+class TestSharedCacheBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.workers = [self.make_worker() for _ in range(2)]
+
+        with self.workers[0].app_context():
+            db.drop_all()
+            db.create_all()
+            customer = Customers(first_name="A", last_name="B", email="a@b.com", password="x", phone="1", address="here")
+            mechanic = Mechanics(first_name="M", last_name="N", email="m@n.com", password="x", phone="2", specialty="Brakes")
+            db.session.add_all([customer, mechanic])
+            db.session.flush()
+            db.session.add(Service_Tickets(customer_id=customer.id, vehicle_make="Ford", vehicle_model="F150", vehicle_year=2020, service_description="Oil"))
+            self.headers = {"Authorization": f"Bearer {encode_token(mechanic.id, 'mechanic')}"}
+            db.session.commit()
+
+    def make_worker(self):
+        app = create_app('TestingConfig')
+        app.config.update(CACHE_TYPE='FileSystemCache', CACHE_DIR=self.cache_dir)
+        cache.init_app(app) #swap the SimpleCache from TestingConfig for the shared folder
+        return app
+
+    def get(self, worker, url):
+        statements = []
+        def count(*args):
+            statements.append(args[2])
+        with worker.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            response = worker.test_client().get(url, headers=self.headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        return response, len(statements)
+
+    def test_entry_cached_by_one_worker_is_served_by_another(self):
+        response, queries = self.get(self.workers[0], '/service_tickets/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(queries, 0)
+
+        response, queries = self.get(self.workers[1], '/service_tickets/1')
+        self.assertEqual(response.json['vehicle_make'], "Ford")
+        self.assertEqual(queries, 0)
+
+    def test_write_on_one_worker_invalidates_the_other(self):
+        self.get(self.workers[0], '/service_tickets/1')
+        response = self.workers[1].test_client().put('/service_tickets', json={"service_ticket_id": 1, "vehicle_make": "Mazda"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        response, queries = self.get(self.workers[0], '/service_tickets/1')
+        self.assertEqual(response.json['vehicle_make'], "Mazda")
+        self.assertGreater(queries, 0)
@@ -1,6 +1,7 @@
 from app import create_app
 from app.models import Customers, db, Mechanics
 from app.utility.auth import encode_token
+from sqlalchemy import event
 import unittest
 from werkzeug.security import check_password_hash, generate_password_hash
 
@@ -60,7 +61,10 @@ class TestUsers(unittest.TestCase):
         response = self.client.post('/customers', json=customer_payload) #sending a test POST request using our test_client and including a JSON body
         self.assertEqual(response.status_code, 201) #checking if I got a 201 status code
         self.assertEqual(response.json['first_name'], "Test2") #checking to make sure the data that I sent in, is part of the response
-        self.assertTrue(check_password_hash(response.json['password'], "12345")) #checking if the password was hashed correctly
+        self.assertNotIn('password', response.json) #the hash never goes out in a response
+        with self.app.app_context():
+            stored = db.session.get(Customers, response.json['id']).password
+        self.assertTrue(check_password_hash(stored, "12345")) #checking if the password was hashed correctly
         self.assertEqual(response.json['last_name'], "Lasttest2"),
         self.assertEqual(response.json['email'], "test1@email.com")
         self.assertEqual(response.json['phone'], "555-555-5555")
@@ -89,6 +93,35 @@ class TestUsers(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json[0]['email'], "test@email.com")
+        self.assertNotIn('password', response.json[0])
+
+    def test_get_customers_sparse_fields(self):
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if "FROM customers" in statement:
+                statements.append(statement)
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.client.get('/customers?fields=id,email', headers={"Authorization": f"Bearer {self.token_mechanic}"})
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{"id": self.customer_id, "email": "test@email.com"}])
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn("password", statements[0]) #only the asked for columns are selected
+        self.assertNotIn("address", statements[0])
+
+        headers = {"Authorization": f"Bearer {self.token_mechanic}", "Accept": "application/x-ndjson"}
+        response = self.client.get('/customers?fields=first_name', headers=headers)
+        self.assertEqual(response.get_data(as_text=True), '{"first_name":"Test"}\n')
+
+    def test_get_customers_bad_fields(self):
+        headers = {"Authorization": f"Bearer {self.token_mechanic}"}
+        self.assertEqual(self.client.get('/customers?fields=password', headers=headers).status_code, 400)
+        self.assertEqual(self.client.get('/customers?fields=id,shoe_size', headers=headers).status_code, 400)
+        self.assertEqual(self.client.get('/customers?fields=', headers=headers).status_code, 400)
 
     def test_login_customer(self):
         login_payload = {
@@ -120,5 +153,11 @@ class TestUsers(unittest.TestCase):
         self.assertEqual(response.json['first_name'], "UpdatedName")
         self.assertEqual(response.json['phone'], "000-000-0000")
         
-            
-        
\ No newline at end of file
+    def test_get_customers_ndjson(self):
+        headers = {"Authorization": f"Bearer {self.token_mechanic}", "Accept": "application/x-ndjson"}
+        response = self.client.get('/customers', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn("test@email.com", lines[0])
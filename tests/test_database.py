@@ -0,0 +1,130 @@
+from app import create_app
+from app.models import Base, db
+from app.utility.migrations import include_name, upgrade_database
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+class TestDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    def test_sqlite_pragmas_set_on_connect(self):
+        with self.app.app_context():
+            self.assertEqual(db.session.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(db.session.execute(text("PRAGMA synchronous")).scalar(), 1) #1 = NORMAL
+            self.assertEqual(db.session.execute(text("PRAGMA busy_timeout")).scalar(), 5000)
+
+    #EXPLAIN QUERY PLAN for the lookups the routes do, joined into one string
+    def query_plan(self, sql, **params):
+        with self.app.app_context():
+            rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+        return " | ".join(row[-1] for row in rows)
+
+    def test_ticket_lookups_use_indexes(self):
+        plan = self.query_plan("SELECT * FROM service_tickets WHERE customer_id = :id", id=1)
+        self.assertIn("USING INDEX ix_service_tickets_customer_id", plan)
+        plan = self.query_plan("SELECT * FROM service_tickets WHERE status = :status", status="Pending")
+        self.assertIn("USING INDEX ix_service_tickets_status", plan)
+        plan = self.query_plan("SELECT * FROM service_tickets WHERE date_created >= :day", day="2024-01-01")
+        self.assertIn("USING INDEX ix_service_tickets_date_created", plan)
+
+    def test_line_item_lookups_use_indexes(self):
+        plan = self.query_plan("SELECT * FROM service_ticket_parts WHERE service_ticket_id = :t AND part_id = :p", t=1, p=1)
+        self.assertIn("USING INDEX uq_service_ticket_parts_ticket_part", plan)
+        plan = self.query_plan("SELECT * FROM service_ticket_parts WHERE part_id = :p", p=1)
+        self.assertIn("USING INDEX ix_service_ticket_parts_part_id", plan)
+
+    def test_junction_lookups_use_indexes(self):
+        plan = self.query_plan("SELECT * FROM mechanic_service_ticket WHERE mechanic_id = :m", m=1)
+        self.assertIn("USING COVERING INDEX sqlite_autoindex_mechanic_service_ticket_1", plan) #the composite primary key
+        plan = self.query_plan("SELECT * FROM mechanic_service_ticket WHERE service_ticket_id = :t", t=1)
+        self.assertIn("ix_mechanic_service_ticket_service_ticket_id", plan)
+
+    def test_low_stock_uses_partial_index(self):
+        plan = self.query_plan("SELECT id FROM parts WHERE stock <= reorder_threshold")
+        self.assertIn("USING INDEX ix_parts_low_stock", plan) #a scan of the index, which only holds the low parts
+        plan = self.query_plan("SELECT * FROM reorder_queue ORDER BY queued_at LIMIT 25")
+        self.assertIn("ix_reorder_queue_queued_at", plan)
+
+    #runs upgrade_database against a throwaway SQLite file, optionally a copy of an existing database
+    def migrated_engine(self, copy_from=None, before=None):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        path = os.path.join(folder, "migrate.db")
+        if copy_from:
+            shutil.copy(copy_from, path)
+        engine = create_engine(f"sqlite:///{path}")
+        self.addCleanup(engine.dispose)
+        if before:
+            with engine.begin() as conn:
+                before(conn)
+        with self.app.app_context():
+            self.assertTrue(upgrade_database(engine))
+            self.assertFalse(upgrade_database(engine)) #already at head, nothing to do
+        return engine
+
+    #the migrations have to build exactly what models.py describes
+    def test_migrations_match_models(self):
+        engine = self.migrated_engine()
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn, opts={'include_name': include_name}), Base.metadata)
+        self.assertEqual(diff, [])
+
+    #workers starting together: one migrates, the others wait for it and find nothing left to do
+    def test_concurrent_upgrades(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        engine = create_engine(f"sqlite:///{os.path.join(folder, 'race.db')}", connect_args={'timeout': 0.1})
+        self.addCleanup(engine.dispose)
+        start, results = threading.Barrier(4), []
+        def worker():
+            with self.app.app_context():
+                start.wait()
+                try:
+                    results.append(upgrade_database(engine))
+                except Exception as error:
+                    results.append(error)
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results, key=str), [False, False, False, True])
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), 100) #the pooled connection got its own back
+
+    #the dev database was created by db.create_all before the ledger columns, indexes and migrations existed
+    def test_upgrade_existing_database(self):
+        legacy = {}
+        def add_duplicate_line(conn):
+            legacy['lines'] = conn.execute(text("SELECT COUNT(*) FROM service_ticket_parts")).scalar()
+            legacy['quantity'] = conn.execute(text("SELECT quantity FROM service_ticket_parts WHERE id = 1")).scalar()
+            conn.execute(text("INSERT INTO service_ticket_parts (service_ticket_id, part_id, quantity) SELECT service_ticket_id, part_id, 1 FROM service_ticket_parts WHERE id = 1"))
+
+        engine = self.migrated_engine(
+            copy_from=os.path.join(os.path.dirname(__file__), "..", "instance", "Bagel_Repairs.db"),
+            before=add_duplicate_line
+        )
+
+        inspector = inspect(engine)
+        self.assertEqual(inspector.get_pk_constraint('mechanic_service_ticket')['constrained_columns'], ['mechanic_id', 'service_ticket_id'])
+        self.assertIn('uq_service_ticket_parts_ticket_part', {i['name'] for i in inspector.get_indexes('service_ticket_parts')})
+        self.assertIn('ix_service_tickets_customer_id', {i['name'] for i in inspector.get_indexes('service_tickets')})
+        with engine.connect() as conn:
+            #the duplicate line was merged into the original one
+            self.assertEqual(conn.execute(text("SELECT COUNT(*) FROM service_ticket_parts")).scalar(), legacy['lines'])
+            self.assertEqual(conn.execute(text("SELECT quantity FROM service_ticket_parts WHERE id = 1")).scalar(), legacy['quantity'] + 1)
+            #totals were backfilled from the old float price
+            for price, total_cents in conn.execute(text("SELECT price, total_cents FROM service_tickets")):
+                self.assertEqual(total_cents, round((price or 0) * 100))
+            self.assertGreater(conn.execute(text("SELECT COUNT(*) FROM mechanic_service_ticket")).scalar(), 0)
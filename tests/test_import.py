@@ -0,0 +1,141 @@
+from app import create_app
+from app.blueprints.customers.schemas import customer_schema
+from app.models import Customers, Mechanics, Parts, db
+from app.utility.auth import encode_token
+from app.utility import importer
+from app.utility.importer import import_rows
+from app.utility.scheduler import scheduler
+from sqlalchemy import func, select
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from werkzeug.security import check_password_hash, generate_password_hash
+
+CUSTOMERS_CSV = """first_name,last_name,email,password,phone,address
+Ann,Lee,ann@email.com,pw1,555-000-0001,1 Oak St
+Ben,Kim,jane@email.com,pw2,555-000-0002,2 Oak St
+Cal,Ray,cal@email.com,pw3,555-000-0001,3 Oak St
+Dee,Fox,dee@email.com,pw4,555-000-0004
+Eve,Orr,eve@email.com,pw5,555-000-0005,"5 Oak St, Apt 2"
+"""
+
+class TestImport(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            mechanic = Mechanics(first_name="Mech", last_name="Import", email="mechimport@email.com", password=generate_password_hash("12345"),
+                                 phone="555-555-5555", specialty="Brakes")
+            customer = Customers(first_name="Jane", last_name="Smith", email="jane@email.com", phone="555-123-4567",
+                                 address="1 Main St", password=generate_password_hash("12345"))
+            db.session.add_all([mechanic, customer])
+            db.session.commit()
+            self.token_mechanic = encode_token(mechanic.id, "mechanic")
+            self.token_customer = encode_token(customer.id, "customer")
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token_mechanic}"}
+
+    def post(self, url, body, content_type, token=None):
+        return self.client.post(url, data=body, content_type=content_type, headers={"Authorization": f"Bearer {token or self.token_mechanic}"})
+
+    def count(self, model):
+        with self.app.app_context():
+            return db.session.scalar(select(func.count()).select_from(model))
+
+    def test_csv_customers(self):
+        response = self.post('/customers/import', CUSTOMERS_CSV, 'text/csv')
+        self.assertEqual(response.status_code, 200)
+        report = response.json
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['failed'], 3)
+        self.assertEqual({error['line']: sorted(error['errors']) for error in report['errors']},
+                         {3: ['email'], 4: ['phone'], 5: ['address']}) #taken email, phone used by line 2, missing cell
+        self.assertGreater(report['rows_per_sec'], 0)
+
+        with self.app.app_context():
+            eve = db.session.scalars(select(Customers).filter_by(email="eve@email.com")).one()
+            self.assertEqual(eve.address, "5 Oak St, Apt 2")
+            self.assertEqual(eve.role, "customer")
+            self.assertTrue(eve.password.startswith('pbkdf2:sha256:1000$'))
+            self.assertTrue(check_password_hash(eve.password, "pw5"))
+        self.assertEqual(self.client.post('/customers/login', json={"email": "ann@email.com", "password": "pw1"}).status_code, 200)
+        found = self.client.get('/search', query_string={"q": "ann", "types": "customers"}, headers=self.headers).json['results']
+        self.assertEqual(len(found), 1)
+
+    def test_ndjson_parts_and_mechanics(self):
+        lines = [json.dumps({"part_name": f"Bulk Part {i}", "price": 1.5 + i, "stock": i}) for i in range(5)]
+        lines[2] = '{"part_name": "Broken",'
+        lines.append(json.dumps({"part_name": "No Price", "stock": 1}))
+        response = self.post('/parts/import', "\n".join(lines) + "\n\n", 'application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json['imported'], response.json['failed']), (4, 2))
+        self.assertEqual([error['line'] for error in response.json['errors']], [3, 6])
+        self.assertEqual(self.count(Parts), 4)
+
+        with self.app.app_context():
+            scheduler.load(db.session.connection())
+        body = "\n".join(json.dumps({"first_name": "New", "last_name": f"Mech{i}", "email": f"new{i}@email.com", "password": "pw",
+                                     "phone": f"555-111-000{i}", "specialty": "Engines"}) for i in range(3))
+        response = self.post('/mechanics/import', body, 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response.json['imported'], 3)
+        with self.app.app_context():
+            new_ids = db.session.scalars(select(Mechanics.id).where(Mechanics.specialty == "Engines")).all()
+        self.assertEqual([scheduler.open_tickets(mechanic_id) for mechanic_id in new_ids], [0, 0, 0])
+        self.assertNotIn('password', self.client.get('/mechanics', headers=self.headers).json[-1])
+
+    def test_duplicates_across_chunks(self):
+        rows = [(line, {"first_name": "C", "last_name": str(line), "email": f"c{line % 3}@email.com", "password": "pw",
+                        "phone": f"555-222-{line:04d}", "address": "here"}) for line in range(1, 8)]
+        with self.app.app_context():
+            report = import_rows(Customers, customer_schema, iter(rows), chunk_size=2)
+        self.assertEqual(report['imported'], 3)
+        self.assertEqual([error['line'] for error in report['errors']], [4, 5, 6, 7])
+        self.assertEqual(self.count(Customers), 4)
+
+    def test_chunk_the_database_rejects_is_reported(self):
+        rows = [(line, {"first_name": "C", "last_name": str(line), "email": f"c{line}@email.com", "password": "pw",
+                        "phone": f"555-222-{line:04d}", "address": "here"}) for line in range(1, 6)]
+        rows[2][1]['email'] = "jane@email.com" #created by someone else after the duplicate check ran
+        with self.app.app_context():
+            with patch.object(importer, '_unique', side_effect=lambda model, valid, errors: valid):
+                report = import_rows(Customers, customer_schema, iter(rows), chunk_size=2)
+        self.assertEqual((report['imported'], report['failed']), (3, 2))
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4]) #the whole second chunk
+        self.assertEqual(self.count(Customers), 4)
+
+    def test_http_limits(self):
+        body = "\n".join(json.dumps({"part_name": f"P{i}", "price": 1.0, "stock": 1}) for i in range(3))
+        self.app.config['IMPORT_MAX_ROWS'] = 2
+        response = self.post('/parts/import', body, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("2 rows", response.json['message'])
+        self.app.config['IMPORT_MAX_ROWS'] = 3
+        self.app.config['IMPORT_MAX_BYTES'] = 50
+        self.assertEqual(self.post('/parts/import', body, 'application/x-ndjson').status_code, 413)
+        self.assertEqual(self.count(Parts), 0)
+        self.app.config['IMPORT_MAX_BYTES'] = 1024
+        self.assertEqual(self.post('/parts/import', body, 'application/x-ndjson').json['imported'], 3)
+
+    def test_cli(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'customers.csv')
+        with open(path, 'w') as f:
+            f.write(CUSTOMERS_CSV)
+        try:
+            result = self.app.test_cli_runner().invoke(args=['import', 'customers', path, '--hash-workers', '0'])
+        finally:
+            os.remove(path)
+            os.rmdir(directory)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("2 customers imported, 3 failed", result.stdout)
+        self.assertIn("line 3:", result.stderr)
+        self.assertEqual(self.count(Customers), 3)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post('/parts/import', '{"part_name": "x"}', 'application/json').status_code, 415)
+        self.assertEqual(self.post('/parts/import', 'part_name\nx', 'text/csv', token=self.token_customer).status_code, 403)
+        self.assertEqual(self.count(Parts), 0)
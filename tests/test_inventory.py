@@ -0,0 +1,67 @@
+from app import create_app
+from app.models import Parts, db
+from app.utility.inventory import reserve_stock, return_stock
+from sqlalchemy.exc import OperationalError
+import threading
+import unittest
+
+class TestInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.app.config['STOCK_LOCK_RETRIES'] = 50 #lots of writers fighting over one SQLite file
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            part = Parts(part_name="Brake pad", price=25.0, stock=50)
+            db.session.add(part)
+            db.session.commit()
+            self.part_id = part.id
+
+    def get_stock(self):
+        with self.app.app_context():
+            return db.session.get(Parts, self.part_id).stock
+
+    def test_reserve_and_return_stock(self):
+        with self.app.app_context():
+            self.assertTrue(reserve_stock(self.part_id, 20))
+            self.assertFalse(reserve_stock(self.part_id, 31)) #only 30 left
+            return_stock(self.part_id, 5)
+            db.session.commit()
+        self.assertEqual(self.get_stock(), 35)
+
+    #many threads try to take 1 at a time from a stock of 50, exactly 50 must succeed
+    def run_stress(self, threads=10, attempts=15):
+        successes = []
+        errors = []
+
+        def worker():
+            with self.app.app_context():
+                for _ in range(attempts):
+                    try:
+                        db.session.get(Parts, self.part_id) #read first like the routes do
+                        if reserve_stock(self.part_id, 1):
+                            db.session.commit()
+                            successes.append(1)
+                        else:
+                            db.session.rollback()
+                    except OperationalError as e:
+                        db.session.rollback()
+                        errors.append(e)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(successes), 50)
+        self.assertEqual(self.get_stock(), 0)
+
+    def test_concurrent_reservations_never_oversell(self):
+        self.run_stress()
+
+    def test_concurrent_reservations_never_oversell_row_lock(self):
+        self.app.config['STOCK_RESERVATION_MODE'] = 'row_lock'
+        self.run_stress()
@@ -0,0 +1,51 @@
+from app import create_app
+from app.models import db
+from app.utility import json_provider
+from app.utility.auth import encode_token
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import unittest
+
+class TestJSONProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+        self.client = self.app.test_client()
+        self.data = {"day": date(2024, 1, 8), "at": datetime(2024, 1, 8, 9, 30), "price": Decimal("9.99"), "total": 12.5,
+                     "name": "Müller", "big": 2 ** 70, "parts": [{"id": 1}]}
+
+    def stdlib_app(self):
+        self.app.config['JSON_BACKEND'] = 'json'
+        json_provider.init_json(self.app)
+        return self.app
+
+    def test_orjson_is_used_when_installed(self):
+        self.assertIsInstance(self.app.json, json_provider.OrjsonProvider)
+
+    def test_both_backends_give_the_same_data(self):
+        expected = {"day": "2024-01-08", "at": "2024-01-08T09:30:00", "price": "9.99", "total": 12.5,
+                    "name": "Müller", "big": 2 ** 70, "parts": [{"id": 1}]}
+        with self.app.app_context():
+            fast = self.app.json.dumps(self.data)
+            self.assertEqual(json.loads(fast), expected)
+            self.assertEqual(json.loads(self.app.json.response(self.data).get_data()), expected)
+        with self.stdlib_app().app_context():
+            self.assertIsInstance(self.app.json, json_provider.JSONProvider)
+            self.assertNotIsInstance(self.app.json, json_provider.OrjsonProvider)
+            self.assertEqual(json.loads(self.app.json.dumps(self.data)), expected)
+
+    def test_request_bodies(self):
+        token = encode_token(1, "mechanic")
+        response = self.client.post('/parts', data='{"part_name": ', content_type='application/json',
+                                    headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/parts', json={"part_name": "Brake Pads", "price": 49.99, "stock": 10},
+                                    headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['part_name'], "Brake Pads")
+        self.assertTrue(response.get_data().endswith(b"\n"))
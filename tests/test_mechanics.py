@@ -46,7 +46,10 @@ class TestMechanics(unittest.TestCase):
         self.assertEqual(response.json['first_name'], "New") #this checks if the first name in the response matches what we sent
         self.assertEqual(response.json['last_name'], "Mechanic") #this checks if the last name in the response matches what we sent
         self.assertEqual(response.json['email'], "newmech@email.com") #this checks if the email in the response matches what we sent
-        self.assertTrue(check_password_hash(response.json['password'], "1234"))
+        self.assertNotIn('password', response.json) #the hash never goes out in a response
+        with self.app.app_context():
+            stored = db.session.get(Mechanics, response.json['id']).password
+        self.assertTrue(check_password_hash(stored, "1234"))
         self.assertEqual(response.json['phone'], "111-222-3333") #this checks if the phone in the response matches what we sent
         self.assertEqual(response.json['specialty'], "Brakes") #this checks if the specialty in the response matches what we sent
         self.assertEqual(response.json['role'], "mechanic") #this checks if the role in the response matches what we sent
@@ -0,0 +1,71 @@
+from app import create_app
+from app.models import Customers, db
+from app.utility import passwords
+from app.utility.auth import encode_token
+from app.utility.passwords import HashingBusy, hash_password, hash_passwords, shutdown_pool, verify_password
+import threading
+from unittest.mock import Mock, patch
+import unittest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+class TestPasswords(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            #hashed with older, cheaper settings than TestingConfig's PASSWORD_HASH_METHOD
+            customer = Customers(first_name="Old", last_name="Hash", email="old@email.com", phone="555-555-1111",
+                                 address="1 Main St", password=generate_password_hash("12345", 'pbkdf2:sha256:500'))
+            db.session.add(customer)
+            db.session.commit()
+            self.customer_id = customer.id
+            self.token_customer = encode_token(customer.id, "customer")
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutdown_pool()
+
+    def stored_hash(self):
+        with self.app.app_context():
+            return db.session.get(Customers, self.customer_id).password
+
+    def login(self, password):
+        return self.client.post('/customers/login', json={"email": "old@email.com", "password": password})
+
+    def test_login_rehashes_with_current_settings(self):
+        self.assertEqual(self.login("12345").status_code, 200)
+        self.assertTrue(self.stored_hash().startswith('pbkdf2:sha256:1000$'))
+        self.assertEqual(self.login("12345").status_code, 200) #and the new hash still logs in
+
+    def test_wrong_password_does_not_rehash(self):
+        self.assertEqual(self.login("wrong").status_code, 401)
+        self.assertTrue(self.stored_hash().startswith('pbkdf2:sha256:500$'))
+
+    def test_update_customer_hashes_password(self):
+        headers = {"Authorization": f"Bearer {self.token_customer}"}
+        response = self.client.put(f'/customers/{self.customer_id}', json={"password": "newpass"}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(check_password_hash(self.stored_hash(), "newpass"))
+
+    def test_process_pool(self):
+        self.app.config['PASSWORD_HASH_WORKERS'] = 2
+        with self.app.app_context():
+            hashed = hash_password("12345")
+            self.assertTrue(verify_password(hashed, "12345"))
+            self.assertFalse(verify_password(hashed, "54321"))
+            self.assertIsNotNone(passwords._pool)
+
+            #a batch at a time, each under its own queue slot
+            slots = Mock(wraps=threading.BoundedSemaphore(1))
+            with patch.object(passwords, '_get_pool', return_value=(passwords._pool, slots)):
+                hashed = hash_passwords(["a", "b", "c"], batch=2)
+            self.assertEqual([check_password_hash(value, password) for value, password in zip(hashed, "abc")], [True] * 3)
+            self.assertEqual(slots.acquire.call_count, 2)
+
+    def test_busy_pool_returns_503(self):
+        with patch.object(passwords, '_run', side_effect=HashingBusy()):
+            response = self.login("12345")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
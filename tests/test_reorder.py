@@ -0,0 +1,90 @@
+from app import create_app
+from app.models import Customers, Mechanics, Parts, Reorder_Queue, db
+from app.utility.auth import encode_token
+from app.utility.reorder import rebuild_reorder_queue
+from sqlalchemy import select, text
+import unittest
+from werkzeug.security import generate_password_hash
+
+class TestReorder(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            customer = Customers(first_name="Re", last_name="Order", email="reorder@email.com", password=generate_password_hash("12345"),
+                                 phone="222-333-4444", address="1 Reorder St")
+            mechanic = Mechanics(first_name="Mech", last_name="Reorder", email="mechreorder@email.com", password=generate_password_hash("12345"),
+                                 phone="444-333-2222", specialty="Brakes")
+            pads = Parts(part_name="Brake Pads", price=50.0, stock=10, reorder_threshold=5)
+            filters = Parts(part_name="Oil Filter", price=10.0, stock=3, reorder_threshold=4) #already low
+            bulbs = Parts(part_name="Bulb", price=2.0, stock=1) #default threshold 0
+            db.session.add_all([customer, mechanic, pads, filters, bulbs])
+            db.session.commit()
+            self.customer_id = customer.id
+            self.part_ids = [pads.id, filters.id, bulbs.id]
+            self.token = encode_token(mechanic.id, "mechanic")
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+    def put(self, url, **body):
+        response = self.client.put(url, json=body, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.json)
+        return response
+
+    def create_ticket(self):
+        response = self.client.post('/service_tickets', json={"customer_id": self.customer_id, "vehicle_make": "Honda", "vehicle_model": "Civic",
+                                                              "vehicle_year": 2015, "service_description": "Brakes"}, headers=self.headers)
+        return response.json['id']
+
+    def low_stock(self, **params):
+        response = self.client.get('/parts/low_stock', query_string=params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [(part['id'], part['stock']) for part in response.json['parts']]
+
+    def assertNoDrift(self):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                self.assertEqual(rebuild_reorder_queue(connection), 0)
+
+    def test_line_items_and_deliveries_move_parts_on_and_off_the_queue(self):
+        pads, filters, bulbs = self.part_ids
+        self.assertEqual(self.low_stock(), [(filters, 3)])
+
+        ticket = self.create_ticket()
+        self.put('/service_tickets/add_part', service_ticket_id=ticket, part_id=pads, quantity=5)
+        self.assertEqual(self.low_stock(), [(filters, 3), (pads, 5)]) #at the threshold counts, and it queues behind filters
+        self.put('/service_tickets/add_parts', service_ticket_id=ticket, parts=[{"part_id": filters, "quantity": 1}, {"part_id": bulbs, "quantity": 1}])
+        self.assertEqual(self.low_stock(), [(filters, 2), (pads, 5), (bulbs, 0)]) #filters keeps its place
+
+        self.put('/parts/add_stock', part_id=filters, additional_stock=10)
+        self.put('/service_tickets/remove_part', service_ticket_id=ticket, part_id=pads)
+        self.assertEqual(self.low_stock(), [(bulbs, 0)])
+        self.assertNoDrift()
+
+    def test_threshold_changes_create_and_delete(self):
+        pads, filters, bulbs = self.part_ids
+        self.put(f'/parts/{pads}', reorder_threshold=10)
+        self.put(f'/parts/{filters}', reorder_threshold=0)
+        response = self.client.post('/parts', json={"part_name": "Wiper", "price": 8.0, "stock": 0}, headers=self.headers)
+        self.assertEqual(response.json['reorder_threshold'], 0)
+        wiper = response.json['id']
+        self.assertEqual(self.low_stock(), [(pads, 10), (wiper, 0)])
+        self.assertEqual(self.low_stock(limit=1), [(pads, 10)])
+
+        self.client.delete('/parts', json={"part_id": wiper}, headers=self.headers)
+        self.assertEqual(self.low_stock(), [(pads, 10)])
+        self.assertEqual(self.client.put(f'/parts/{pads}', json={"reorder_threshold": -1}, headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get('/parts/low_stock', query_string={"limit": 0}, headers=self.headers).status_code, 400)
+        self.assertNoDrift()
+
+    def test_rebuild_fixes_drift(self):
+        pads, filters, bulbs = self.part_ids
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(text("UPDATE parts SET stock = 0 WHERE id = :id"), {"id": pads}) #a writer that skipped the sync
+            result = self.app.test_cli_runner().invoke(args=['reorder', 'rebuild'])
+            self.assertIn("1 part(s) were out of date", result.output)
+            self.assertEqual(set(db.session.scalars(select(Reorder_Queue.part_id))), {pads, filters})
+        self.assertNoDrift()
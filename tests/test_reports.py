@@ -0,0 +1,98 @@
+from app import create_app
+from app.models import Customers, Mechanics, Parts, Service_Tickets, db
+from app.utility.auth import encode_token
+from datetime import date
+import unittest
+from werkzeug.security import generate_password_hash
+
+class TestReports(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            customer = Customers(first_name="Report", last_name="Customer", email="report@email.com", password=generate_password_hash("12345"),
+                                 phone="222-333-4444", address="1 Report St")
+            busy = Mechanics(first_name="Busy", last_name="Mech", email="busy@email.com", password=generate_password_hash("12345"),
+                             phone="444-333-2222", specialty="Brakes")
+            idle = Mechanics(first_name="Idle", last_name="Mech", email="idle@email.com", password=generate_password_hash("12345"),
+                             phone="444-333-1111", specialty="Engines")
+            db.session.add_all([customer, busy, idle])
+            db.session.flush()
+
+            #Mon 2024-01-01 and Wed 2024-01-03 are the same week, Mon 2024-01-08 is the next one
+            tickets = [
+                Service_Tickets(customer_id=customer.id, vehicle_make="Honda", vehicle_model="Civic", vehicle_year=2015, service_description="Brakes",
+                                date_created=date(2024, 1, 1), status="Complete", completion_date=date(2024, 1, 3), total_cents=10000),
+                Service_Tickets(customer_id=customer.id, vehicle_make="Honda", vehicle_model="Civic", vehicle_year=2015, service_description="Oil",
+                                date_created=date(2024, 1, 3), status="Complete", completion_date=date(2024, 1, 7), total_cents=2550),
+                Service_Tickets(customer_id=customer.id, vehicle_make="Ford", vehicle_model="F-150", vehicle_year=2018, service_description="Noise",
+                                date_created=date(2024, 1, 8), status="Pending", total_cents=500),
+            ]
+            db.session.add_all(tickets)
+            busy.service_tickets_mechanics.extend(tickets)
+            db.session.add_all([Parts(part_name="Brake Pads", price=50.0, stock=100), Parts(part_name="Oil Filter", price=10.0, stock=100)])
+            db.session.commit()
+            self.ticket_ids = [ticket.id for ticket in tickets]
+            self.busy_id, self.idle_id = busy.id, idle.id
+            self.token_mechanic = encode_token(busy.id, "mechanic")
+            self.token_customer = encode_token(customer.id, "customer")
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token_mechanic}"}
+
+    def get(self, url, **params):
+        return self.client.get(url, query_string=params, headers=self.headers)
+
+    def add_part(self, ticket_id, part_id, quantity):
+        response = self.client.put('/service_tickets/add_part', json={"service_ticket_id": ticket_id, "part_id": part_id, "quantity": quantity}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_revenue_per_day(self):
+        response = self.get('/reports/revenue')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['rows'], [
+            {"period": "2024-01-01", "tickets": 1, "revenue_cents": 10000, "revenue": 100.0},
+            {"period": "2024-01-03", "tickets": 1, "revenue_cents": 2550, "revenue": 25.5},
+            {"period": "2024-01-08", "tickets": 1, "revenue_cents": 500, "revenue": 5.0},
+        ])
+
+    def test_revenue_per_week_with_filters(self):
+        rows = self.get('/reports/revenue', period="week").json['rows']
+        self.assertEqual([(row['period'], row['tickets'], row['revenue_cents']) for row in rows], [("2024-01-01", 2, 12550), ("2024-01-08", 1, 500)])
+
+        rows = self.get('/reports/revenue', period="week", status="Complete", date_from="2024-01-02").json['rows']
+        self.assertEqual([(row['period'], row['tickets'], row['revenue_cents']) for row in rows], [("2024-01-01", 1, 2550)])
+
+    def test_top_parts(self):
+        self.add_part(self.ticket_ids[0], 2, 3)
+        self.add_part(self.ticket_ids[1], 2, 1)
+        self.add_part(self.ticket_ids[2], 1, 2)
+        parts = self.get('/reports/top_parts').json['parts']
+        self.assertEqual([(part['part_name'], part['quantity'], part['tickets'], part['revenue_cents']) for part in parts],
+                         [("Oil Filter", 4, 2, 4000), ("Brake Pads", 2, 1, 10000)])
+
+        parts = self.get('/reports/top_parts', date_to="2024-01-05", limit=1).json['parts']
+        self.assertEqual([part['part_name'] for part in parts], ["Oil Filter"])
+
+    def test_mechanic_workload(self):
+        mechanics = self.get('/reports/mechanic_workload').json['mechanics']
+        self.assertEqual(mechanics[0], {"mechanic_id": self.busy_id, "name": "Busy Mech", "specialty": "Brakes",
+                                        "open_tickets": 1, "completed_tickets": 2, "avg_turnaround_days": 3.0})
+        self.assertEqual(mechanics[1]['mechanic_id'], self.idle_id)
+        self.assertEqual((mechanics[1]['open_tickets'], mechanics[1]['avg_turnaround_days']), (0, None))
+
+    def test_reports_refresh_after_ticket_changes(self):
+        self.assertEqual(self.get('/reports/top_parts').json['parts'], [])
+        self.add_part(self.ticket_ids[0], 1, 1)
+        self.assertEqual([part['quantity'] for part in self.get('/reports/top_parts').json['parts']], [1])
+        self.assertEqual(self.get('/reports/revenue').json['rows'][0]['revenue_cents'], 15000)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get('/reports/revenue', period="month").status_code, 400)
+        self.assertEqual(self.get('/reports/revenue', date_from="yesterday").status_code, 400)
+        self.assertEqual(self.get('/reports/top_parts', limit=0).status_code, 400)
+
+    def test_customers_cannot_see_reports(self):
+        response = self.client.get('/reports/revenue', headers={"Authorization": f"Bearer {self.token_customer}"})
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,118 @@
+from app import create_app
+from app.models import Customers, Daily_Part_Rollups, Daily_Ticket_Rollups, Mechanics, Parts, Service_Tickets, db
+from app.utility.auth import encode_token
+from app.utility.rollups import rebuild_rollups
+from datetime import date
+from sqlalchemy import select, text
+import unittest
+from werkzeug.security import generate_password_hash
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            customer = Customers(first_name="Roll", last_name="Up", email="rollup@email.com", password=generate_password_hash("12345"),
+                                 phone="222-333-4444", address="1 Rollup St")
+            mechanic = Mechanics(first_name="Mech", last_name="Roll", email="mechroll@email.com", password=generate_password_hash("12345"),
+                                 phone="444-333-2222", specialty="Brakes")
+            db.session.add_all([customer, mechanic, Parts(part_name="Brake Pads", price=50.0, stock=100), Parts(part_name="Oil Filter", price=10.0, stock=100)])
+            db.session.commit()
+            self.customer_id = customer.id
+            self.token_mechanic = encode_token(mechanic.id, "mechanic")
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token_mechanic}"}
+
+    def create_ticket(self):
+        response = self.client.post('/service_tickets', json={"customer_id": self.customer_id, "vehicle_make": "Honda", "vehicle_model": "Civic",
+                                                              "vehicle_year": 2015, "service_description": "Brakes"}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        return response.json['id']
+
+    def put(self, url, **body):
+        response = self.client.put(url, json=body, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+    def ticket_rollups(self):
+        with self.app.app_context():
+            return db.session.execute(select(Daily_Ticket_Rollups.status, Daily_Ticket_Rollups.tickets, Daily_Ticket_Rollups.revenue_cents)
+                                      .order_by(Daily_Ticket_Rollups.status)).all()
+
+    def part_rollups(self):
+        with self.app.app_context():
+            return db.session.execute(select(Daily_Part_Rollups.part_id, Daily_Part_Rollups.quantity, Daily_Part_Rollups.revenue_cents, Daily_Part_Rollups.lines)
+                                      .order_by(Daily_Part_Rollups.part_id)).all()
+
+    def assertNoDrift(self):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                self.assertEqual(rebuild_rollups(connection), 0)
+
+    def test_ticket_and_line_item_writes_keep_rollups_current(self):
+        first, second = self.create_ticket(), self.create_ticket()
+        self.assertEqual(self.ticket_rollups(), [("Pending", 2, 0)])
+
+        self.put('/service_tickets/add_part', service_ticket_id=first, part_id=1, quantity=2)
+        self.put('/service_tickets/add_parts', service_ticket_id=second, parts=[{"part_id": 1, "quantity": 1}, {"part_id": 2, "quantity": 3}])
+        self.assertEqual(self.ticket_rollups(), [("Pending", 2, 18000)])
+        self.assertEqual(self.part_rollups(), [(1, 3, 15000, 2), (2, 3, 3000, 1)])
+
+        self.put('/service_tickets', service_ticket_id=first, status="Complete")
+        self.assertEqual(self.ticket_rollups(), [("Complete", 1, 10000), ("Pending", 1, 8000)])
+
+        self.put('/service_tickets/remove_part', service_ticket_id=second, part_id=2, quantity=3)
+        self.put('/service_tickets/remove_part', service_ticket_id=first, part_id=1, quantity=1)
+        self.assertEqual(self.part_rollups(), [(1, 2, 10000, 2)])
+        self.assertEqual(self.ticket_rollups(), [("Complete", 1, 5000), ("Pending", 1, 5000)])
+        self.assertNoDrift()
+
+        response = self.client.delete('/service_tickets', json={"service_ticket_id": second}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ticket_rollups(), [("Complete", 1, 5000)])
+        self.assertEqual(self.part_rollups(), [(1, 1, 5000, 1)])
+        self.assertNoDrift()
+
+    def test_moving_a_ticket_to_another_day_moves_its_line_items(self):
+        ticket_id = self.create_ticket()
+        self.put('/service_tickets/add_part', service_ticket_id=ticket_id, part_id=2, quantity=1)
+        with self.app.app_context():
+            db.session.get(Service_Tickets, ticket_id).date_created = date(2024, 1, 1)
+            db.session.commit()
+            self.assertEqual(db.session.execute(select(Daily_Part_Rollups.day, Daily_Ticket_Rollups.day)
+                                                .join(Daily_Ticket_Rollups, Daily_Ticket_Rollups.day == Daily_Part_Rollups.day)).all(),
+                             [(date(2024, 1, 1), date(2024, 1, 1))])
+        self.assertNoDrift()
+
+    def test_rollback_leaves_rollups_alone(self):
+        self.create_ticket()
+        with self.app.app_context():
+            db.session.add(Service_Tickets(customer_id=self.customer_id, vehicle_make="Ford", vehicle_model="F-150", vehicle_year=2018,
+                                           service_description="Noise", total_cents=700))
+            db.session.flush()
+            db.session.rollback()
+        self.assertEqual(self.ticket_rollups(), [("Pending", 1, 0)])
+
+    def test_rebuild_repairs_drift(self):
+        ticket_id = self.create_ticket()
+        self.put('/service_tickets/add_part', service_ticket_id=ticket_id, part_id=1, quantity=1)
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(text("UPDATE service_tickets SET status = 'Complete'"))
+                connection.execute(text("DELETE FROM daily_part_rollups"))
+                self.assertEqual(rebuild_rollups(connection), 3)
+        self.assertEqual(self.ticket_rollups(), [("Complete", 1, 5000)])
+        self.assertEqual(self.part_rollups(), [(1, 1, 5000, 1)])
+
+    def test_status_totals_report(self):
+        first = self.create_ticket()
+        self.create_ticket()
+        self.put('/service_tickets/add_part', service_ticket_id=first, part_id=1, quantity=1)
+        self.put('/service_tickets', service_ticket_id=first, status="Complete")
+        response = self.client.get('/reports/status_totals', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['statuses'], [
+            {"status": "Complete", "tickets": 1, "revenue_cents": 5000, "revenue": 50.0},
+            {"status": "Pending", "tickets": 1, "revenue_cents": 0, "revenue": 0.0},
+        ])
@@ -0,0 +1,176 @@
+from app import create_app
+from app.models import Customers, Mechanics, Service_Tickets, db, mechanic_service_ticket
+from app.utility.auth import encode_token
+from app.utility import scheduler as scheduler_module
+from app.utility.scheduler import WorkloadScheduler, assign_if_room, count_open_tickets, pick_mechanic, scheduler
+import random
+import threading
+import unittest
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.app.config['MECHANIC_MAX_OPEN_TICKETS'] = 3
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            customer = Customers(first_name="Sched", last_name="Customer", email="sched@email.com", password=generate_password_hash("12345"),
+                                 phone="222-333-4444", address="1 Sched St")
+            mechanics = [
+                Mechanics(first_name="Brakes", last_name="One", email="b1@email.com", password="x", phone="1", specialty="Brakes"),
+                Mechanics(first_name="Brakes", last_name="Two", email="b2@email.com", password="x", phone="2", specialty="brakes "),
+                Mechanics(first_name="Engine", last_name="One", email="e1@email.com", password="x", phone="3", specialty="Engines"),
+            ]
+            db.session.add_all([customer] + mechanics)
+            db.session.flush()
+            tickets = [Service_Tickets(customer_id=customer.id, vehicle_make="Honda", vehicle_model="Civic", vehicle_year=2015,
+                                       service_description=f"Job {i}") for i in range(8)]
+            db.session.add_all(tickets)
+            mechanics[0].service_tickets_mechanics.append(tickets[0]) #Brakes One already has one open ticket
+            db.session.commit()
+            self.mechanic_ids = [mechanic.id for mechanic in mechanics]
+            self.ticket_ids = [ticket.id for ticket in tickets]
+            self.token = encode_token(mechanics[0].id, "mechanic")
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+    def auto_assign(self, ticket_id, specialty=None):
+        body = {"specialty": specialty} if specialty else None
+        return self.client.post(f'/service_tickets/{ticket_id}/auto_assign', json=body, headers=self.headers)
+
+    def assertIndexMatchesDatabase(self):
+        with self.app.app_context():
+            actual = {mechanic_id: count for mechanic_id, specialty, count in count_open_tickets(db.session.connection())}
+        self.assertEqual({mechanic_id: scheduler.open_tickets(mechanic_id) for mechanic_id in actual}, actual)
+
+    def test_picks_least_loaded_matching_mechanic(self):
+        brakes_one, brakes_two, engines = self.mechanic_ids
+        response = self.auto_assign(self.ticket_ids[1], "BRAKES")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['mechanic_id'], brakes_two)
+        self.assertEqual(response.json['status'], "In Progress")
+
+        #tied at one each, lowest id wins; without a specialty everyone counts
+        self.assertEqual(self.auto_assign(self.ticket_ids[2], "brakes").json['mechanic_id'], brakes_one)
+        self.assertEqual(self.auto_assign(self.ticket_ids[3]).json['mechanic_id'], engines)
+        self.assertIndexMatchesDatabase()
+
+    def test_capacity_and_already_assigned(self):
+        brakes_one, brakes_two, engines = self.mechanic_ids
+        for ticket_id in self.ticket_ids[1:3]:
+            self.assertEqual(self.auto_assign(ticket_id, "Engines").json['mechanic_id'], engines)
+        #the same ticket never gets the same mechanic twice
+        self.assertEqual(self.auto_assign(self.ticket_ids[2], "Engines").status_code, 409)
+        self.assertEqual(self.auto_assign(self.ticket_ids[3], "Engines").json['mechanic_id'], engines)
+        response = self.auto_assign(self.ticket_ids[4], "Engines")
+        self.assertEqual(response.status_code, 409) #at MECHANIC_MAX_OPEN_TICKETS
+        self.assertEqual(self.auto_assign(self.ticket_ids[4], "Transmissions").status_code, 409)
+
+        #finishing a ticket or taking the mechanic off one frees a slot
+        self.client.put('/service_tickets', json={"service_ticket_id": self.ticket_ids[1], "status": "Complete"}, headers=self.headers)
+        self.assertEqual(scheduler.open_tickets(engines), 2)
+        self.client.put('/service_tickets/remove_mechanic/', json={"service_ticket_id": self.ticket_ids[2], "mechanic_id": engines}, headers=self.headers)
+        self.assertEqual(scheduler.open_tickets(engines), 1)
+        self.assertEqual(self.auto_assign(self.ticket_ids[4], "Engines").json['mechanic_id'], engines)
+        self.assertIndexMatchesDatabase()
+
+    def test_index_follows_other_writers(self):
+        brakes_one, brakes_two, engines = self.mechanic_ids
+        self.assertEqual(self.auto_assign(self.ticket_ids[1], "Engines").json['mechanic_id'], engines) #loads the index
+        #another worker gives Brakes Two two tickets, this process never sees the commit
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(mechanic_service_ticket.insert(), [
+                    {"mechanic_id": brakes_two, "service_ticket_id": self.ticket_ids[5]},
+                    {"mechanic_id": brakes_two, "service_ticket_id": self.ticket_ids[6]},
+                ])
+        self.assertEqual(scheduler.open_tickets(brakes_two), 0)
+        #the pick is recounted before it's used, so Brakes One gets it
+        self.assertEqual(self.auto_assign(self.ticket_ids[2], "brakes").json['mechanic_id'], brakes_one)
+        self.assertIndexMatchesDatabase()
+
+        #new mechanics and deleted tickets go through the hooks
+        with self.app.app_context():
+            db.session.add(Mechanics(first_name="New", last_name="Hire", email="new@email.com", password="x", phone="4", specialty="Brakes"))
+            db.session.delete(db.session.get(Service_Tickets, self.ticket_ids[0]))
+            db.session.commit()
+        self.assertIndexMatchesDatabase()
+
+    def test_capacity_is_checked_by_the_database(self):
+        brakes_one, brakes_two, engines = self.mechanic_ids
+        with self.app.app_context():
+            connection = db.session.connection()
+            self.assertTrue(assign_if_room(connection, brakes_one, self.ticket_ids[1], 2))
+            self.assertFalse(assign_if_room(connection, brakes_one, self.ticket_ids[2], 2)) #at 2 open tickets now
+            self.assertTrue(assign_if_room(connection, brakes_one, self.ticket_ids[2], 0)) #0 = no limit
+            db.session.commit()
+            self.assertEqual(count_open_tickets(db.session.connection(), [brakes_one])[0][2], 3)
+
+    def test_stale_pick_falls_through_to_the_next_mechanic(self):
+        brakes_one, brakes_two, engines = self.mechanic_ids
+        self.assertEqual(self.auto_assign(self.ticket_ids[1], "Engines").json['mechanic_id'], engines) #loads the index
+        with self.app.app_context():
+            with db.engine.begin() as connection: #another worker fills Brakes Two up after this one counted them
+                connection.execute(mechanic_service_ticket.insert(), [{"mechanic_id": brakes_two, "service_ticket_id": ticket_id} for ticket_id in self.ticket_ids[5:8]])
+        picks = iter([(brakes_two, 0)])
+        with patch.object(scheduler_module, 'pick_mechanic', side_effect=lambda *args, **kwargs: next(picks, None) or pick_mechanic(*args, **kwargs)):
+            response = self.auto_assign(self.ticket_ids[2], "brakes")
+        self.assertEqual(response.json['mechanic_id'], brakes_one)
+        self.assertEqual(scheduler.open_tickets(brakes_two), 3)
+        self.assertIndexMatchesDatabase()
+
+    def test_index_lock_is_free_during_database_reads(self):
+        def counting(*args, **kwargs):
+            free = []
+            other = threading.Thread(target=lambda: free.append(scheduler.lock.acquire(timeout=1) and (scheduler.lock.release() or True)))
+            other.start()
+            other.join()
+            self.assertEqual(free, [True])
+            return count_open_tickets(*args, **kwargs)
+        with patch.object(scheduler_module, 'count_open_tickets', side_effect=counting) as counted:
+            self.assertEqual(self.auto_assign(self.ticket_ids[1], "Engines").status_code, 200)
+        self.assertGreater(counted.call_count, 1) #the load and the recount of the pick
+
+    def test_only_status_and_assignment_changes_recount(self):
+        self.auto_assign(self.ticket_ids[1]) #loads the index
+        with patch.object(scheduler_module, 'count_open_tickets', wraps=count_open_tickets) as counted:
+            with self.app.app_context():
+                ticket = db.session.get(Service_Tickets, self.ticket_ids[0])
+                ticket.service_description = "Brakes and rotors"
+                ticket.total_cents = 5000
+                db.session.commit()
+                self.assertEqual(counted.call_count, 0)
+                ticket.status = "Complete"
+                db.session.commit()
+                self.assertEqual(counted.call_count, 1)
+        self.assertIndexMatchesDatabase()
+
+    def test_bad_requests(self):
+        self.assertEqual(self.auto_assign(999).status_code, 404)
+        self.client.put('/service_tickets', json={"service_ticket_id": self.ticket_ids[7], "status": "Complete"}, headers=self.headers)
+        self.assertEqual(self.auto_assign(self.ticket_ids[7]).status_code, 400)
+        response = self.client.post(f'/service_tickets/{self.ticket_ids[1]}/auto_assign', json={"specialty": 5}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_heap_index_matches_brute_force(self):
+        rng = random.Random(7)
+        index = WorkloadScheduler()
+        index.loaded_at = 0
+        truth = {}
+        for _ in range(5000):
+            mechanic_id = rng.randint(1, 50)
+            if rng.random() < 0.05:
+                truth.pop(mechanic_id, None)
+                index.update(mechanic_id, None, None)
+            else:
+                truth[mechanic_id] = (rng.choice(["Brakes", "Engines"]), rng.randint(0, 20))
+                index.update(mechanic_id, *truth[mechanic_id])
+            specialty = rng.choice([None, "brakes", "Engines"])
+            exclude = {rng.randint(1, 50)}
+            candidates = [(count, mechanic_id) for mechanic_id, (name, count) in truth.items()
+                          if mechanic_id not in exclude and (specialty is None or name.lower() == specialty.lower())]
+            expected = min(candidates) if candidates else None
+            self.assertEqual(index.least_loaded(specialty, exclude), expected[::-1] if expected else None)
@@ -0,0 +1,102 @@
+from app import create_app
+from app.models import Customers, Mechanics, Parts, Service_Tickets, db
+from app.utility import search
+from app.utility.auth import encode_token
+from sqlalchemy import text
+from unittest.mock import patch
+import unittest
+from werkzeug.security import generate_password_hash
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            mechanic = Mechanics(first_name="Mech1", last_name="Test1", email="mech1@email.com", password=generate_password_hash("12345"),
+                                 phone="555-555-5555", specialty="Engine Repair", role="mechanic")
+            self.customer = Customers(first_name="Jane", last_name="Smith", email="jane@email.com", phone="555-123-4567",
+                                      address="1 Main St", password=generate_password_hash("12345"))
+            other = Customers(first_name="Bob", last_name="Jones", email="bob@email.com", phone="555-987-6543",
+                              address="2 Main St", password=generate_password_hash("12345"))
+            brake_pads = Parts(part_name="Brake Pads", price=49.99, stock=10)
+            rotor = Parts(part_name="Brake Rotor", price=89.99, stock=10)
+            filter_ = Parts(part_name="Oil Filter", price=9.99, stock=10)
+            db.session.add_all([mechanic, self.customer, other, brake_pads, rotor, filter_])
+            db.session.flush()
+            db.session.add(Service_Tickets(customer_id=self.customer.id, vehicle_make="Honda", vehicle_model="Civic",
+                                           vehicle_year=2015, service_description="Squeaky brakes"))
+            db.session.commit()
+            self.customer_id = self.customer.id
+            self.part_id = brake_pads.id
+            self.token_mechanic = encode_token(mechanic.id, "mechanic")
+            self.token_customer = encode_token(self.customer.id, "customer")
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token_mechanic}"}
+
+    def search(self, **params):
+        return self.client.get('/search', query_string=params, headers=self.headers)
+
+    def found(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [(result['type'], result['id']) for result in response.json['results']]
+
+    def test_prefix_search_across_types(self):
+        found = self.found(self.search(q="brak"))
+        self.assertIn(('parts', self.part_id), found)
+        self.assertEqual({kind for kind, id in found}, {'parts', 'service_tickets'})
+
+    def test_every_word_has_to_match(self):
+        found = self.found(self.search(q="brake rot"))
+        self.assertEqual([kind for kind, id in found], ['parts'])
+        self.assertEqual(len(found), 1)
+
+    def test_best_match_wins_however_old(self):
+        with self.app.app_context():
+            db.session.add_all([Parts(part_name=f"Rotor Bolt Kit {i} for rear axle", price=1.0, stock=1) for i in range(300)])
+            db.session.commit()
+        self.assertEqual(self.found(self.search(q="rotor", types="parts", limit=1)), [('parts', self.part_id + 1)]) #Brake Rotor, added first
+
+    def test_phone_with_or_without_dashes(self):
+        self.assertEqual(self.found(self.search(q="555-123", types="customers")), [('customers', self.customer_id)])
+        self.assertEqual(self.found(self.search(q="5551234567", types="customers")), [('customers', self.customer_id)])
+
+    def test_index_follows_updates_and_deletes(self):
+        with self.app.app_context():
+            customer = db.session.get(Customers, self.customer_id)
+            customer.last_name = "Doe"
+            db.session.commit()
+        self.assertEqual(self.found(self.search(q="smith")), [])
+        self.assertEqual(self.found(self.search(q="jane doe")), [('customers', self.customer_id)])
+
+        with self.app.app_context():
+            db.session.delete(db.session.get(Parts, self.part_id))
+            db.session.commit()
+        self.assertNotIn(('parts', self.part_id), self.found(self.search(q="brake pads")))
+
+    def test_query_syntax_is_not_passed_through(self):
+        self.assertEqual(self.found(self.search(q='"jane" OR NOT*')), [])
+        self.assertEqual(self.found(self.search(q='jane"')), [('customers', self.customer_id)])
+
+    def test_rebuild_matches_live_index(self):
+        before = self.found(self.search(q="555"))
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(text("DELETE FROM customers_fts"))
+                search.rebuild_search_index(connection)
+        self.assertEqual(sorted(self.found(self.search(q="555"))), sorted(before))
+
+    def test_like_fallback(self):
+        with patch.object(search, 'search_index_exists', return_value=False):
+            found = self.found(self.search(q="brake ro"))
+        self.assertEqual(found, [('parts', self.part_id + 1)])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.search(q="a").status_code, 400)
+        self.assertEqual(self.search(q="brake", types="invoices").status_code, 400)
+        self.assertEqual(self.search(q="brake", limit=0).status_code, 400)
+
+    def test_customers_cannot_search(self):
+        response = self.client.get('/search', query_string={"q": "smith"}, headers={"Authorization": f"Bearer {self.token_customer}"})
+        self.assertEqual(response.status_code, 403)
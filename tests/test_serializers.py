@@ -0,0 +1,98 @@
+from app import create_app
+from app.blueprints.customers.schemas import customer_schema, customers_schema, login_customer_schema, customers_fast
+from app.blueprints.mechanics.schemas import mechanic_schema, mechanics_schema, login_mechanic_schema, mechanics_fast
+from app.blueprints.parts.schemas import part_schema, parts_schema, parts_fast
+from app.blueprints.Service_Tickets.schemas import service_ticket_schema, service_tickets_schema, service_tickets_fast
+from app.extensions import ma
+from app.models import Customers, Mechanics, Parts, Service_Tickets, db
+from app.utility.auth import encode_token
+from app.utility.serializers import FastSerializer
+from datetime import date
+from marshmallow import fields
+from sqlalchemy import select
+import unittest
+
+class TestSerializers(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            customer = Customers(first_name="Zoë", last_name="Smith", email="zoe@email.com", password="hash", phone="555-123-4567", address="1 Main St")
+            db.session.add_all([
+                customer,
+                Mechanics(first_name="Mech", last_name="One", email="mech@email.com", password="hash", phone="555-555-5555", specialty="Brakes"),
+                Parts(part_name="Brake Pads", price=49.99, stock=10),
+                Parts(part_name="Free Sticker", price=0.0, stock=0),
+            ])
+            db.session.flush()
+            db.session.add_all([
+                Service_Tickets(customer_id=customer.id, vehicle_make="Honda", vehicle_model="Civic", vehicle_year=2015,
+                                service_description="Brakes", date_created=date(2024, 1, 1), status="Complete",
+                                completion_date=date(2024, 1, 3), total_cents=12345, price=123.45),
+                Service_Tickets(customer_id=customer.id, vehicle_make="Ford", vehicle_model="F-150", vehicle_year=2018,
+                                service_description="Noise", date_created=date(2024, 1, 8)),
+            ])
+            db.session.commit()
+            self.token_mechanic = encode_token(1, "mechanic")
+        self.client = self.app.test_client()
+
+    def assertParity(self, schema, model):
+        fast = FastSerializer(schema)
+        with self.app.app_context():
+            objects = db.session.scalars(select(model).order_by(model.id)).all()
+            self.assertTrue(objects)
+            if schema.many:
+                self.assertEqual(fast.dump(objects), schema.dump(objects))
+            else:
+                for obj in objects:
+                    self.assertEqual(fast.dump(obj), schema.dump(obj))
+            #Row tuples of the same columns dump the same as the entities
+            rows = db.session.execute(select(*fast.columns).order_by(model.id)).all()
+            self.assertEqual(fast.dump(rows, many=True), schema.dump(objects, many=True))
+
+    def test_parity_with_marshmallow(self):
+        for schema, model in [(service_ticket_schema, Service_Tickets), (service_tickets_schema, Service_Tickets),
+                              (customer_schema, Customers), (customers_schema, Customers), (login_customer_schema, Customers),
+                              (mechanic_schema, Mechanics), (mechanics_schema, Mechanics), (login_mechanic_schema, Mechanics),
+                              (part_schema, Parts), (parts_schema, Parts)]:
+            with self.subTest(schema=type(schema).__name__, many=schema.many, only=schema.only):
+                self.assertParity(schema, model)
+
+    def test_fields_it_does_not_inline_use_marshmallow(self):
+        class TicketSchema(ma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = Service_Tickets
+                include_fk = True
+                exclude = ('date_created',)
+            price = fields.Float(as_string=True)
+            vehicle = fields.Method('describe_vehicle')
+            completion_date = fields.Date(format='%d/%m/%Y')
+            created = fields.Date(attribute='date_created', data_key='opened')
+
+            def describe_vehicle(self, ticket):
+                return f"{ticket.vehicle_year} {ticket.vehicle_make} {ticket.vehicle_model}"
+
+        schema = TicketSchema(many=True)
+        with self.app.app_context():
+            tickets = db.session.scalars(select(Service_Tickets).order_by(Service_Tickets.id)).all()
+            self.assertEqual(FastSerializer(schema).dump(tickets), schema.dump(tickets))
+            self.assertEqual(FastSerializer(schema).dump(tickets)[0]['opened'], "2024-01-01")
+
+    def test_list_endpoints_match_marshmallow(self):
+        headers = {"Authorization": f"Bearer {self.token_mechanic}"}
+        with self.app.app_context():
+            expected = {
+                '/customers': customers_schema.dump(db.session.scalars(select(Customers)).all()),
+                '/mechanics': mechanics_schema.dump(db.session.scalars(select(Mechanics)).all()),
+                '/parts': parts_schema.dump(db.session.scalars(select(Parts)).all()),
+            }
+            tickets = service_tickets_schema.dump(db.session.scalars(select(Service_Tickets).order_by(Service_Tickets.date_created, Service_Tickets.id)).all())
+        for url, dumped in expected.items():
+            self.assertEqual(self.client.get(url, headers=headers).json, dumped)
+        self.assertEqual(self.client.get('/service_tickets', headers=headers).json['service_tickets'], tickets)
+        self.assertIs(customers_fast.schema, customers_schema)
+        self.assertIs(mechanics_fast.schema, mechanics_schema)
+        self.assertIs(parts_fast.schema, parts_schema)
+        self.assertIs(service_tickets_fast.schema, service_tickets_schema)
@@ -0,0 +1,312 @@
+from app import create_app
+from app.blueprints.Service_Tickets import line_items
+from app.models import Customers, Daily_Part_Rollups, Mechanics, Parts, Service_Ticket_Parts, Service_Tickets, db
+from sqlalchemy import event, select
+from app.utility.auth import encode_token
+from datetime import date
+import unittest
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+
+class TestServiceTickets(unittest.TestCase):
+
+    #Runs before each test_method
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.customer = Customers(
+            first_name="Ticket",
+            last_name="Customer",
+            email="ticket@email.com",
+            password=generate_password_hash("12345"),
+            phone="222-333-4444",
+            address="1 Ticket St",
+            role="customer"
+        )
+        self.mechanic = Mechanics(
+            first_name="Ticket",
+            last_name="Mechanic",
+            email="ticketmech@email.com",
+            password=generate_password_hash("12345"),
+            phone="444-333-2222",
+            specialty="Brakes",
+            role="mechanic"
+        )
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(self.customer)
+            db.session.add(self.mechanic)
+            db.session.flush()
+            self.customer_id = self.customer.id
+            self.mechanic_id = self.mechanic.id
+
+            #5 tickets over 3 days, two of them complete
+            for i in range(5):
+                db.session.add(Service_Tickets(
+                    customer_id=self.customer.id,
+                    vehicle_make="Toyota",
+                    vehicle_model="Camry",
+                    vehicle_year=2015 + i,
+                    service_description=f"Job {i}",
+                    date_created=date(2024, 1, 1 + i // 2),
+                    status="Complete" if i % 2 else "Pending"
+                ))
+
+            for i in range(6):
+                db.session.add(Parts(part_name=f"Part {i}", price=10.0 + i, stock=100))
+
+            self.token_mechanic = encode_token(self.mechanic.id, "mechanic")
+            self.token_customer = encode_token(self.customer.id, "customer")
+            db.session.commit()
+
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token_mechanic}"}
+
+    def test_get_service_tickets_pages(self):
+        response = self.client.get('/service_tickets?limit=2', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json['service_tickets']), 2)
+        self.assertIsNotNone(response.json['next_cursor'])
+
+        #walk every page and make sure we see each ticket exactly once
+        seen = [t['id'] for t in response.json['service_tickets']]
+        cursor = response.json['next_cursor']
+        while cursor:
+            response = self.client.get(f'/service_tickets?limit=2&cursor={cursor}', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            seen += [t['id'] for t in response.json['service_tickets']]
+            cursor = response.json['next_cursor']
+        self.assertEqual(sorted(seen), [1, 2, 3, 4, 5])
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_get_service_tickets_sparse_fields_keep_paging(self):
+        response = self.client.get('/service_tickets?limit=3&fields=status', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(t) for t in response.json['service_tickets']], [{"status"}] * 3)
+        cursor = response.json['next_cursor']
+        response = self.client.get(f'/service_tickets?limit=3&fields=id,status&cursor={cursor}', headers=self.headers)
+        self.assertEqual(len(response.json['service_tickets']), 2)
+        self.assertIsNone(response.json['next_cursor'])
+        self.assertEqual(self.client.get('/service_tickets?fields=owner', headers=self.headers).status_code, 400)
+
+    def test_get_service_tickets_filters(self):
+        response = self.client.get('/service_tickets?status=Complete', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({t['status'] for t in response.json['service_tickets']}, {"Complete"})
+        self.assertEqual(len(response.json['service_tickets']), 2)
+        self.assertIsNone(response.json['next_cursor'])
+
+        response = self.client.get('/service_tickets?date_from=2024-01-02&date_to=2024-01-02', headers=self.headers)
+        self.assertEqual(len(response.json['service_tickets']), 2)
+
+        response = self.client.get(f'/service_tickets?customer_id={self.customer_id + 1}', headers=self.headers)
+        self.assertEqual(response.json['service_tickets'], [])
+
+    def test_get_service_tickets_bad_cursor(self):
+        response = self.client.get('/service_tickets?cursor=not-a-cursor', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/service_tickets?limit=0', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_service_tickets_ndjson(self):
+        headers = dict(self.headers, Accept="application/x-ndjson")
+        response = self.client.get('/service_tickets?status=Pending', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 3) #streams every matching ticket, not just one page
+        self.assertIn('"status":"Pending"', lines[0].replace(" ", ""))
+
+    #counts the SQL statements a request sends to the database
+    def count_queries(self, method, url, **kwargs):
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = getattr(self.client, method)(url, headers=self.headers, **kwargs)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def test_add_and_remove_part_query_count_is_constant(self):
+        #adding the 1st part and the 6th part should cost the same number of queries
+        add_counts = [
+            self.count_queries('put', '/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": part_id, "quantity": 1})
+            for part_id in range(1, 7)
+        ]
+        self.assertEqual(len(set(add_counts)), 1, add_counts)
+
+        remove_counts = [
+            self.count_queries('put', '/service_tickets/remove_part', json={"service_ticket_id": 1, "part_id": part_id, "quantity": 1})
+            for part_id in range(1, 6)
+        ]
+        self.assertEqual(len(set(remove_counts)), 1, remove_counts)
+
+    def parts_text(self):
+        return self.client.get('/service_tickets/1/invoice', headers=self.headers).json['parts']
+
+    def test_add_part_updates_summary(self):
+        self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 1, "quantity": 2}, headers=self.headers)
+        response = self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 2, "quantity": 1}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.parts_text(), "Part 0 (x2), Part 1 (x1)")
+        self.assertEqual(response.json['price'], 31.0)
+
+    def test_add_and_remove_part_keeps_total_in_cents(self):
+        #0.1 + 0.2 style float drift can't happen when the ledger adds integer cents
+        with self.app.app_context():
+            db.session.get(Parts, 1).price = 0.1
+            db.session.get(Parts, 2).price = 0.2
+            db.session.commit()
+        self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 1, "quantity": 1}, headers=self.headers)
+        response = self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 2, "quantity": 1}, headers=self.headers)
+        self.assertEqual(response.json['total_cents'], 30)
+        self.assertEqual(response.json['price'], 0.3)
+
+        response = self.client.put('/service_tickets/remove_part', json={"service_ticket_id": 1, "part_id": 1, "quantity": 1}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['total_cents'], 20)
+        self.assertEqual(self.parts_text(), "Part 1 (x1)")
+
+        response = self.client.put('/service_tickets/remove_part', json={"service_ticket_id": 1, "part_id": 2, "quantity": 5}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_part_quantity_must_be_a_whole_number(self):
+        for quantity in (2.5, True, "2", 0, None):
+            for url in ('/service_tickets/add_part', '/service_tickets/remove_part'):
+                response = self.client.put(url, json={"service_ticket_id": 1, "part_id": 1, "quantity": quantity}, headers=self.headers)
+                self.assertEqual(response.status_code, 400, (url, quantity))
+            response = self.client.put('/service_tickets/add_parts', json={"service_ticket_id": 1, "parts": [{"part_id": 1, "quantity": quantity}]}, headers=self.headers)
+            self.assertEqual(response.status_code, 400, quantity)
+        with self.app.app_context():
+            self.assertEqual((db.session.get(Parts, 1).stock, db.session.get(Service_Tickets, 1).total_cents), (100, 0))
+
+    def test_update_leaves_the_ledger_alone(self):
+        self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 1, "quantity": 2}, headers=self.headers)
+        for field, value in (("price", 5), ("total_cents", "abc"), ("total_cents", 1), ("id", 9), ("date_created", "2020-01-01"), ("vehicle_year", "old")):
+            response = self.client.put('/service_tickets', json={"service_ticket_id": 1, field: value}, headers=self.headers)
+            self.assertEqual(response.status_code, 400, field)
+        response = self.client.put('/service_tickets', json={"service_ticket_id": 1, "vehicle_make": "Honda"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json['vehicle_make'], response.json['total_cents'], response.json['price']), ("Honda", 2000, 20.0))
+
+    def test_line_another_request_just_added_is_bumped(self):
+        self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 1, "quantity": 2}, headers=self.headers)
+        with self.app.app_context():
+            db.session.get(Parts, 1).price = 99.0
+            db.session.commit()
+        #as if the line was committed between this request looking for it and writing it
+        with patch.object(line_items, 'get_line_items', return_value={}):
+            response = self.client.put('/service_tickets/add_parts', json={"service_ticket_id": 1, "parts": [{"part_id": 1, "quantity": 1}, {"part_id": 2, "quantity": 1}]}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['total_cents'], 3000 + 1100) #the bumped line keeps the price it was added at
+        with self.app.app_context():
+            lines = db.session.execute(select(Service_Ticket_Parts.part_id, Service_Ticket_Parts.quantity).where(Service_Ticket_Parts.service_ticket_id == 1).order_by(Service_Ticket_Parts.part_id)).all()
+            rollups = db.session.execute(select(Daily_Part_Rollups.part_id, Daily_Part_Rollups.quantity, Daily_Part_Rollups.lines).order_by(Daily_Part_Rollups.part_id)).all()
+        self.assertEqual(lines, [(1, 3), (2, 1)])
+        self.assertEqual(rollups, [(1, 3, 1), (2, 1, 1)])
+
+    def test_get_invoice(self):
+        self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 1, "quantity": 3}, headers=self.headers)
+        response = self.client.get('/service_tickets/1/invoice', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['total_cents'], 3000)
+        self.assertEqual(response.json['parts'], "Part 0 (x3)")
+        self.assertEqual(response.json['line_items'], [
+            {"part_id": 1, "part_name": "Part 0", "quantity": 3, "unit_price": 10.0, "line_total": 30.0}
+        ])
+
+        #customers can only see invoices for their own tickets
+        customer_headers = {"Authorization": f"Bearer {self.token_customer}"}
+        response = self.client.get('/service_tickets/1/invoice', headers=customer_headers)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/service_tickets/99/invoice', headers=customer_headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_add_and_remove_parts_batch(self):
+        payload = {"service_ticket_id": 1, "parts": [
+            {"part_id": 1, "quantity": 2},
+            {"part_id": 2, "quantity": 1},
+            {"part_id": 1, "quantity": 1}
+        ]}
+        response = self.client.put('/service_tickets/add_parts', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.parts_text(), "Part 0 (x3), Part 1 (x1)")
+        self.assertEqual(response.json['total_cents'], 4100)
+
+        #second batch bumps an existing line and adds a new one
+        payload = {"service_ticket_id": 1, "parts": [{"part_id": 2, "quantity": 1}, {"part_id": 3, "quantity": 1}]}
+        response = self.client.put('/service_tickets/add_parts', json=payload, headers=self.headers)
+        self.assertEqual(self.parts_text(), "Part 0 (x3), Part 1 (x2), Part 2 (x1)")
+        self.assertEqual(response.json['total_cents'], 6400)
+
+        payload = {"service_ticket_id": 1, "parts": [{"part_id": 1, "quantity": 3}, {"part_id": 2, "quantity": 1}]}
+        response = self.client.put('/service_tickets/remove_parts', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.parts_text(), "Part 1 (x1), Part 2 (x1)")
+        self.assertEqual(response.json['total_cents'], 2300)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Parts, 1).stock, 100)
+            self.assertEqual(db.session.get(Parts, 2).stock, 99)
+
+    def test_add_parts_batch_is_all_or_nothing(self):
+        with self.app.app_context():
+            db.session.get(Parts, 2).stock = 1
+            db.session.commit()
+        payload = {"service_ticket_id": 1, "parts": [{"part_id": 1, "quantity": 2}, {"part_id": 2, "quantity": 5}]}
+        response = self.client.put('/service_tickets/add_parts', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Parts, 1).stock, 100) #part 1 had stock but nothing was taken
+            self.assertEqual(db.session.get(Service_Tickets, 1).total_cents, 0)
+
+        payload = {"service_ticket_id": 1, "parts": [{"part_id": 1, "quantity": 1}, {"part_id": 99, "quantity": 1}]}
+        response = self.client.put('/service_tickets/add_parts', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+        self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 1, "quantity": 1}, headers=self.headers)
+        payload = {"service_ticket_id": 1, "parts": [{"part_id": 1, "quantity": 1}, {"part_id": 2, "quantity": 1}]}
+        response = self.client.put('/service_tickets/remove_parts', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 404) #part 2 isn't on the ticket
+
+    def test_cached_reads_invalidated_on_commit(self):
+        #warm the caches
+        response = self.client.get('/service_tickets', headers=self.headers)
+        self.assertEqual(response.json['service_tickets'][0]['total_cents'], 0)
+        self.assertEqual(self.client.get('/service_tickets/1', headers=self.headers).json['status'], "Pending")
+
+        #writes through the ORM and through the ledger's UPDATE statements both show up straight away
+        self.client.put('/service_tickets/add_part', json={"service_ticket_id": 1, "part_id": 1, "quantity": 1}, headers=self.headers)
+        response = self.client.get('/service_tickets', headers=self.headers)
+        self.assertEqual(response.json['service_tickets'][0]['total_cents'], 1000)
+        self.assertEqual(self.client.get('/service_tickets/1/invoice', headers=self.headers).json['total_cents'], 1000)
+
+        self.client.put('/service_tickets', json={"service_ticket_id": 1, "status": "Complete"}, headers=self.headers)
+        self.assertEqual(self.client.get('/service_tickets/1', headers=self.headers).json['status'], "Complete")
+
+    def test_my_tickets_cache_invalidated_on_assign_and_update(self):
+        customer_headers = {"Authorization": f"Bearer {self.token_customer}"}
+        self.assertEqual(self.client.get('/mechanics/my_tickets', headers=self.headers).status_code, 404)
+        self.assertEqual(len(self.client.get('/customers/my_tickets', headers=customer_headers).json), 5)
+
+        self.client.put('/service_tickets/assign_mechanic/', json={"service_ticket_id": 2, "mechanic_id": self.mechanic_id}, headers=self.headers)
+        response = self.client.get('/mechanics/my_tickets', headers=self.headers)
+        self.assertEqual([t['id'] for t in response.json], [2])
+
+        self.client.put('/service_tickets', json={"service_ticket_id": 2, "vehicle_make": "Honda"}, headers=self.headers)
+        response = self.client.get('/mechanics/my_tickets', headers=self.headers)
+        self.assertEqual(response.json[0]['vehicle_make'], "Honda")
+        response = self.client.get('/customers/my_tickets', headers=customer_headers)
+        self.assertEqual([t['vehicle_make'] for t in response.json if t['id'] == 2], ["Honda"])
+
+        self.client.put('/service_tickets/remove_mechanic/', json={"service_ticket_id": 2, "mechanic_id": self.mechanic_id}, headers=self.headers)
+        self.assertEqual(self.client.get('/mechanics/my_tickets', headers=self.headers).status_code, 404)
+
+    def test_cached_read_skips_database(self):
+        self.count_queries('get', '/service_tickets/1')
+        self.assertEqual(self.count_queries('get', '/service_tickets/1'), 0)
+        self.assertGreater(self.count_queries('get', '/service_tickets/2'), 0) #per-ticket keys
@@ -0,0 +1,142 @@
+from app import create_app
+from app.models import Customers, Mechanics, Parts, Stock_Movements, Stock_Snapshots, db
+from app.utility.auth import encode_token
+from app.utility.ledger import snapshot_all, stock_at, stock_drift, utc_now
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+import unittest
+from werkzeug.security import generate_password_hash
+
+class TestStockLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.app.config['STOCK_SNAPSHOT_EVERY'] = 3 #small, so a few writes cross several snapshots
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            customer = Customers(first_name="Led", last_name="Ger", email="ledger@email.com", password=generate_password_hash("12345"),
+                                 phone="222-333-5555", address="1 Ledger St")
+            mechanic = Mechanics(first_name="Mech", last_name="Ledger", email="mechledger@email.com", password=generate_password_hash("12345"),
+                                 phone="555-333-2222", specialty="Brakes")
+            db.session.add_all([customer, mechanic])
+            db.session.commit()
+            self.customer_id = customer.id
+            self.token = encode_token(mechanic.id, "mechanic")
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+    def request(self, method, url, expected=200, **body):
+        response = self.client.open(url, method=method, json=body, headers=self.headers)
+        self.assertEqual(response.status_code, expected, response.json)
+        return response
+
+    def movements(self, part_id):
+        with self.app.app_context():
+            return db.session.execute(select(Stock_Movements.reason, Stock_Movements.quantity, Stock_Movements.service_ticket_id)
+                                      .where(Stock_Movements.part_id == part_id).order_by(Stock_Movements.id)).all()
+
+    def stock_at(self, part_id, at):
+        with self.app.app_context():
+            return stock_at(db.session.connection(), part_id, at)
+
+    def test_every_stock_change_is_a_movement(self):
+        part_id = self.request('POST', '/parts', 201, part_name="Brake Pads", price=50.0, stock=10).json['id']
+        ticket = self.client.post('/service_tickets', json={"customer_id": self.customer_id, "vehicle_make": "Honda", "vehicle_model": "Civic",
+                                                            "vehicle_year": 2015, "service_description": "Brakes"}, headers=self.headers).json['id']
+        self.request('PUT', '/service_tickets/add_part', service_ticket_id=ticket, part_id=part_id, quantity=4)
+        self.request('PUT', '/service_tickets/remove_part', service_ticket_id=ticket, part_id=part_id, quantity=4)
+        self.request('PUT', '/parts/add_stock', part_id=part_id, additional_stock=5)
+        self.request('PUT', f'/parts/{part_id}', stock=12) #stock count corrected by hand
+        self.request('PUT', f'/parts/{part_id}', price=55.0) #not a stock change
+        self.request('DELETE', '/parts', part_id=part_id)
+        self.assertEqual(self.movements(part_id), [('created', 10, None), ('used', -4, ticket), ('returned', 4, ticket),
+                                                   ('delivery', 5, None), ('adjusted', -3, None), ('deleted', -12, None)])
+
+        #the part is gone, its history isn't
+        history = self.client.get(f'/parts/{part_id}/stock', headers=self.headers).json
+        self.assertEqual((history['stock'], history['snapshot']['movement_id']), (0, 6))
+
+        response = self.client.post('/parts/import', data='{"part_name": "Bulk", "price": 1.0, "stock": 7}\n', content_type='application/x-ndjson', headers=self.headers)
+        self.assertEqual(response.json['imported'], 1)
+        with self.app.app_context():
+            bulk = db.session.scalar(select(Parts.id).where(Parts.part_name == "Bulk"))
+        self.assertEqual(self.movements(bulk), [('imported', 7, None)])
+
+    def test_point_in_time_reads_a_bounded_slice(self):
+        with self.app.app_context():
+            part = Parts(part_name="Oil Filter", price=10.0, stock=0)
+            db.session.add(part)
+            db.session.commit()
+            part_id = part.id
+        timeline = [(utc_now(), 0)]
+        for quantity in range(1, 11):
+            self.request('PUT', '/parts/add_stock', part_id=part_id, additional_stock=quantity)
+            timeline.append((utc_now(), timeline[-1][1] + quantity))
+
+        with self.app.app_context():
+            snapshots = db.session.scalars(select(Stock_Snapshots.movement_id).where(Stock_Snapshots.part_id == part_id)).all()
+        self.assertEqual(snapshots, [3, 6, 9])
+        for at, stock in timeline:
+            history = self.stock_at(part_id, at)
+            self.assertEqual(history['stock'], stock)
+            self.assertLessEqual(history['movements_scanned'], 3)
+
+        self.assertIsNone(self.stock_at(part_id, timeline[0][0].replace(year=2000)))
+        at, stock = timeline[5]
+        response = self.client.get(f'/parts/{part_id}/stock', query_string={"at": at.isoformat() + "+00:00"}, headers=self.headers)
+        self.assertEqual((response.status_code, response.json['stock']), (200, stock))
+        self.assertEqual(self.client.get(f'/parts/{part_id}/stock', query_string={"at": "2000-01-01"}, headers=self.headers).status_code, 404)
+        self.assertEqual(self.client.get(f'/parts/{part_id}/stock', query_string={"at": "yesterday"}, headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get('/parts/999/stock', headers=self.headers).status_code, 404)
+
+    def test_failed_delete_leaves_no_movement(self):
+        with self.app.app_context():
+            pads = Parts(part_name="Brake Pads", price=50.0, stock=5)
+            bulbs = Parts(part_name="Bulb", price=2.0, stock=1)
+            db.session.add_all([pads, bulbs])
+            db.session.commit()
+            db.session.delete(pads)
+            db.session.add(Parts(part_name=None, price=1.0, stock=1)) #fails the flush the delete is in
+            with self.assertRaises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
+            bulbs.part_name = "Bulb 12V" #an unrelated flush afterwards
+            db.session.commit()
+            pads_id = pads.id
+            self.assertEqual(stock_drift(db.session.connection()), [])
+        self.assertEqual(self.movements(pads_id), [('created', 5, None)])
+
+    def test_snapshot_is_the_ledgers_stock(self):
+        part_id = self.request('POST', '/parts', 201, part_name="Fuse", price=1.0, stock=5).json['id']
+        self.request('PUT', '/parts/add_stock', part_id=part_id, additional_stock=1)
+        gone = self.request('POST', '/parts', 201, part_name="Old Fuse", price=1.0, stock=2).json['id']
+        self.request('DELETE', '/parts', part_id=gone)
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                #stock from a write that isn't in the ledger yet, like one committed while the snapshot runs
+                connection.execute(text("UPDATE parts SET stock = 9 WHERE id = :id"), {"id": part_id})
+                self.assertEqual(snapshot_all(connection), 2)
+            snapshots = db.session.execute(select(Stock_Snapshots.part_id, Stock_Snapshots.stock)
+                                           .where(Stock_Snapshots.movement_id > 0).order_by(Stock_Snapshots.part_id)).all()
+        self.assertEqual(snapshots, [(part_id, 6), (gone, 0)])
+        self.assertEqual(self.stock_at(part_id, utc_now())['stock'], 6)
+
+    def test_audit_and_snapshot_commands(self):
+        part_id = self.request('POST', '/parts', 201, part_name="Bulb", price=2.0, stock=5).json['id']
+        self.request('PUT', '/parts/add_stock', part_id=part_id, additional_stock=1)
+        runner = self.app.test_cli_runner()
+        with self.app.app_context():
+            self.assertEqual(stock_drift(db.session.connection()), [])
+            self.assertIn("0 part(s)", runner.invoke(args=['stock', 'audit']).output)
+            with db.engine.begin() as connection:
+                connection.execute(text("UPDATE parts SET stock = 1 WHERE id = :id"), {"id": part_id}) #a writer that skipped the ledger
+            result = runner.invoke(args=['stock', 'audit'])
+            self.assertIn(f"part {part_id}: stock 1, ledger says 6", result.output)
+            self.assertIn("1 part(s)", result.output)
+
+            with db.engine.begin() as connection:
+                connection.execute(text("UPDATE parts SET stock = 6 WHERE id = :id"), {"id": part_id})
+            self.assertIn("1 snapshot(s) taken.", runner.invoke(args=['stock', 'snapshot']).output)
+            self.assertIn("0 snapshot(s) taken.", runner.invoke(args=['stock', 'snapshot']).output) #nothing moved since
+        self.assertEqual(self.stock_at(part_id, utc_now())['movements_scanned'], 0)